@@ -0,0 +1,78 @@
+import json
+import time
+
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from authentication.views import CustomTokenObtainPairView
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure login latency and single worker login throughput against the cost of one '
+        'password hash verification with the configured hasher. The benchmark user is '
+        'created in a transaction that is rolled back, the database is left untouched.'
+    )
+
+    username = 'benchmark-login'
+    password = 'benchmark-login-password'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--logins',
+            type=int,
+            default=20,
+            help='Logins to time (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(self.username, password=self.password)
+                self.run(user, options['logins'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, user, logins):
+        hasher = get_hasher()
+        verify = self.best(lambda: user.check_password(self.password), 5)
+
+        # Without throttles: the per-username login limit would reject the repeated logins
+        view = CustomTokenObtainPairView.as_view(throttle_classes=[])
+        body = json.dumps({'username': self.username, 'password': self.password})
+        request_factory = APIRequestFactory()
+
+        def login():
+            response = view(request_factory.post('/api/auth/login/', body, content_type='application/json'))
+            if response.status_code != 200:
+                raise RuntimeError(f'Login failed with status {response.status_code}')
+
+        with CaptureQueriesContext(connection) as captured:
+            login()
+        started = time.perf_counter()
+        for _ in range(logins):
+            login()
+        elapsed = (time.perf_counter() - started) / logins
+
+        self.stdout.write(f'hasher: {hasher.algorithm} ({getattr(hasher, "iterations", "n/a")} iterations)')
+        self.stdout.write(f'password verification: {verify * 1000:.1f} ms')
+        self.stdout.write(f'login: {elapsed * 1000:.1f} ms, {len(captured)} queries')
+        self.stdout.write(f'hash verifications per login: {elapsed / verify:.2f}')
+        self.stdout.write(self.style.SUCCESS(f'{1 / elapsed:.1f} logins per second per worker'))
+
+    def best(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired outstanding and blacklisted refresh tokens in small batches '
+        '(schedule it, e.g. daily). Unlike flushexpiredtokens it never loads or '
+        'locks the whole expired set at once.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Tokens deleted per transaction (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        batch_size = options['batch_size']
+        last_id, deleted = 0, 0
+        while True:
+            # Walk the primary key so each batch resumes where the previous one stopped
+            ids = list(
+                OutstandingToken.objects.filter(id__gt=last_id, expires_at__lte=now)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                OutstandingToken.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired tokens'))
@@ -0,0 +1,44 @@
+# Case-insensitive unique emails for users (blank emails are exempt)
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_duplicates(apps, schema_editor):
+    """Refuse to build the index while users share an email, listing who does"""
+    User = apps.get_model('auth', 'User')
+    duplicates = (
+        User.objects.exclude(email='').annotate(email_key=Lower('email'))
+        .values('email_key').annotate(users=Count('pk')).filter(users__gt=1)
+        .values_list('email_key', flat=True)
+    )
+    clashes = []
+    for key in sorted(duplicates):
+        usernames = User.objects.filter(email__iexact=key).order_by('username').values_list('username', flat=True)
+        clashes.append(f"  {key}: {', '.join(usernames)}")
+    if clashes:
+        raise RuntimeError(
+            'Cannot make user emails unique: these emails belong to more than one user '
+            '(compared ignoring case):\n' + '\n'.join(clashes) + '\n'
+            'Change or clear the extra emails, then run migrate again.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        # Partial, so any number of users may leave their email blank. The
+        # predicate is spelled the way the ORM renders ~Q(email='') because
+        # SQLite only uses a partial index when the query repeats its
+        # condition verbatim (authentication.users.matching_users does).
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX auth_user_email_ci_uniq ON auth_user (lower(email)) WHERE NOT (email = '')",
+            'DROP INDEX IF EXISTS auth_user_email_ci_uniq',
+        ),
+    ]
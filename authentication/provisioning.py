@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .serializers import ProvisionUserSerializer
+from .users import matching_users
+
+# Password hashes computed in parallel; PBKDF2 runs in OpenSSL without the GIL
+HASHING_THREADS = 4
+
+
+def provision_users(rows):
+    """
+    Validate and create many user accounts at once (staff onboarding).
+
+    Rows are shape-validated individually, then usernames and emails of the
+    whole batch are checked against existing accounts with one query and
+    against each other. Passwords of the valid rows are hashed in parallel and
+    the users are written with bulk_create in one transaction; invalid rows
+    are skipped and reported.
+
+    Returns (users, errors) where errors is a list of
+    {'index': <row position>, 'errors': {...}} in row order.
+    """
+    errors = {}
+    validated = []
+    for index, row in enumerate(rows):
+        serializer = ProvisionUserSerializer(data=row)
+        if serializer.is_valid():
+            validated.append((index, serializer.validated_data))
+        else:
+            errors[index] = serializer.errors
+
+    # Emails are unique ignoring case (see authentication.users.matching_users)
+    taken_usernames, taken_emails = set(), set()
+    if validated:
+        for username, email in matching_users(
+            {data['username'] for _, data in validated},
+            {data['email'] for _, data in validated},
+        ).values_list('username', 'email'):
+            taken_usernames.add(username)
+            taken_emails.add(email.lower())
+
+    accepted = []
+    for index, data in validated:
+        row_errors = {}
+        if data['username'] in taken_usernames:
+            row_errors['username'] = ['A user with that username already exists.']
+        if data['email'].lower() in taken_emails:
+            row_errors['email'] = ['A user with that email already exists.']
+        if row_errors:
+            errors[index] = row_errors
+            continue
+        # Later rows repeating a username or email of an accepted row are rejected
+        taken_usernames.add(data['username'])
+        taken_emails.add(data['email'].lower())
+        accepted.append(data)
+
+    with ThreadPoolExecutor(max_workers=HASHING_THREADS) as executor:
+        # make_password(None) stores an unusable password
+        passwords = list(executor.map(make_password, [data.get('password') for data in accepted]))
+
+    users = [
+        User(
+            username=data['username'],
+            email=data['email'],
+            password=password,
+            first_name=data['first_name'],
+            last_name=data['last_name'],
+            is_staff=data['is_staff'],
+        )
+        for data, password in zip(accepted, passwords)
+    ]
+    if users:
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=500)
+
+    return users, [
+        {'index': index, 'errors': errors[index]} for index in sorted(errors)
+    ]
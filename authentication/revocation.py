@@ -0,0 +1,123 @@
+"""
+Revoked refresh tokens, checked from memory.
+
+simplejwt's blacklist app checks every refresh with a join over the
+outstanding and blacklisted token tables. Here each process keeps the JTIs of
+blacklisted tokens that have not expired yet in a dict instead. The dict is
+exact (no false positives) and bounded by REFRESH_TOKEN_LIFETIME.
+
+- Startup and every TOKEN_REVOCATION_RELOAD_SECONDS: a full load.
+- Between loads: a primary key range poll for rows blacklisted since the last
+  one. It runs when the shared revocation version changes (every blacklist()
+  call bumps it) or after TOKEN_REVOCATION_POLL_SECONDS without a poll.
+
+With a shared cache backend (Redis), a token revoked by any worker is
+rejected everywhere on its next use. With the per-process LocMem default,
+other workers catch up within the poll interval. Expired tokens fail their
+`exp` check anyway, so they are simply dropped from memory. The tables are
+kept small by `manage.py prune_tokens`.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from queenbe_backend.caching import bump_version, current_version
+
+REVOCATIONS_NAMESPACE = 'token-revocations'
+# Polls re-read this many ids below the watermark: ids are assigned at insert,
+# so a slow transaction can commit a row below one already seen
+POLL_OVERLAP = 100
+
+
+class RevocationCache:
+    """Blacklisted, unexpired JTIs with their expiry, mirrored from the database"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.expiries = {}
+        self.watermark = 0
+        self.version = None
+        self.loaded_at = None
+        self.polled_at = None
+
+    def refresh(self):
+        now = time.monotonic()
+        version = current_version(REVOCATIONS_NAMESPACE)
+        reload_after = getattr(settings, 'TOKEN_REVOCATION_RELOAD_SECONDS', 3600)
+        poll_after = getattr(settings, 'TOKEN_REVOCATION_POLL_SECONDS', 5)
+        if self.loaded_at is None or now - self.loaded_at >= reload_after:
+            self.load(now)
+        elif version != self.version or now - self.polled_at >= poll_after:
+            self.poll(now)
+        self.version = version
+
+    def load(self, now):
+        expiries, watermark = {}, 0
+        rows = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()).values_list(
+            'id', 'token__jti', 'token__expires_at'
+        )
+        for row_id, jti, expires_at in rows.iterator(chunk_size=5000):
+            expiries[jti] = expires_at
+            watermark = max(watermark, row_id)
+        self.expiries = expiries
+        # Rows committed after the load are fetched by the next poll
+        self.watermark = max(watermark, self.watermark)
+        self.loaded_at = self.polled_at = now
+
+    def poll(self, now):
+        current = timezone.now()
+        rows = BlacklistedToken.objects.filter(id__gt=self.watermark - POLL_OVERLAP).order_by('id').values_list(
+            'id', 'token__jti', 'token__expires_at'
+        )
+        for row_id, jti, expires_at in rows:
+            if expires_at > current:
+                self.expiries[jti] = expires_at
+            self.watermark = max(self.watermark, row_id)
+        self.expiries = {jti: expires_at for jti, expires_at in self.expiries.items() if expires_at > current}
+        self.polled_at = now
+
+    def is_revoked(self, jti):
+        with self.lock:
+            self.refresh()
+            return jti in self.expiries
+
+    def add(self, jti, expires_at):
+        with self.lock:
+            self.expiries[jti] = expires_at
+
+
+_revocations = RevocationCache()
+
+
+def is_revoked(jti):
+    return _revocations.is_revoked(jti)
+
+
+def clear_revocation_cache():
+    with _revocations.lock:
+        _revocations.clear()
+
+
+class RefreshToken(tokens.RefreshToken):
+    """Refresh token whose blacklist membership is checked against the in-memory revocation set"""
+
+    def check_blacklist(self):
+        if is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        result = super().blacklist()
+        _revocations.add(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload['exp']))
+        bump_version(REVOCATIONS_NAMESPACE)
+        return result
@@ -0,0 +1,17 @@
+from rest_framework import serializers
+
+
+class ProvisionUserSerializer(serializers.Serializer):
+    """
+    Shape validation for one user in a bulk provisioning payload.
+
+    Uniqueness of usernames and emails is checked for the whole batch at
+    once by authentication.provisioning.provision_users.
+    """
+    username = serializers.RegexField(r'^[\w.@+-]+\Z', max_length=150)
+    email = serializers.EmailField()
+    # Without a password the account cannot log in until one is set
+    password = serializers.CharField(required=False, allow_blank=False, write_only=True)
+    first_name = serializers.CharField(required=False, allow_blank=True, max_length=150, default='')
+    last_name = serializers.CharField(required=False, allow_blank=True, max_length=150, default='')
+    is_staff = serializers.BooleanField(required=False, default=False)
@@ -0,0 +1,16 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .users import forget_user, remember_user
+
+
+@receiver(post_save, sender=User)
+def remember_saved_user(sender, instance, **kwargs):
+    """Serve the saved row to this process's next request (deactivation applies at once)"""
+    remember_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
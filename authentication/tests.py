@@ -1,3 +1,492 @@
-from django.test import TestCase
+from django.contrib.auth.hashers import MD5PasswordHasher
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from queenbe_backend.testing import IndexUsageMixin, QueryCountMixin
+from .revocation import clear_revocation_cache, is_revoked
+from .throttling import throttle_metrics
+from .users import clear_user_cache
+
+
+class CountingPasswordHasher(MD5PasswordHasher):
+    """MD5 hasher that counts hash computations (verifications and the dummy hash for unknown users)"""
+
+    computations = 0
+
+    def encode(self, password, salt):
+        CountingPasswordHasher.computations += 1
+        return super().encode(password, salt)
+
+
+# Fast hashing keeps the many login round trips cheap; query counts are unaffected
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AuthenticationQueryCountTests(QueryCountMixin, TestCase):
+    """Every authentication endpoint costs a fixed number of queries as users grow"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', 'counter@example.com', 'secret-pass')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.seeded = 0
+        clear_user_cache()
+        caches['throttle'].clear()
+
+    def grow(self, count):
+        users = []
+        for _ in range(count):
+            self.seeded += 1
+            users.append(User(username=f'user{self.seeded}', email=f'user{self.seeded}@example.com'))
+        User.objects.bulk_create(users)
+
+    def authenticate(self):
+        """Send a real bearer token so the JWT authentication lookup is measured too"""
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_login(self):
+        response = self.assertConstantQueries(lambda: self.client.post(
+            '/api/auth/login/', {'username': 'counter', 'password': 'secret-pass'}, format='json'
+        ))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['username'], 'counter')
+
+    def test_login_with_wrong_password(self):
+        response = self.assertConstantQueries(lambda: self.client.post(
+            '/api/auth/login/', {'username': 'counter', 'password': 'wrong'}, format='json'
+        ))
+        self.assertEqual(response.status_code, 401)
+
+    def test_token_refresh(self):
+        response = self.assertConstantQueries(
+            lambda refresh: self.client.post('/api/auth/token/refresh/', {'refresh': refresh}, format='json'),
+            prepare=lambda: str(RefreshToken.for_user(self.user)),
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_logout(self):
+        self.authenticate()
+        self.assertConstantQueries(
+            lambda refresh: self.client.post('/api/auth/logout/', {'refresh_token': refresh}, format='json'),
+            prepare=lambda: str(RefreshToken.for_user(self.user)),
+        )
+
+    def test_register(self):
+        response = self.assertConstantQueries(
+            lambda username: self.client.post('/api/auth/register/', {
+                'username': username, 'email': f'{username}@example.com', 'password': 'secret-pass',
+            }, format='json'),
+            prepare=lambda: f'registered{User.objects.count()}',
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_profile(self):
+        self.authenticate()
+        response = self.assertConstantQueries(lambda: self.client.get('/api/auth/profile/'))
+        self.assertEqual(response.data['username'], 'counter')
+
+    def test_profile_update(self):
+        self.authenticate()
+        for method in ('put', 'patch'):
+            response = self.assertConstantQueries(lambda: getattr(self.client, method)(
+                '/api/auth/profile/update/', {'first_name': 'Count', 'email': 'count@example.com'}, format='json'
+            ))
+            self.assertEqual(response.status_code, 200)
+
+
+@override_settings(PASSWORD_HASHERS=['authentication.tests.CountingPasswordHasher'])
+class LoginTests(TestCase):
+    """Login verifies the password once and returns the authenticated user"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'frontdesk', 'frontdesk@example.com', 'secret-pass', first_name='Front', is_staff=True
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        CountingPasswordHasher.computations = 0
+        caches['throttle'].clear()
+
+    def test_password_is_verified_once(self):
+        response = self.client.post(
+            '/api/auth/login/', {'username': 'frontdesk', 'password': 'secret-pass'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(CountingPasswordHasher.computations, 1)
+        self.assertEqual(response.data['user'], {
+            'id': self.user.id, 'username': 'frontdesk', 'email': 'frontdesk@example.com',
+            'first_name': 'Front', 'last_name': '', 'is_staff': True, 'is_superuser': False,
+        })
+        self.assertIn('access', response.data)
+        self.assertIn('refresh', response.data)
+
+    def test_benchmark_command_runs_with_default_arguments(self):
+        out = StringIO()
+        call_command('benchmark_login', stdout=out)
+        self.assertIn('logins per second per worker', out.getvalue())
+        self.assertFalse(User.objects.filter(username='benchmark-login').exists())
+
+    def test_wrong_password(self):
+        response = self.client.post(
+            '/api/auth/login/', {'username': 'frontdesk', 'password': 'wrong'}, format='json'
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertNotIn('user', response.data)
+        self.assertEqual(CountingPasswordHasher.computations, 1)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class StatelessAuthenticationTests(TestCase):
+    """Bearer tokens authenticate from their claims; the user row is only checked once per cache period"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('claims', 'claims@example.com', 'secret-pass', first_name='Clai')
+
+    def setUp(self):
+        clear_user_cache()
+        caches['throttle'].clear()
+        self.client = APIClient()
+        response = self.client.post(
+            '/api/auth/login/', {'username': 'claims', 'password': 'secret-pass'}, format='json'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def user_queries(self, path):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in captured if 'auth_user' in query['sql']]
+
+    def test_api_requests_load_the_user_once_per_cache_period(self):
+        self.assertEqual(len(self.user_queries('/api/customers/')), 1)
+        self.assertEqual(self.user_queries('/api/customers/'), [])
+        self.assertEqual(self.user_queries('/api/auth/profile/'), [])
+
+    def test_deactivated_user_token_is_rejected(self):
+        self.assertEqual(self.client.get('/api/customers/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/customers/').status_code, 401)
+
+    def test_demoted_staff_token_loses_staff_access(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post(
+            '/api/auth/login/', {'username': 'claims', 'password': 'secret-pass'}, format='json'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get('/api/auth/throttle-metrics/').status_code, 200)
+
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/throttle-metrics/').status_code, 403)
+        self.assertEqual(self.client.post('/api/auth/users/bulk/', [], format='json').status_code, 403)
+
+    @override_settings(JWT_USER_CACHE_SECONDS=0)
+    def test_deactivation_without_signals_applies_after_the_cache_period(self):
+        self.assertEqual(self.client.get('/api/customers/').status_code, 200)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/customers/').status_code, 401)
+
+    def test_profile_user_is_cached_until_updated(self):
+        self.assertEqual(len(self.user_queries('/api/auth/profile/')), 1)
+        self.assertEqual(self.user_queries('/api/auth/profile/'), [])
+
+        response = self.client.patch('/api/auth/profile/update/', {'first_name': 'Claire'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/auth/profile/').data['first_name'], 'Claire')
+
+    def test_deleted_user_cannot_load_profile(self):
+        self.client.get('/api/auth/profile/')
+        self.user.delete()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    def test_registration_tokens_carry_claims(self):
+        response = APIClient().post('/api/auth/register/', {
+            'username': 'newcomer', 'email': 'newcomer@example.com', 'password': 'secret-pass',
+        }, format='json')
+        token = AccessToken(response.data['tokens']['access'])
+        self.assertEqual((token['username'], token['email']), ('newcomer', 'newcomer@example.com'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TokenRevocationTests(TestCase):
+    """Rotated and logged out refresh tokens are rejected without blacklist lookups per refresh"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('rotator', 'rotator@example.com', 'secret-pass')
+
+    def setUp(self):
+        cache.clear()
+        caches['throttle'].clear()
+        clear_revocation_cache()
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post(
+            '/api/auth/login/', {'username': 'rotator', 'password': 'secret-pass'}, format='json'
+        )
+        return response.data
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': token}, format='json')
+
+    def test_rotated_token_cannot_be_reused(self):
+        old = self.login()['refresh']
+        response = self.refresh(old)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(response.data['refresh']).status_code, 200)
+        self.assertEqual(self.refresh(old).status_code, 401)
+
+    def test_refresh_does_not_query_the_blacklist_by_jti(self):
+        token = self.refresh(self.login()['refresh']).data['refresh']
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.refresh(token).status_code, 200)
+        lookups = [
+            query['sql'] for query in captured
+            if 'blacklistedtoken' in query['sql'] and '"jti" =' in query['sql']
+        ]
+        self.assertEqual(lookups, [])
+
+    def test_logged_out_token_is_rejected(self):
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        response = self.client.post('/api/auth/logout/', {'refresh_token': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+
+    @override_settings(TOKEN_REVOCATION_POLL_SECONDS=0)
+    def test_revocations_by_other_workers_are_picked_up(self):
+        token = RefreshToken.for_user(self.user)
+        self.assertFalse(is_revoked(token['jti']))
+        # Another worker blacklists the token; this process learns it on its next poll
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+        self.assertTrue(is_revoked(token['jti']))
+        clear_revocation_cache()
+        self.assertTrue(is_revoked(token['jti']))
+
+    def test_prune_tokens_deletes_expired_tokens_in_batches(self):
+        now = timezone.now()
+        for index in range(5):
+            expires_at = now - timedelta(days=1) if index % 2 else now + timedelta(days=1)
+            token = OutstandingToken.objects.create(
+                user=self.user, jti=f'jti-{index}', token='token', expires_at=expires_at
+            )
+            BlacklistedToken.objects.create(token=token)
+
+        out = StringIO()
+        call_command('prune_tokens', batch_size=1, stdout=out)
+        self.assertIn('Deleted 2 expired tokens', out.getvalue())
+        self.assertEqual(
+            sorted(OutstandingToken.objects.values_list('jti', flat=True)), ['jti-0', 'jti-2', 'jti-4']
+        )
+        self.assertEqual(BlacklistedToken.objects.count(), 3)
+
+
+THROTTLED = {
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'login_ip': '3/min', 'login_username': '2/min', 'register_ip': '1/hour'},
+}
+
+
+@override_settings(
+    REST_FRAMEWORK=THROTTLED,
+    PASSWORD_HASHERS=['authentication.tests.CountingPasswordHasher'],
+)
+class LoginThrottleTests(TestCase):
+    """Login and register bursts are rejected before any password hashing or query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('target', 'target@example.com', 'secret-pass')
+        cls.staff = User.objects.create_user('ops', 'ops@example.com', 'secret-pass', is_staff=True)
+
+    def setUp(self):
+        caches['throttle'].clear()
+        CountingPasswordHasher.computations = 0
+        self.client = APIClient()
+
+    def login(self, username, address='10.0.0.1'):
+        return self.client.post(
+            '/api/auth/login/', {'username': username, 'password': 'wrong'}, format='json', REMOTE_ADDR=address
+        )
+
+    def test_address_is_limited(self):
+        for username in ('a', 'b', 'c'):
+            self.assertEqual(self.login(username).status_code, 401)
+        with self.assertNumQueries(0):
+            response = self.login('d')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(CountingPasswordHasher.computations, 3)
+        self.assertEqual(self.login('e', address='10.0.0.2').status_code, 401)
+
+    def test_username_is_limited_across_addresses(self):
+        self.assertEqual(self.login('target', address='10.0.0.1').status_code, 401)
+        self.assertEqual(self.login('Target', address='10.0.0.2').status_code, 401)
+        self.assertEqual(self.login('target', address='10.0.0.3').status_code, 429)
+        self.assertEqual(CountingPasswordHasher.computations, 2)
+
+    def test_register_is_limited(self):
+        payload = {'username': 'first', 'email': 'first@example.com', 'password': 'secret-pass'}
+        self.assertEqual(self.client.post('/api/auth/register/', payload, format='json').status_code, 201)
+        payload = {'username': 'second', 'email': 'second@example.com', 'password': 'secret-pass'}
+        with self.assertNumQueries(0):
+            response = self.client.post('/api/auth/register/', payload, format='json')
+        self.assertEqual(response.status_code, 429)
+
+    def test_metrics_count_allowed_and_rejected_requests(self):
+        for _ in range(4):
+            self.login('target')
+        metrics = throttle_metrics()
+        self.assertEqual(metrics['login_ip'], {'allowed': 3, 'rejected': 1})
+        # The fourth attempt is rejected by both throttles
+        self.assertEqual(metrics['login_username'], {'allowed': 2, 'rejected': 2})
+
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.get('/api/auth/throttle-metrics/').data, metrics)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/auth/throttle-metrics/').status_code, 403)
+
+
+@override_settings(PASSWORD_HASHERS=['authentication.tests.CountingPasswordHasher'])
+class AccountWriteTests(IndexUsageMixin, TestCase):
+    """Registration, profile updates and bulk provisioning check uniqueness in one query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('taken', 'taken@example.com', 'secret-pass', first_name='Tae')
+        cls.staff = User.objects.create_user('admin', 'admin@example.com', 'secret-pass', is_staff=True)
+
+    def setUp(self):
+        caches['throttle'].clear()
+        clear_user_cache()
+        CountingPasswordHasher.computations = 0
+        self.client = APIClient()
+
+    def register(self, username, email):
+        return self.client.post('/api/auth/register/', {
+            'username': username, 'email': email, 'password': 'secret-pass',
+        }, format='json')
+
+    def test_register_conflicts_take_one_query(self):
+        for username, email, error in (
+            ('taken', 'new@example.com', 'Username already exists'),
+            ('newcomer', 'taken@example.com', 'Email already exists'),
+            ('taken', 'admin@example.com', 'Username already exists'),
+            ('newcomer', 'Taken@Example.com', 'Email already exists'),
+        ):
+            with self.assertNumQueries(1):
+                response = self.register(username, email)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data['error'], error)
+        self.assertEqual(CountingPasswordHasher.computations, 0)
+        self.assertEqual(self.register('newcomer', 'new@example.com').status_code, 201)
+
+    def test_uniqueness_check_uses_indexes(self):
+        self.assertUsesIndex('auth_user', lambda: self.register('taken', 'TAKEN@example.com'))
+
+    def test_database_rejects_duplicate_emails(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user('twin', 'TAKEN@example.com')
+        # Blank emails are not unique
+        User.objects.create_user('blank1')
+        User.objects.create_user('blank2')
+
+    def test_profile_email_conflicts_ignore_case(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.patch('/api/auth/profile/update/', {'email': 'ADMIN@example.com'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Email already exists')
+
+    def test_profile_update_writes_changed_fields_only(self):
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch('/api/auth/profile/update/', {
+                'first_name': 'Tae', 'last_name': 'Kim', 'email': 'taken@example.com',
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"last_name"', updates[0])
+        self.assertNotIn('"email"', updates[0])
+        self.assertNotIn('"password"', updates[0])
+
+        # Nothing changed: no write (the forced user is already loaded)
+        with self.assertNumQueries(0):
+            response = self.client.patch('/api/auth/profile/update/', {'last_name': 'Kim'}, format='json')
+        self.assertEqual(response.data['user']['last_name'], 'Kim')
+
+    def test_provision_users(self):
+        self.client.force_authenticate(self.staff)
+        rows = [
+            {'username': 'stylist1', 'email': 'stylist1@example.com', 'password': 'secret-pass'},
+            {'username': 'stylist2', 'email': 'stylist2@example.com', 'first_name': 'Sam'},
+            {'username': 'taken', 'email': 'other@example.com'},
+            {'username': 'stylist3', 'email': 'Stylist1@example.com'},
+            {'username': 'bad name!', 'email': 'not-an-email'},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/auth/users/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['index'] for error in response.data['errors']], [2, 3, 4])
+        self.assertIn('username', response.data['errors'][0]['errors'])
+        self.assertIn('email', response.data['errors'][1]['errors'])
+        self.assertEqual(set(response.data['errors'][2]['errors']), {'username', 'email'})
+        # Conflict lookup and the insert, not one lookup per row
+        self.assertEqual(len([q for q in queries.captured_queries if 'auth_user' in q['sql']]), 2)
+
+        self.assertTrue(User.objects.get(username='stylist1').check_password('secret-pass'))
+        self.assertFalse(User.objects.get(username='stylist2').has_usable_password())
+        self.assertEqual(User.objects.get(username='stylist2').first_name, 'Sam')
+
+    def test_provision_users_rejections(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.post('/api/auth/users/bulk/', [{'username': 'taken', 'email': 'x@example.com'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(self.client.post('/api/auth/users/bulk/', {}, format='json').status_code, 400)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post('/api/auth/users/bulk/', [], format='json').status_code, 403)
+
+
+class EmailUniqueMigrationTests(TransactionTestCase):
+    """The unique email index is not built over users that already share an email"""
+
+    migrate_from = [('authentication', None)]
+    migrate_to = [('authentication', '0001_user_email_unique')]
+
+    def tearDown(self):
+        User.objects.filter(username__in=['ann', 'anne', 'bob']).delete()
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicate_emails_abort_the_migration(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        User.objects.create_user('ann', 'Ann@example.com')
+        User.objects.create_user('anne', 'ann@EXAMPLE.com')
+        User.objects.create_user('bob', 'bob@example.com')
+
+        executor = MigrationExecutor(connection)
+        with self.assertRaisesMessage(RuntimeError, 'ann@example.com: ann, anne'):
+            executor.migrate(self.migrate_to)
@@ -0,0 +1,126 @@
+"""
+Rate limits for the unauthenticated login and register endpoints.
+
+DRF checks throttles in `initial()`, before the handler runs, so a rejected
+request costs a few cache operations and no password hashing or user
+queries. Counters live in the `throttle` cache alias (LocMem with a bounded
+number of entries, or Redis with REDIS_URL, see CACHES).
+
+Each throttle uses a sliding window counter: one integer per key and window,
+with the previous window's count weighted by how much of it still overlaps
+the sliding window. That is two integers per client instead of DRF's list of
+request timestamps.
+
+Allowed and rejected requests are counted per scope; see `throttle_metrics`
+and the /api/auth/throttle-metrics/ endpoint.
+"""
+import time
+
+from django.core.cache import caches
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+OUTCOMES = ('allowed', 'rejected')
+
+
+def throttle_cache():
+    return caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60)"""
+    count, period = rate.split('/')
+    return int(count), DURATIONS[period[0]]
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Limit requests per key to the `scope` rate in DEFAULT_THROTTLE_RATES.
+
+    Subclasses set `scope` and implement `get_key` (None skips the throttle).
+    """
+
+    scope = None
+
+    def get_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        key = self.get_key(request, view)
+        if rate is None or key is None:
+            return True
+        self.limit, self.window = parse_rate(rate)
+
+        now = time.time()
+        current = int(now // self.window)
+        self.elapsed = now - current * self.window
+        cache = throttle_cache()
+        current_key = f'throttle:{self.scope}:{key}:{current}'
+        counts = cache.get_many([current_key, f'throttle:{self.scope}:{key}:{current - 1}'])
+        previous_count = counts.get(f'throttle:{self.scope}:{key}:{current - 1}', 0)
+        estimate = previous_count * (1 - self.elapsed / self.window) + counts.get(current_key, 0)
+
+        allowed = estimate < self.limit
+        if allowed:
+            # Counts expire once they can no longer weigh on the sliding window
+            if not cache.add(current_key, 1, timeout=2 * self.window):
+                try:
+                    cache.incr(current_key)
+                except ValueError:
+                    cache.add(current_key, 1, timeout=2 * self.window)
+        record_outcome(self.scope, allowed)
+        return allowed
+
+    def wait(self):
+        return self.window - self.elapsed
+
+
+class LoginIPThrottle(SlidingWindowThrottle):
+    scope = 'login_ip'
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class LoginUsernameThrottle(SlidingWindowThrottle):
+    """Per account limit, so attempts spread over many addresses are still bounded"""
+
+    scope = 'login_username'
+
+    def get_key(self, request, view):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not isinstance(username, str) or not username:
+            return None
+        # Usernames are case sensitive but attackers can vary the case freely
+        return username.strip().lower()[:150]
+
+
+class RegisterIPThrottle(SlidingWindowThrottle):
+    scope = 'register_ip'
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+def record_outcome(scope, allowed):
+    cache = throttle_cache()
+    key = f'throttle-metrics:{scope}:{OUTCOMES[0] if allowed else OUTCOMES[1]}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def throttle_metrics():
+    """{scope: {'allowed': n, 'rejected': n}} since the counters were last reset"""
+    scopes = sorted(api_settings.DEFAULT_THROTTLE_RATES)
+    keys = [f'throttle-metrics:{scope}:{outcome}' for scope in scopes for outcome in OUTCOMES]
+    values = throttle_cache().get_many(keys)
+    return {
+        scope: {outcome: values.get(f'throttle-metrics:{scope}:{outcome}', 0) for outcome in OUTCOMES}
+        for scope in scopes
+    }
@@ -1,9 +1,11 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     CustomTokenObtainPairView,
+    CustomTokenRefreshView,
     logout_view,
+    provision_users_view,
     register_view,
+    throttle_metrics_view,
     user_profile_view,
     update_profile_view
 )
@@ -11,9 +13,13 @@ from .views import (
 urlpatterns = [
     # Authentication endpoints
     path('login/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     path('logout/', logout_view, name='logout'),
     path('register/', register_view, name='register'),
+    path('throttle-metrics/', throttle_metrics_view, name='throttle_metrics'),
+    
+    # Staff onboarding: create many users at once
+    path('users/bulk/', provision_users_view, name='provision_users'),
     
     # User profile endpoints
     path('profile/', user_profile_view, name='user_profile'),
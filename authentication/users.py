@@ -0,0 +1,128 @@
+"""
+Request users built from JWT claims.
+
+ActiveClaimsAuthentication (see REST_FRAMEWORK in settings) turns the access
+token into a ClaimsUser: id, username, email, names and staff flags are the
+claims added by CustomTokenObtainPairSerializer.get_token. Whether the user
+still exists and is active, and its staff and superuser flags, are read from
+a small per-process cache of User rows kept for JWT_USER_CACHE_SECONDS, so a user costs one query per
+cache period rather than one per request. Deactivating or deleting a user
+locks them out at once in the process that made the change and within
+JWT_USER_CACHE_SECONDS everywhere else. Views that need the actual User row
+(profile fields not in the token, writes) call `full_user(request)`, which
+reads the same cache.
+
+Claims are fixed when the token is issued: profile changes show up in them
+after the next login.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.db.models.functions import Lower
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+
+# Cached users at most; beyond this expired entries are dropped, then everything
+MAX_CACHED_USERS = 1000
+
+_users = {}
+_lock = threading.Lock()
+
+
+class ClaimsUser(TokenUser):
+    """Token backed user; custom claims (email, first_name, ...) read as attributes"""
+
+    def __str__(self):
+        return self.username or super().__str__()
+
+
+def get_user(user_id, fresh=False):
+    """
+    Active User row for a token's user id, served from the per-process cache
+    unless `fresh` (use it before writes). Raises AuthenticationFailed when
+    the user no longer exists or was deactivated.
+    """
+    now = time.monotonic()
+    if not fresh:
+        with _lock:
+            entry = _users.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None:
+        forget_user(user_id)
+        raise AuthenticationFailed('User not found', code='user_not_found')
+    remember_user(user)
+    return user
+
+
+def remember_user(user):
+    """Cache a just loaded or saved User row; inactive users are dropped instead"""
+    if not user.is_active:
+        forget_user(user.pk)
+        return
+    timeout = getattr(settings, 'JWT_USER_CACHE_SECONDS', 0)
+    if not timeout:
+        return
+    now = time.monotonic()
+    with _lock:
+        if len(_users) >= MAX_CACHED_USERS:
+            for key in [key for key, (expires, _) in _users.items() if expires <= now]:
+                del _users[key]
+            if len(_users) >= MAX_CACHED_USERS:
+                _users.clear()
+        _users[user.pk] = (now + timeout, user)
+
+
+class ActiveClaimsAuthentication(JWTStatelessUserAuthentication):
+    """
+    Claims based authentication that rejects tokens of deleted or deactivated
+    users. Permission flags come from the User row, not from the token, so a
+    demoted staff user loses access within JWT_USER_CACHE_SECONDS.
+    """
+
+    def get_user(self, validated_token):
+        token_user = super().get_user(validated_token)
+        # Raises AuthenticationFailed; served from the cache within JWT_USER_CACHE_SECONDS
+        user = get_user(token_user.id)
+        token_user.is_staff = user.is_staff
+        token_user.is_superuser = user.is_superuser
+        return token_user
+
+
+def matching_users(usernames=(), emails=()):
+    """
+    Users holding any of the usernames or, ignoring case, any of the emails.
+
+    One query; the username unique index and the lower(email) unique index
+    answer it, so callers can check both kinds of conflict at once. The
+    blank-email exclusion repeats the partial index condition (migration 0001).
+    """
+    condition = Q(username__in=[username for username in usernames if username])
+    keys = [email.lower() for email in emails if email]
+    if keys:
+        condition |= Q(email_key__in=keys) & ~Q(email='')
+    return User.objects.alias(email_key=Lower('email')).filter(condition)
+
+
+def full_user(request, fresh=False):
+    """The User row behind request.user (which may be a ClaimsUser)"""
+    if isinstance(request.user, TokenUser):
+        return get_user(request.user.id, fresh=fresh)
+    return request.user
+
+
+def forget_user(user_id):
+    """Drop a user from this process's cache (other processes expire it on their own)"""
+    with _lock:
+        _users.pop(user_id, None)
+
+
+def clear_user_cache():
+    with _lock:
+        _users.clear()
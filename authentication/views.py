@@ -1,16 +1,20 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from django.contrib.auth import authenticate
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from .provisioning import provision_users
+from .revocation import RefreshToken
+from .throttling import LoginIPThrottle, LoginUsernameThrottle, RegisterIPThrottle, throttle_metrics
+from .users import full_user, matching_users
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Custom token serializer to include additional user information"""
+    token_class = RefreshToken
     
     @classmethod
     def get_token(cls, user):
@@ -25,30 +29,38 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['is_superuser'] = user.is_superuser
         
         return token
+    
+    def validate(self, attrs):
+        # The parent authenticates once and keeps the user on self.user;
+        # build the user block from it instead of authenticating again
+        data = super().validate(attrs)
+        data['user'] = {
+            'id': self.user.id,
+            'username': self.user.username,
+            'email': self.user.email,
+            'first_name': self.user.first_name,
+            'last_name': self.user.last_name,
+            'is_staff': self.user.is_staff,
+            'is_superuser': self.user.is_superuser,
+        }
+        return data
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
-    """Custom login view that returns JWT tokens with user info"""
+    """Custom login view that returns JWT tokens with user info (credentials are checked once)"""
     serializer_class = CustomTokenObtainPairSerializer
-    
-    def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        if response.status_code == 200:
-            user = authenticate(
-                username=request.data.get('username'),
-                password=request.data.get('password')
-            )
-            if user:
-                response.data['user'] = {
-                    'id': user.id,
-                    'username': user.username,
-                    'email': user.email,
-                    'first_name': user.first_name,
-                    'last_name': user.last_name,
-                    'is_staff': user.is_staff,
-                    'is_superuser': user.is_superuser,
-                }
-        return response
+    # Checked before the serializer runs: throttled attempts never reach password hashing
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh serializer checking the blacklist against the in-memory revocation set"""
+    token_class = RefreshToken
+
+
+class CustomTokenRefreshView(TokenRefreshView):
+    """Token refresh (rotation blacklists the used refresh token) without blacklist queries"""
+    serializer_class = CustomTokenRefreshSerializer
 
 
 @api_view(['POST'])
@@ -79,8 +91,19 @@ def logout_view(request):
         )
 
 
+def registration_conflict(username, email):
+    """Error message for a username or email already in use, None when both are free"""
+    conflicts = list(matching_users([username], [email]).values_list('username', flat=True)[:2])
+    if username in conflicts:
+        return "Username already exists"
+    if conflicts:
+        return "Email already exists"
+    return None
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([RegisterIPThrottle])
 def register_view(request):
     """
     User registration view
@@ -99,29 +122,29 @@ def register_view(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        if User.objects.filter(username=username).exists():
-            return Response(
-                {"error": "Username already exists"}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        # One query for both uniqueness checks (emails compare ignoring case)
+        conflict = registration_conflict(username, email)
+        if conflict:
+            return Response({"error": conflict}, status=status.HTTP_400_BAD_REQUEST)
         
-        if User.objects.filter(email=email).exists():
+        # Create user; the unique username and email indexes catch concurrent registrations
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    username=username,
+                    email=email,
+                    password=password,
+                    first_name=first_name,
+                    last_name=last_name
+                )
+        except IntegrityError:
             return Response(
-                {"error": "Email already exists"}, 
+                {"error": registration_conflict(username, email) or "Username or email already exists"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create user
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            password=password,
-            first_name=first_name,
-            last_name=last_name
-        )
-        
-        # Generate tokens
-        refresh = RefreshToken.for_user(user)
+        # Generate tokens (with the same claims as login, see users.py)
+        refresh = CustomTokenObtainPairSerializer.get_token(user)
         
         return Response({
             "message": "User created successfully",
@@ -151,7 +174,7 @@ def user_profile_view(request):
     """
     Get current user profile information
     """
-    user = request.user
+    user = full_user(request)
     return Response({
         "id": user.id,
         "username": user.username,
@@ -171,23 +194,34 @@ def update_profile_view(request):
     """
     Update current user profile information
     """
-    user = request.user
+    user = full_user(request, fresh=True)
     
-    # Update fields if provided
-    if 'first_name' in request.data:
-        user.first_name = request.data['first_name']
-    if 'last_name' in request.data:
-        user.last_name = request.data['last_name']
-    if 'email' in request.data:
+    # Update fields if provided and different; only those columns are written
+    changed = []
+    for field in ('first_name', 'last_name'):
+        if field in request.data and request.data[field] != getattr(user, field):
+            setattr(user, field, request.data[field])
+            changed.append(field)
+    if 'email' in request.data and request.data['email'] != user.email:
         email = request.data['email']
-        if User.objects.filter(email=email).exclude(id=user.id).exists():
+        if matching_users(emails=[email]).exclude(id=user.id).exists():
             return Response(
                 {"error": "Email already exists"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         user.email = email
+        changed.append('email')
     
-    user.save()
+    if changed:
+        try:
+            with transaction.atomic():
+                user.save(update_fields=changed)
+        except IntegrityError:
+            # Only the email can clash: taken by a concurrent request
+            return Response(
+                {"error": "Email already exists"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
     
     return Response({
         "message": "Profile updated successfully",
@@ -198,4 +232,71 @@ def update_profile_view(request):
             "first_name": user.first_name,
             "last_name": user.last_name,
         }
-    })
\ No newline at end of file
+    })
+
+
+# Maximum number of users accepted by a single provisioning request
+PROVISION_MAX_USERS = 500
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def provision_users_view(request):
+    """
+    Create many user accounts in a single request (staff only)
+    
+    Expects a JSON list of users (username, email, optional password, first_name,
+    last_name, is_staff). Valid users are inserted together; invalid ones are
+    reported by index.
+    """
+    rows = request.data
+    if not isinstance(rows, list) or not rows:
+        return Response(
+            {"error": "A non-empty list of users is required"}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(rows) > PROVISION_MAX_USERS:
+        return Response(
+            {"error": f"At most {PROVISION_MAX_USERS} users can be created per request"}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        users, errors = provision_users(rows)
+    except IntegrityError:
+        return Response(
+            {"error": "Some usernames or emails were taken while the request was processed; retry it"}, 
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    if not users:
+        response_status = status.HTTP_400_BAD_REQUEST
+    elif errors:
+        response_status = status.HTTP_207_MULTI_STATUS
+    else:
+        response_status = status.HTTP_201_CREATED
+    
+    return Response({
+        "created": len(users),
+        "users": [
+            {
+                "id": user.id,
+                "username": user.username,
+                "email": user.email,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "is_staff": user.is_staff,
+            }
+            for user in users
+        ],
+        "errors": errors,
+    }, status=response_status)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def throttle_metrics_view(request):
+    """
+    Allowed and rejected requests per throttle scope (login_ip, login_username, register_ip)
+    """
+    return Response(throttle_metrics())
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Customer, AppointmentType, Appointment
+from .models import Customer, AppointmentType, Appointment, Segment
 
 
 @admin.register(Customer)
@@ -104,3 +104,24 @@ class AppointmentAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
         return queryset.select_related('customer', 'appointment_type')
+
+
+@admin.register(Segment)
+class SegmentAdmin(admin.ModelAdmin):
+    list_display = ['uuid', 'name', 'created_at', 'updated_at']
+    search_fields = ['name', 'description']
+    readonly_fields = ['uuid', 'created_at', 'updated_at']
+    
+    fieldsets = (
+        ('Basic Information', {
+            'fields': ('uuid', 'name', 'description')
+        }),
+        ('Definition', {
+            'fields': ('definition',)
+        }),
+        ('Timestamps', {
+            'fields': ('created_at', 'updated_at')
+        }),
+    )
+    
+    list_per_page = 25
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class CustomerRelationshipConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'customer_relationship'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import repair_search_index
+        post_migrate.connect(repair_search_index, sender=self)
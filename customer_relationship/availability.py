@@ -0,0 +1,215 @@
+"""
+Appointment availability: double-booking checks and free slot search.
+
+Every appointment type is one bookable resource, so two scheduled or
+confirmed appointments of the same type must not overlap. Busy intervals are
+read with a single range scan on the partial (appointment_type, start_time,
+end_time) index. The scan is bounded on both sides of start_time because the
+database rejects appointments longer than MAX_APPOINTMENT_DURATION.
+
+Writes re-check the slot inside their transaction after locking the
+appointment type row (`slot_taken`), so bookings of one type are
+serialized. On PostgreSQL the `appointments_no_overlap` exclusion
+constraint (migration 0010) enforces the rule in the database as well.
+"""
+import bisect
+import uuid
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+
+from .models import MAX_APPOINTMENT_DURATION, Appointment, AppointmentType
+
+# Statuses that occupy their time slot
+ACTIVE_STATUSES = ('scheduled', 'confirmed')
+
+# Longest date range a single availability query may cover
+MAX_RANGE_DAYS = 31
+
+OVERLAP_MESSAGE = 'This time slot overlaps another appointment of the same type.'
+OVERLAP_CONSTRAINT = 'appointments_no_overlap'
+
+
+def max_duration():
+    """Longest appointment the API accepts, never beyond what the database allows"""
+    return min(getattr(settings, 'APPOINTMENT_MAX_DURATION', timedelta(hours=12)), MAX_APPOINTMENT_DURATION)
+
+
+def business_hours():
+    return (
+        parse_time(getattr(settings, 'APPOINTMENT_OPENING_TIME', '09:00')),
+        parse_time(getattr(settings, 'APPOINTMENT_CLOSING_TIME', '18:00')),
+    )
+
+
+def slot_minutes():
+    return getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 30)
+
+
+def overlapping(appointment_type, start, end, exclude=None):
+    """Active appointments of the type that overlap [start, end)"""
+    queryset = Appointment.objects.filter(
+        appointment_type=appointment_type,
+        status__in=ACTIVE_STATUSES,
+        start_time__gt=start - MAX_APPOINTMENT_DURATION,
+        start_time__lt=end,
+        end_time__gt=start,
+    )
+    if exclude is not None:
+        queryset = queryset.exclude(pk=exclude)
+    return queryset
+
+
+def slot_taken(appointment_type, start, end, exclude=None):
+    """
+    Whether [start, end) overlaps an active appointment of the type, checked
+    under a lock on the type row: call inside the transaction that writes
+    the appointment so concurrent bookings of the type wait for it to commit.
+    """
+    AppointmentType.objects.select_for_update().filter(pk=getattr(appointment_type, 'pk', appointment_type)).first()
+    return overlapping(appointment_type, start, end, exclude=exclude).exists()
+
+
+def is_overlap_violation(error):
+    """Whether an IntegrityError comes from the PostgreSQL exclusion constraint"""
+    return OVERLAP_CONSTRAINT in str(error)
+
+
+def busy_intervals(appointment_type, start, end):
+    """Merged, sorted (start, end) intervals occupied between start and end"""
+    rows = overlapping(appointment_type, start, end).order_by('start_time').values_list(
+        'start_time', 'end_time'
+    )
+    return merge_intervals(rows)
+
+
+def merge_intervals(intervals):
+    """Merge intervals sorted by start into disjoint intervals"""
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_slots(busy, start, end, duration, step=None, opening=None, closing=None):
+    """
+    Slots of `duration` inside business hours between start and end that do not overlap busy.
+
+    Slots sit on a grid of `step` (defaults to duration) anchored at opening
+    time each day. `busy` must be merged and sorted (see busy_intervals), so
+    for any candidate slot only the last busy interval starting before the
+    slot ends can overlap it; that interval is found by bisecting the sorted
+    start times, and an overlap moves the candidate past its end.
+    """
+    step = step or duration
+    default_opening, default_closing = business_hours()
+    opening = opening or default_opening
+    closing = closing or default_closing
+
+    starts = [interval[0] for interval in busy]
+    slots = []
+    day = timezone.localtime(start).date()
+    last_day = timezone.localtime(end).date()
+    while day <= last_day:
+        origin = timezone.make_aware(datetime.combine(day, opening))
+        window_start = max(start, origin)
+        window_end = min(end, timezone.make_aware(datetime.combine(day, closing)))
+
+        slot = _next_on_grid(window_start, origin, step)
+        while slot + duration <= window_end:
+            slot_end = slot + duration
+            index = bisect.bisect_left(starts, slot_end) - 1
+            if index >= 0 and busy[index][1] > slot:
+                slot = _next_on_grid(busy[index][1], origin, step)
+                continue
+            slots.append((slot, slot_end))
+            slot += step
+        day += timedelta(days=1)
+    return slots
+
+
+def _next_on_grid(moment, origin, step):
+    """First grid point (origin + n * step) at or after moment"""
+    if moment <= origin:
+        return origin
+    return origin + -((origin - moment) // step) * step
+
+
+def parse_availability_params(query_params):
+    """
+    Validate availability query parameters.
+
+    Supported parameters:
+    - appointment_type: appointment type uuid (required)
+    - date_from / date_to: inclusive dates (YYYY-MM-DD); date_from defaults
+      to today, date_to to a week after date_from
+    - duration: slot length in minutes (defaults to APPOINTMENT_SLOT_MINUTES)
+    - opening / closing: business hours (HH:MM) overriding the settings
+
+    Raises ValueError with a user facing message on invalid input.
+    """
+    value = query_params.get('appointment_type')
+    if not value:
+        raise ValueError('appointment_type parameter is required')
+    try:
+        params = {'appointment_type': uuid.UUID(value)}
+    except ValueError:
+        raise ValueError('appointment_type must be a valid uuid')
+
+    for param in ('date_from', 'date_to'):
+        value = query_params.get(param)
+        if value:
+            params[param] = parse_date(value)
+            if params[param] is None:
+                raise ValueError(f'{param} must be a date in YYYY-MM-DD format')
+    params.setdefault('date_from', timezone.localdate())
+    params.setdefault('date_to', params['date_from'] + timedelta(days=6))
+    if params['date_from'] > params['date_to']:
+        raise ValueError('date_from must be before or equal to date_to')
+    if (params['date_to'] - params['date_from']).days >= MAX_RANGE_DAYS:
+        raise ValueError(f'The date range can cover at most {MAX_RANGE_DAYS} days')
+
+    try:
+        minutes = int(query_params.get('duration', slot_minutes()))
+    except ValueError:
+        raise ValueError('duration must be a number of minutes')
+    if not 0 < minutes <= max_duration() / timedelta(minutes=1):
+        raise ValueError('duration must be positive and within the maximum appointment length')
+    params['duration'] = timedelta(minutes=minutes)
+
+    opening, closing = business_hours()
+    for param, default in (('opening', opening), ('closing', closing)):
+        value = query_params.get(param)
+        params[param] = parse_time(value) if value else default
+        if params[param] is None:
+            raise ValueError(f'{param} must be a time in HH:MM format')
+    if params['opening'] >= params['closing']:
+        raise ValueError('opening must be before closing')
+
+    return params
+
+
+def find_availability(appointment_type, date_from, date_to, duration, opening, closing, now=None):
+    """Free slots and merged busy intervals for an appointment type over a date range"""
+    start = timezone.make_aware(datetime.combine(date_from, time.min))
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    busy = busy_intervals(appointment_type, start, end)
+    # Slots in the past cannot be booked
+    slot_start = max(start, now or timezone.now())
+    return {
+        'appointment_type': appointment_type.uuid,
+        'date_from': date_from,
+        'date_to': date_to,
+        'duration_minutes': int(duration / timedelta(minutes=1)),
+        'busy': [{'start': busy_start, 'end': busy_end} for busy_start, busy_end in busy],
+        'slots': [
+            {'start': slot, 'end': slot_end}
+            for slot, slot_end in free_slots(busy, slot_start, end, duration, opening=opening, closing=closing)
+        ],
+    }
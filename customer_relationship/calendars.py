@@ -0,0 +1,110 @@
+"""
+Compact calendar payloads for week and month appointment views.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import serializers
+
+from .models import MAX_APPOINTMENT_DURATION
+
+# Longest range a single calendar request may cover (a month view plus leading/trailing weeks)
+MAX_RANGE_DAYS = 62
+
+# Appointment columns in the payload; names live in the lookup tables
+CALENDAR_COLUMNS = ('uuid', 'start_time', 'end_time', 'status', 'appointment_type', 'customer')
+
+_datetime = serializers.DateTimeField()
+
+
+def parse_calendar_range(query_params):
+    """
+    Validate the start/end calendar parameters.
+
+    Each accepts a date (YYYY-MM-DD, whole local day, end inclusive) or an
+    ISO datetime (end exclusive). Returns aware (start, end) datetimes and
+    raises ValueError with a user facing message on invalid input.
+    """
+    bounds = []
+    for param in ('start', 'end'):
+        value = query_params.get(param)
+        if not value:
+            raise ValueError(f'{param} parameter is required')
+
+        moment = parse_datetime(value) if 'T' in value or ' ' in value else None
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(f'{param} must be a date (YYYY-MM-DD) or an ISO datetime')
+            if param == 'end':
+                day += timedelta(days=1)
+            moment = datetime.combine(day, time.min)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        bounds.append(moment)
+
+    start, end = bounds
+    if start >= end:
+        raise ValueError('start must be before end')
+    if end - start > timedelta(days=MAX_RANGE_DAYS):
+        raise ValueError(f'The calendar range can cover at most {MAX_RANGE_DAYS} days')
+    return start, end
+
+
+def calendar_rows(queryset, start, end):
+    """
+    Appointments overlapping [start, end) as flat tuples, in one query.
+
+    The lower start_time bound (the database rejects appointments longer
+    than MAX_APPOINTMENT_DURATION) keeps this a bounded range scan on the
+    start_time indexes.
+    """
+    return (
+        queryset.filter(
+            start_time__gt=start - MAX_APPOINTMENT_DURATION,
+            start_time__lt=end,
+            end_time__gt=start,
+        )
+        .order_by('start_time', 'uuid')
+        .values_list(
+            'uuid', 'start_time', 'end_time', 'status',
+            'appointment_type_id', 'appointment_type__description',
+            'customer_id', 'customer__first_name', 'customer__last_name',
+        )
+    )
+
+
+def build_calendar(rows, start, end):
+    """
+    Columnar calendar payload.
+
+    `appointments` maps each column in CALENDAR_COLUMNS to a list holding
+    that value for every appointment (the i-th entries of all lists describe
+    the i-th appointment), so keys are not repeated per appointment.
+    Appointment type descriptions and customer names are sent once each in
+    the `appointment_types` and `customers` lookup tables keyed by uuid.
+    """
+    columns = {column: [] for column in CALENDAR_COLUMNS}
+    appointment_types = {}
+    customers = {}
+    for uuid, start_time, end_time, status, type_id, description, customer_id, first_name, last_name in rows:
+        type_key = str(type_id)
+        customer_key = str(customer_id)
+        columns['uuid'].append(str(uuid))
+        columns['start_time'].append(_datetime.to_representation(start_time))
+        columns['end_time'].append(_datetime.to_representation(end_time))
+        columns['status'].append(status)
+        columns['appointment_type'].append(type_key)
+        columns['customer'].append(customer_key)
+        appointment_types[type_key] = description
+        customers[customer_key] = f'{first_name} {last_name}'
+
+    return {
+        'start': _datetime.to_representation(start),
+        'end': _datetime.to_representation(end),
+        'count': len(columns['uuid']),
+        'appointments': columns,
+        'appointment_types': appointment_types,
+        'customers': customers,
+    }
@@ -0,0 +1,164 @@
+import csv
+import io
+import json
+
+from rest_framework import serializers
+
+from .labels import sync_labels
+from .models import Customer
+from .segments import invalidate_segments
+from .serializers import CustomerCreateSerializer
+from .stats import create_empty_stats
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# Fields written on insert and overwritten on update (matched by email)
+IMPORT_FIELDS = [
+    'first_name', 'last_name', 'nickname', 'phone', 'date_of_birth', 'gender',
+    'is_active', 'address_street', 'address_number', 'address_neighborhood',
+    'address_city', 'address_state', 'address_zip_code', 'address_country',
+    'preferences', 'tags',
+]
+
+# CSV cells holding lists use the same comma separated form as ?tags=VIP,Diabetic
+LIST_FIELDS = ('preferences', 'tags')
+
+MAX_REPORTED_ERRORS = 100
+
+
+class CustomerImportSerializer(CustomerCreateSerializer):
+    """
+    Serializer used to validate imported customer rows.
+
+    Same rules as customer creation (including validate_preferences and
+    validate_tags) except that an existing email is not an error: the row
+    updates that customer instead.
+    """
+    email = serializers.EmailField(max_length=254)
+
+
+def detect_format(filename, default='csv'):
+    """Guess the import format from a file name"""
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def read_rows(stream, file_format):
+    """
+    Incrementally yield customer dicts from a binary or text stream.
+
+    Only the current line is held in memory, whatever the file size.
+    """
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported format '{file_format}', use one of: {', '.join(IMPORT_FORMATS)}")
+
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    if file_format == 'ndjson':
+        for line in stream:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield {'__error__': 'Invalid JSON line'}
+        return
+
+    for row in csv.DictReader(stream):
+        row = {key.strip(): value for key, value in row.items() if key}
+        for field in LIST_FIELDS:
+            if field in row:
+                row[field] = [value.strip() for value in (row[field] or '').split(',') if value.strip()]
+        yield {key: value for key, value in row.items() if value != ''}
+
+
+class CustomerImporter:
+    """
+    Batched customer upsert pipeline.
+
+    Rows are validated a batch at a time with a single serializer instance,
+    then written with one INSERT ... ON CONFLICT (email) DO UPDATE per batch
+    (plus a constant number of queries to sync tag/preference labels), so
+    the cost per customer is a fraction of a POST /api/customers/ call.
+    `progress`, if given, is called with the running report after each batch.
+    """
+
+    def __init__(self, batch_size=1000, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.serializer = CustomerImportSerializer()
+        self.report = {
+            'processed': 0,
+            'created': 0,
+            'updated': 0,
+            'failed': 0,
+            'errors': [],
+        }
+
+    def run(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        return self.report
+
+    def import_batch(self, rows):
+        first_row = self.report['processed'] + 1
+        customers = {}
+        for offset, row in enumerate(rows):
+            data = self.validate_row(row, first_row + offset)
+            if data is not None:
+                # Later rows for the same email win within a batch
+                customers[data['email']] = Customer(**data)
+
+        if customers:
+            existing = set(
+                Customer.objects.filter(email__in=customers.keys()).values_list('email', flat=True)
+            )
+            Customer.objects.bulk_create(
+                customers.values(),
+                update_conflicts=True,
+                unique_fields=['email'],
+                update_fields=IMPORT_FIELDS + ['updated_at'],
+            )
+            # bulk_create sends no signals; refresh the batch's tag/preference labels here
+            sync_labels(
+                Customer.objects.filter(email__in=customers.keys()).only('pk', 'tags', 'preferences')
+            )
+            created = customers.keys() - existing
+            if created:
+                create_empty_stats(
+                    Customer.objects.filter(email__in=created).values_list('pk', flat=True)
+                )
+            invalidate_segments()
+            self.report['created'] += len(created)
+            self.report['updated'] += len(existing)
+
+        self.report['processed'] += len(rows)
+        if self.progress:
+            self.progress(self.report)
+
+    def validate_row(self, row, line):
+        if not isinstance(row, dict) or '__error__' in row:
+            message = row.get('__error__') if isinstance(row, dict) else 'Row must be an object'
+            return self.fail(line, {'non_field_errors': [message]})
+        try:
+            data = self.serializer.run_validation(row)
+        except serializers.ValidationError as e:
+            return self.fail(line, e.detail)
+        return {field: value for field, value in data.items() if field in IMPORT_FIELDS or field == 'email'}
+
+    def fail(self, line, errors):
+        self.report['failed'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            self.report['errors'].append({'row': line, 'errors': errors})
+        return None
@@ -0,0 +1,71 @@
+"""
+Indexed membership rows for the Customer tags/preferences JSON lists.
+
+CustomerLabel holds one (kind, value) row per tag or preference. The rows are
+derived from the JSON fields, kept in sync on save (signals) and by the bulk
+importer, and let audience filters read the (kind, value, customer) index
+instead of decoding JSON on every row.
+"""
+from .models import CustomerLabel
+
+# Label kind -> Customer JSON list field
+LABEL_FIELDS = {
+    'tag': 'tags',
+    'preference': 'preferences',
+}
+
+
+def customer_labels(customer):
+    """(kind, value) pairs currently held in a customer's JSON fields"""
+    return {
+        (kind, value)
+        for kind, field in LABEL_FIELDS.items()
+        for value in getattr(customer, field) or []
+        if isinstance(value, str)
+    }
+
+
+def sync_labels(customers, created=False):
+    """
+    Make the label rows of customers match their JSON fields.
+
+    At most three queries for any number of customers: read the current
+    rows, delete stale ones, insert missing ones. `created` skips the read
+    for customers that were just inserted.
+    """
+    customers = [customer for customer in customers if customer.pk is not None]
+    if not customers:
+        return
+
+    wanted = {
+        (customer.pk, kind, value)
+        for customer in customers
+        for kind, value in customer_labels(customer)
+    }
+    current = {}
+    if not created:
+        rows = CustomerLabel.objects.filter(
+            customer__in=[customer.pk for customer in customers]
+        ).values_list('pk', 'customer_id', 'kind', 'value')
+        current = {(customer_id, kind, value): pk for pk, customer_id, kind, value in rows}
+
+    stale = [pk for key, pk in current.items() if key not in wanted]
+    if stale:
+        CustomerLabel.objects.filter(pk__in=stale).delete()
+
+    missing = wanted - current.keys()
+    if missing:
+        CustomerLabel.objects.bulk_create([
+            CustomerLabel(customer_id=customer_id, kind=kind, value=value)
+            for customer_id, kind, value in missing
+        ])
+
+
+def filter_by_labels(queryset, tags=(), preferences=()):
+    """Customers holding every given tag and preference, via label index lookups"""
+    for kind, values in (('tag', tags), ('preference', preferences)):
+        for value in values:
+            queryset = queryset.filter(
+                pk__in=CustomerLabel.objects.filter(kind=kind, value=value).values('customer_id')
+            )
+    return queryset
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from customer_relationship.importers import CustomerImporter, IMPORT_FORMATS, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import (upsert by email) customers from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the CSV or NDJSON file')
+        parser.add_argument(
+            '--format',
+            choices=IMPORT_FORMATS,
+            help='File format (default: guessed from the file extension)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows validated and written per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or detect_format(options['path'])
+        started = time.monotonic()
+
+        def progress(report):
+            self.stdout.write(
+                f"Processed {report['processed']} rows "
+                f"({report['created']} created, {report['updated']} updated, "
+                f"{report['failed']} failed) in {time.monotonic() - started:.1f}s"
+            )
+
+        importer = CustomerImporter(batch_size=options['batch_size'], progress=progress)
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = importer.run(read_rows(stream, file_format))
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["path"]}: {e}')
+
+        for error in report['errors']:
+            messages = '; '.join(
+                f"{field}: {' '.join(str(message) for message in field_errors)}"
+                for field, field_errors in error['errors'].items()
+            )
+            self.stdout.write(self.style.WARNING(f"Row {error['row']}: {messages}"))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Import finished: {report['created']} created, {report['updated']} updated, "
+                f"{report['failed']} failed"
+            )
+        )
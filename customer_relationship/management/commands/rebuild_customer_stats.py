@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from customer_relationship.stats import rebuild_customer_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-customer lifetime value and visit statistics (backfill or repair)'
+
+    def handle(self, *args, **options):
+        written = rebuild_customer_stats()
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt statistics for {written} customers')
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_relationship', '0003_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status__in', ['scheduled', 'confirmed'])), fields=['appointment_type', 'start_time', 'end_time'], name='appointments_active_slot_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Vendor specific customer search index (SQLite FTS5 / PostgreSQL pg_trgm)
+#
+# The DDL is written out here rather than taken from customer_relationship.search
+# so that this migration keeps building the index as it was at this point.
+
+from django.db import migrations
+
+COLUMNS = (
+    'first_name', 'last_name', 'nickname', 'email', 'phone',
+    'address_city', 'address_state', 'address_country',
+)
+TRIGGERS = ('customers_fts_insert', 'customers_fts_delete', 'customers_fts_update')
+TRIGRAM_GROUPS = {
+    'name': ('first_name', 'last_name', 'nickname'),
+    'contact': ('email', 'phone'),
+    'location': ('address_city', 'address_state', 'address_country'),
+}
+
+
+def sqlite_statements():
+    columns = ', '.join(COLUMNS)
+    new = ', '.join(f'new.{column}' for column in COLUMNS)
+    old = ', '.join(f'old.{column}' for column in COLUMNS)
+    insert = f'INSERT INTO customers_fts(rowid, {columns}) VALUES (new.rowid, {new});'
+    delete = f"INSERT INTO customers_fts(customers_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5({columns}, "
+        f"content='customers', content_rowid='rowid', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f'CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS customers_fts_delete AFTER DELETE ON customers BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS customers_fts_update AFTER UPDATE ON customers BEGIN {delete} {insert} END',
+        "INSERT INTO customers_fts(customers_fts) VALUES ('rebuild')",
+    ]
+
+
+def trigram_expression(columns):
+    return 'lower(' + " || ' ' || ".join(f"coalesce({column}, '')" for column in columns) + ')'
+
+
+def install(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for statement in sqlite_statements():
+                cursor.execute(statement)
+        elif connection.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for group, columns in TRIGRAM_GROUPS.items():
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS customers_{group}_trgm_idx '
+                    f'ON customers USING gin (({trigram_expression(columns)}) gin_trgm_ops)'
+                )
+
+
+def remove(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for trigger in TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            cursor.execute('DROP TABLE IF EXISTS customers_fts')
+        elif connection.vendor == 'postgresql':
+            for group in TRIGRAM_GROUPS:
+                cursor.execute(f'DROP INDEX IF EXISTS customers_{group}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_relationship', '0004_appointment_active_slot_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, remove),
+    ]
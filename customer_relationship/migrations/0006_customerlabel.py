@@ -0,0 +1,53 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:08
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def backfill_labels(apps, schema_editor):
+    """Create label rows from the existing tags/preferences JSON lists"""
+    Customer = apps.get_model('customer_relationship', 'Customer')
+    CustomerLabel = apps.get_model('customer_relationship', 'CustomerLabel')
+
+    batch = []
+    rows = Customer.objects.values_list('pk', 'tags', 'preferences').iterator(chunk_size=2000)
+    for customer_id, tags, preferences in rows:
+        for kind, values in (('tag', tags), ('preference', preferences)):
+            for value in set(values or []):
+                if isinstance(value, str):
+                    batch.append(CustomerLabel(customer_id=customer_id, kind=kind, value=value[:50]))
+        if len(batch) >= 2000:
+            CustomerLabel.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        CustomerLabel.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_relationship', '0005_customer_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerLabel',
+            fields=[
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('kind', models.CharField(choices=[('tag', 'Tag'), ('preference', 'Preference')], max_length=20)),
+                ('value', models.CharField(max_length=50)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='labels', to='customer_relationship.customer')),
+            ],
+            options={
+                'verbose_name': 'Customer Label',
+                'verbose_name_plural': 'Customer Labels',
+                'db_table': 'customer_labels',
+                'indexes': [models.Index(fields=['kind', 'value', 'customer'], name='customer_labels_lookup_idx')],
+                'constraints': [models.UniqueConstraint(fields=('customer', 'kind', 'value'), name='customer_labels_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_labels, migrations.RunPython.noop),
+    ]
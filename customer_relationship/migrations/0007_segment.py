@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:11
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_relationship', '0006_customerlabel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Segment',
+            fields=[
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('definition', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'verbose_name': 'Segment',
+                'verbose_name_plural': 'Segments',
+                'db_table': 'segments',
+                'ordering': ['name'],
+            },
+        ),
+    ]
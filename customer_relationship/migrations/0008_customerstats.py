@@ -0,0 +1,80 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:15
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+
+
+def backfill_stats(apps, schema_editor):
+    """Compute stats rows for existing customers from their orders and appointments"""
+    Customer = apps.get_model('customer_relationship', 'Customer')
+    CustomerStats = apps.get_model('customer_relationship', 'CustomerStats')
+    Appointment = apps.get_model('customer_relationship', 'Appointment')
+    Order = apps.get_model('finances', 'Order')
+
+    orders = {
+        row['customer_id']: row
+        for row in Order.objects.order_by().values('customer_id').annotate(
+            lifetime_income=Sum('total', filter=Q(order_type__type='Income')),
+            order_count=Count('pk'),
+            last_order_at=Max('created_at'),
+        )
+    }
+    appointments = {
+        row['customer_id']: row
+        for row in Appointment.objects.order_by().values('customer_id').annotate(
+            last_appointment_at=Max('start_time', filter=~Q(status='cancelled')),
+            cancelled_count=Count('pk', filter=Q(status='cancelled')),
+        )
+    }
+
+    batch = []
+    for customer_id in Customer.objects.values_list('pk', flat=True).iterator(chunk_size=2000):
+        order_row = orders.get(customer_id, {})
+        appointment_row = appointments.get(customer_id, {})
+        batch.append(CustomerStats(
+            customer_id=customer_id,
+            lifetime_income=order_row.get('lifetime_income') or 0,
+            order_count=order_row.get('order_count', 0),
+            last_order_at=order_row.get('last_order_at'),
+            last_appointment_at=appointment_row.get('last_appointment_at'),
+            cancelled_count=appointment_row.get('cancelled_count', 0),
+        ))
+        if len(batch) >= 2000:
+            CustomerStats.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        CustomerStats.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_relationship', '0007_segment'),
+        ('finances', '0003_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('lifetime_income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('last_order_at', models.DateTimeField(blank=True, null=True)),
+                ('last_appointment_at', models.DateTimeField(blank=True, null=True)),
+                ('cancelled_count', models.PositiveIntegerField(default=0)),
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='customer_relationship.customer')),
+            ],
+            options={
+                'verbose_name': 'Customer Stats',
+                'verbose_name_plural': 'Customer Stats',
+                'db_table': 'customer_stats',
+                'indexes': [models.Index(fields=['lifetime_income'], name='customer_stats_income_idx'), models.Index(fields=['last_order_at'], name='customer_stats_last_order_idx'), models.Index(fields=['last_appointment_at'], name='customer_stats_last_appt_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_relationship', '0008_customerstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['updated_at', 'uuid'], name='appointments_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['updated_at', 'uuid'], name='customers_sync_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Exclusion constraint against double-booking (PostgreSQL only)
+
+from django.db import migrations
+
+# Active statuses at the time of this migration (availability.ACTIVE_STATUSES)
+ACTIVE = "('scheduled', 'confirmed')"
+
+# Overlapping pairs listed when existing rows would violate the constraint
+MAX_LISTED = 20
+
+
+def install(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT a.uuid, b.uuid, a.start_time FROM appointments a JOIN appointments b '
+            'ON a.appointment_type_id = b.appointment_type_id AND a.uuid < b.uuid '
+            'AND a.start_time < b.end_time AND b.start_time < a.end_time '
+            f'WHERE a.status IN {ACTIVE} AND b.status IN {ACTIVE} '
+            f'ORDER BY a.start_time LIMIT {MAX_LISTED}'
+        )
+        overlaps = cursor.fetchall()
+        if overlaps:
+            listed = '\n'.join(f'  {first} and {second} ({start:%Y-%m-%d %H:%M})' for first, second, start in overlaps)
+            raise RuntimeError(
+                'Cannot add the appointments_no_overlap constraint: active appointments of the same type '
+                f'overlap (first {MAX_LISTED} pairs shown):\n{listed}\n'
+                'Cancel or reschedule one appointment of each pair, then run migrate again.'
+            )
+        # Needs a role allowed to create extensions (or btree_gist installed beforehand)
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        cursor.execute(
+            'ALTER TABLE appointments ADD CONSTRAINT appointments_no_overlap EXCLUDE USING gist '
+            "(appointment_type_id WITH =, tstzrange(start_time, end_time, '[)') WITH &&) "
+            f'WHERE (status IN {ACTIVE})'
+        )
+
+
+def remove(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('ALTER TABLE appointments DROP CONSTRAINT IF EXISTS appointments_no_overlap')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_relationship', '0009_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, remove),
+    ]
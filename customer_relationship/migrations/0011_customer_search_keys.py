@@ -0,0 +1,91 @@
+# Key the SQLite customer search index on a stable integer instead of customers.rowid
+#
+# SQLite only: the PostgreSQL trigram indexes from 0005 are unchanged. The DDL
+# is written out here rather than taken from customer_relationship.search.
+
+from django.db import migrations
+
+COLUMNS = (
+    'first_name', 'last_name', 'nickname', 'email', 'phone',
+    'address_city', 'address_state', 'address_country',
+)
+TRIGGERS = ('customers_fts_insert', 'customers_fts_delete', 'customers_fts_update')
+
+
+def create_triggers(cursor, insert, delete):
+    cursor.execute(f'CREATE TRIGGER customers_fts_insert AFTER INSERT ON customers BEGIN {insert} END')
+    cursor.execute(f'CREATE TRIGGER customers_fts_delete AFTER DELETE ON customers BEGIN {delete} END')
+    cursor.execute(f'CREATE TRIGGER customers_fts_update AFTER UPDATE ON customers BEGIN {delete} {insert} END')
+
+
+def drop_index(cursor):
+    for trigger in TRIGGERS:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    cursor.execute('DROP TABLE IF EXISTS customers_fts')
+    cursor.execute('DROP TABLE IF EXISTS customers_fts_keys')
+
+
+def rekey(apps, schema_editor):
+    """Contentless FTS table whose rows are keyed by customers_fts_keys.id"""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    columns = ', '.join(COLUMNS)
+    new = ', '.join(f'new.{column}' for column in COLUMNS)
+    old = ', '.join(f'old.{column}' for column in COLUMNS)
+    selected = ', '.join(f'customers.{column}' for column in COLUMNS)
+    insert = (
+        'INSERT INTO customers_fts_keys(uuid) VALUES (new.uuid); '
+        f'INSERT INTO customers_fts(rowid, {columns}) '
+        f'VALUES ((SELECT id FROM customers_fts_keys WHERE uuid = new.uuid), {new});'
+    )
+    delete = (
+        f'INSERT INTO customers_fts(customers_fts, rowid, {columns}) '
+        f"VALUES ('delete', (SELECT id FROM customers_fts_keys WHERE uuid = old.uuid), {old}); "
+        'DELETE FROM customers_fts_keys WHERE uuid = old.uuid;'
+    )
+    with connection.cursor() as cursor:
+        drop_index(cursor)
+        cursor.execute('CREATE TABLE customers_fts_keys (id integer PRIMARY KEY, uuid char(32) NOT NULL UNIQUE)')
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE customers_fts USING fts5({columns}, "
+            f"content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        create_triggers(cursor, insert, delete)
+        cursor.execute('INSERT INTO customers_fts_keys(uuid) SELECT uuid FROM customers')
+        cursor.execute(
+            f'INSERT INTO customers_fts(rowid, {columns}) SELECT customers_fts_keys.id, {selected} '
+            'FROM customers JOIN customers_fts_keys ON customers_fts_keys.uuid = customers.uuid'
+        )
+
+
+def restore_rowid_keys(apps, schema_editor):
+    """The external content FTS table of 0005, keyed by customers.rowid"""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    columns = ', '.join(COLUMNS)
+    new = ', '.join(f'new.{column}' for column in COLUMNS)
+    old = ', '.join(f'old.{column}' for column in COLUMNS)
+    insert = f'INSERT INTO customers_fts(rowid, {columns}) VALUES (new.rowid, {new});'
+    delete = f"INSERT INTO customers_fts(customers_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old});"
+    with connection.cursor() as cursor:
+        drop_index(cursor)
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE customers_fts USING fts5({columns}, "
+            f"content='customers', content_rowid='rowid', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        create_triggers(cursor, insert, delete)
+        cursor.execute("INSERT INTO customers_fts(customers_fts) VALUES ('rebuild')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_relationship', '0010_appointment_overlap_constraint'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey, restore_rowid_keys),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:06
+
+import datetime
+import django.db.models.expressions
+from django.db import migrations, models
+
+# MAX_APPOINTMENT_DURATION at the time of this migration
+MAX_DURATION = datetime.timedelta(days=1)
+
+
+def check_durations(apps, schema_editor):
+    """Refuse to add the constraint while longer appointments exist, listing them"""
+    Appointment = apps.get_model('customer_relationship', 'Appointment')
+    too_long = Appointment.objects.filter(end_time__gt=models.F('start_time') + MAX_DURATION).order_by('start_time')
+    listed = [f'  {uuid} ({start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M})'
+              for uuid, start, end in too_long.values_list('uuid', 'start_time', 'end_time')]
+    if listed:
+        raise RuntimeError(
+            'Cannot limit appointments to 24 hours; these appointments are longer:\n'
+            + '\n'.join(listed) + '\nShorten or split them, then run migrate again.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_relationship', '0011_customer_search_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_durations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.CheckConstraint(condition=models.Q(('end_time__lte', django.db.models.expressions.CombinedExpression(models.F('start_time'), '+', models.Value(datetime.timedelta(days=1))))), name='appointments_max_duration'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 import uuid
+from datetime import timedelta
+
 from django.db import models
 from django.core.validators import RegexValidator
 
@@ -66,6 +68,15 @@ class Customer(BaseModel):
         ordering = ["-created_at"]
         verbose_name = "Customer"
         verbose_name_plural = "Customers"
+        indexes = [
+            models.Index(fields=["created_at"], name="customers_created_idx"),
+            models.Index(fields=["is_active", "created_at"], name="customers_active_created_idx"),
+            models.Index(fields=["address_city"], name="customers_city_idx"),
+            models.Index(fields=["address_state"], name="customers_state_idx"),
+            models.Index(fields=["address_country"], name="customers_country_idx"),
+            # Incremental sync reads changes in (updated_at, uuid) order
+            models.Index(fields=["updated_at", "uuid"], name="customers_sync_idx"),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
@@ -79,6 +90,98 @@ class Customer(BaseModel):
         return f"{self.address_street} {self.address_number}, {self.address_neighborhood}, {self.address_city}, {self.address_state} {self.address_zip_code}, {self.address_country}"
 
 
+class CustomerLabel(BaseModel):
+    """
+    One tag or preference of a customer, derived from Customer.tags/preferences.
+
+    The JSON fields stay the source of truth; these rows are kept in sync on
+    save (see labels.py) so audience filters are index lookups.
+    """
+
+    KIND_CHOICES = [
+        ("tag", "Tag"),
+        ("preference", "Preference"),
+    ]
+
+    customer = models.ForeignKey(
+        Customer, on_delete=models.CASCADE, related_name="labels"
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    value = models.CharField(max_length=50)
+
+    class Meta:
+        db_table = "customer_labels"
+        verbose_name = "Customer Label"
+        verbose_name_plural = "Customer Labels"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["customer", "kind", "value"], name="customer_labels_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["kind", "value", "customer"], name="customer_labels_lookup_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_id} {self.kind}={self.value}"
+
+
+class CustomerStats(BaseModel):
+    """
+    Lifetime value and visit figures of a customer, derived from orders and appointments.
+
+    Maintained on order/appointment writes (see stats.py) so customers can be
+    sorted and filtered by them.
+    """
+
+    customer = models.OneToOneField(
+        Customer, on_delete=models.CASCADE, related_name="stats"
+    )
+    # Sum of Income orders
+    lifetime_income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+    last_order_at = models.DateTimeField(blank=True, null=True)
+    # Start of the latest non-cancelled appointment (may be in the future)
+    last_appointment_at = models.DateTimeField(blank=True, null=True)
+    cancelled_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "customer_stats"
+        verbose_name = "Customer Stats"
+        verbose_name_plural = "Customer Stats"
+        indexes = [
+            models.Index(fields=["lifetime_income"], name="customer_stats_income_idx"),
+            models.Index(fields=["last_order_at"], name="customer_stats_last_order_idx"),
+            models.Index(fields=["last_appointment_at"], name="customer_stats_last_appt_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_id}: {self.order_count} orders, {self.lifetime_income} income"
+
+
+class Segment(BaseModel):
+    """
+    Saved marketing audience.
+
+    `definition` holds the customer predicates validated by
+    SegmentDefinitionSerializer; members are computed (and cached) by
+    segments.py, never stored.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    description = models.TextField(blank=True, null=True)
+    definition = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        db_table = "segments"
+        ordering = ["name"]
+        verbose_name = "Segment"
+        verbose_name_plural = "Segments"
+
+    def __str__(self):
+        return self.name
+
+
 class AppointmentType(BaseModel):
     """Model for appointment types (e.g., Haircut, Manicure, etc.)"""
 
@@ -94,6 +197,11 @@ class AppointmentType(BaseModel):
         return self.description
 
 
+# Longest appointment the database accepts (check constraint below). Range
+# scans over start_time rely on it; the API limit APPOINTMENT_MAX_DURATION may be lower.
+MAX_APPOINTMENT_DURATION = timedelta(hours=24)
+
+
 class Appointment(BaseModel):
     """Model for appointments"""
 
@@ -127,6 +235,25 @@ class Appointment(BaseModel):
         ordering = ["-created_at"]
         verbose_name = "Appointment"
         verbose_name_plural = "Appointments"
+        indexes = [
+            models.Index(fields=["start_time"], name="appointments_start_idx"),
+            models.Index(fields=["status", "start_time"], name="appointments_status_start_idx"),
+            models.Index(fields=["customer", "start_time"], name="appointments_cust_start_idx"),
+            models.Index(fields=["appointment_type", "start_time"], name="appointments_type_start_idx"),
+            models.Index(fields=["updated_at", "uuid"], name="appointments_sync_idx"),
+            # Busy interval scans for availability and double-booking checks
+            models.Index(
+                fields=["appointment_type", "start_time", "end_time"],
+                condition=models.Q(status__in=["scheduled", "confirmed"]),
+                name="appointments_active_slot_idx",
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(end_time__lte=models.F("start_time") + MAX_APPOINTMENT_DURATION),
+                name="appointments_max_duration",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.customer.full_name} - {self.appointment_type.description} on {self.start_time.strftime('%Y-%m-%d %H:%M')}"
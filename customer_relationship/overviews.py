@@ -0,0 +1,113 @@
+"""
+Customer overview: everything the profile page shows in one response.
+
+The customer row is read with its CustomerStats row (lifetime income, order
+and cancellation figures) and carries the visit figures, which depend on the
+current time, as correlated subqueries on the per-customer appointment index.
+Recent appointments are one joined query and recent orders reuse the finances
+value projection (orders plus one query for all their lines). A whole overview
+is four queries regardless of the customer's history.
+"""
+from django.db.models import Count, IntegerField, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import serializers
+
+from finances.models import Order
+from finances.projections import order_rows, project_orders
+from .availability import ACTIVE_STATUSES
+from .models import Appointment
+from .serializers import AppointmentSerializer, CustomerStatsSerializer
+
+# Recent appointments/orders returned by default and at most
+DEFAULT_RECENT = 5
+MAX_RECENT = 50
+
+_datetime = serializers.DateTimeField()
+
+
+def _aggregate(queryset, expression, output_field):
+    """Correlated subquery computing `expression` over a customer's rows"""
+    return Subquery(
+        queryset.filter(customer=OuterRef('pk')).order_by().values('customer').annotate(
+            value=expression
+        ).values('value'),
+        output_field=output_field,
+    )
+
+
+def with_statistics(queryset, now=None):
+    """
+    Select a Customer queryset's stats row and annotate the visit figures.
+
+    Visits are non-cancelled appointments that started before `now`;
+    upcoming appointments are scheduled or confirmed ones from `now` on.
+    Everything else comes from CustomerStats.
+    """
+    now = now or timezone.now()
+    appointments = Appointment.objects.all()
+    visits = Q(start_time__lt=now) & ~Q(status='cancelled')
+    return queryset.select_related('stats').annotate(
+        visit_count=Coalesce(_aggregate(appointments, Count('pk', filter=visits), IntegerField()), Value(0)),
+        last_visit_at=_aggregate(
+            appointments, Max('start_time', filter=visits), Appointment._meta.get_field('start_time')
+        ),
+        upcoming_appointments=Coalesce(_aggregate(
+            appointments,
+            Count('pk', filter=Q(start_time__gte=now, status__in=ACTIVE_STATUSES)),
+            IntegerField(),
+        ), Value(0)),
+    )
+
+
+def parse_overview_params(query_params):
+    """
+    Validate the ?appointments= and ?orders= limits (recent rows to include).
+
+    Raises ValueError with a user facing message on invalid input.
+    """
+    limits = {}
+    for param in ('appointments', 'orders'):
+        try:
+            limits[param] = int(query_params.get(param, DEFAULT_RECENT))
+        except ValueError:
+            raise ValueError(f'{param} must be a number')
+        if not 0 <= limits[param] <= MAX_RECENT:
+            raise ValueError(f'{param} must be between 0 and {MAX_RECENT}')
+    return limits
+
+
+def build_overview(customer, customer_data, appointments, orders):
+    """
+    Overview payload for a customer annotated by with_statistics().
+
+    `customer_data` is the customer's serialized representation; recent
+    appointments come newest start time first and are serialized with
+    AppointmentSerializer, recent orders newest first in OrderSerializer shape.
+    """
+    recent_appointments = []
+    if appointments:
+        recent_appointments = AppointmentSerializer(
+            Appointment.objects.filter(customer=customer)
+            .select_related('customer', 'appointment_type')
+            .order_by('-start_time')[:appointments],
+            many=True,
+        ).data
+
+    recent_orders = []
+    if orders:
+        recent_orders = project_orders(
+            order_rows(Order.objects.filter(customer=customer).order_by('-created_at'))[:orders]
+        )
+
+    return {
+        'customer': customer_data,
+        'statistics': {
+            **CustomerStatsSerializer(customer.stats).data,
+            'visit_count': customer.visit_count,
+            'last_visit_at': _datetime.to_representation(customer.last_visit_at) if customer.last_visit_at else None,
+            'upcoming_appointments': customer.upcoming_appointments,
+        },
+        'recent_appointments': recent_appointments,
+        'recent_orders': recent_orders,
+    }
@@ -0,0 +1,234 @@
+"""
+Indexed customer search for the front desk search box.
+
+Searchable columns are split into groups (name, contact, location). On
+SQLite they are indexed by the contentless `customers_fts` FTS5 table, kept
+current by triggers on `customers`. FTS rows are keyed by the integer
+primary key of `customers_fts_keys`, which maps them to customer uuids:
+`customers` has no stable integer key of its own (its implicit rowid may
+change on VACUUM). On PostgreSQL every group gets a pg_trgm GIN index over
+the lower-cased concatenation of its columns. Either way a search for word
+prefixes (as typed) is answered from the index and can be ranked; other
+databases fall back to icontains scans. On SQLite, terms match from the start
+of a word, not anywhere inside it as icontains does.
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+from .models import Customer
+
+SEARCH_GROUPS = {
+    'name': ('first_name', 'last_name', 'nickname'),
+    'contact': ('email', 'phone'),
+    'location': ('address_city', 'address_state', 'address_country'),
+}
+SEARCH_COLUMNS = [column for columns in SEARCH_GROUPS.values() for column in columns]
+
+# Groups searched by ?search= and the lookup endpoint (the front desk box)
+DEFAULT_GROUPS = ('name', 'contact')
+
+# bm25 column weights for SQLite ranking, in SEARCH_COLUMNS order
+FTS_WEIGHTS = (10.0, 10.0, 5.0, 3.0, 3.0, 1.0, 1.0, 1.0)
+
+# Terms beyond this are ignored so a pasted paragraph cannot build a huge query
+MAX_TERMS = 8
+
+FTS_TABLE = 'customers_fts'
+FTS_KEYS_TABLE = 'customers_fts_keys'
+FTS_TRIGGERS = ('customers_fts_insert', 'customers_fts_delete', 'customers_fts_update')
+
+
+def search_terms(text):
+    """Lower-cased alphanumeric words of a search string"""
+    return re.findall(r'[^\W_]+', (text or '').lower())[:MAX_TERMS]
+
+
+def is_indexed(connection):
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+# Index maintenance
+
+def _group_expression(group):
+    """SQL of the lower-cased, space separated concatenation of a group's columns"""
+    columns = " || ' ' || ".join(f"coalesce({column}, '')" for column in SEARCH_GROUPS[group])
+    return f'lower({columns})'
+
+
+def _sqlite_statements():
+    columns = ', '.join(SEARCH_COLUMNS)
+    new = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+    old = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+    insert = (
+        f'INSERT INTO {FTS_KEYS_TABLE}(uuid) VALUES (new.uuid); '
+        f'INSERT INTO {FTS_TABLE}(rowid, {columns}) '
+        f'VALUES ((SELECT id FROM {FTS_KEYS_TABLE} WHERE uuid = new.uuid), {new});'
+    )
+    # Contentless tables remove a row given the values it was indexed with
+    delete = (
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) "
+        f"VALUES ('delete', (SELECT id FROM {FTS_KEYS_TABLE} WHERE uuid = old.uuid), {old}); "
+        f'DELETE FROM {FTS_KEYS_TABLE} WHERE uuid = old.uuid;'
+    )
+    return [
+        f'CREATE TABLE IF NOT EXISTS {FTS_KEYS_TABLE} (id integer PRIMARY KEY, uuid char(32) NOT NULL UNIQUE)',
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({columns}, "
+        f"content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f'CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS customers_fts_delete AFTER DELETE ON customers BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS customers_fts_update AFTER UPDATE ON customers BEGIN {delete} {insert} END',
+    ]
+
+
+def _sqlite_rebuild(cursor):
+    """Re-index every customer (contentless tables cannot 'rebuild' themselves)"""
+    columns = ', '.join(SEARCH_COLUMNS)
+    selected = ', '.join(f'customers.{column}' for column in SEARCH_COLUMNS)
+    cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+    cursor.execute(f'DELETE FROM {FTS_KEYS_TABLE}')
+    cursor.execute(f'INSERT INTO {FTS_KEYS_TABLE}(uuid) SELECT uuid FROM customers')
+    cursor.execute(
+        f'INSERT INTO {FTS_TABLE}(rowid, {columns}) SELECT {FTS_KEYS_TABLE}.id, {selected} '
+        f'FROM customers JOIN {FTS_KEYS_TABLE} ON {FTS_KEYS_TABLE}.uuid = customers.uuid'
+    )
+
+
+def install_search_index(connection):
+    """
+    Create the search index for the connection's database (idempotent).
+
+    On SQLite the index is rebuilt from `customers` whenever a trigger had
+    to be (re)created: Django rebuilds tables to alter them on SQLite, which
+    drops their triggers, so this also runs after every migrate.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+                FTS_TRIGGERS,
+            )
+            complete = cursor.fetchone()[0] == len(FTS_TRIGGERS)
+            for statement in _sqlite_statements():
+                cursor.execute(statement)
+            if not complete:
+                _sqlite_rebuild(cursor)
+        elif connection.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for group in SEARCH_GROUPS:
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS customers_{group}_trgm_idx '
+                    f'ON customers USING gin (({_group_expression(group)}) gin_trgm_ops)'
+                )
+
+
+def repair_search_index(sender, using, **kwargs):
+    """post_migrate receiver restoring SQLite triggers lost when Django rebuilt `customers`"""
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+        install_search_index(connection)
+
+
+def remove_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for trigger in FTS_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_KEYS_TABLE}')
+        elif connection.vendor == 'postgresql':
+            for group in SEARCH_GROUPS:
+                cursor.execute(f'DROP INDEX IF EXISTS customers_{group}_trgm_idx')
+
+
+# Queries
+
+def _fts_match(terms, groups):
+    """FTS5 query: every term must prefix-match a word in one of the groups' columns"""
+    columns = ' '.join(column for group in groups for column in SEARCH_GROUPS[group])
+    return ' AND '.join(f'{{{columns}}} : "{term}"*' for term in terms)
+
+
+def _trigram_condition(terms, groups):
+    """SQL and params: every term must occur in one of the groups' indexed expressions"""
+    per_term = '(' + ' OR '.join(f'{_group_expression(group)} LIKE %s' for group in groups) + ')'
+    sql = ' AND '.join([per_term] * len(terms))
+    params = [f'%{term}%' for term in terms for _ in groups]
+    return sql, params
+
+
+def search_customers(queryset, text, groups=DEFAULT_GROUPS):
+    """Filter a Customer queryset to rows where every search term matches the groups"""
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite':
+        return queryset.filter(uuid__in=RawSQL(
+            f'SELECT {FTS_KEYS_TABLE}.uuid FROM {FTS_TABLE} '
+            f'JOIN {FTS_KEYS_TABLE} ON {FTS_KEYS_TABLE}.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s',
+            [_fts_match(terms, groups)],
+        ))
+    if connection.vendor == 'postgresql':
+        sql, params = _trigram_condition(terms, groups)
+        return queryset.filter(RawSQL(sql, params, output_field=BooleanField()))
+
+    for term in terms:
+        queryset = queryset.filter(reduce(or_, (
+            Q(**{f'{column}__icontains': term})
+            for group in groups for column in SEARCH_GROUPS[group]
+        )))
+    return queryset
+
+
+def lookup_customers(text, limit=10, groups=DEFAULT_GROUPS):
+    """
+    Best matching customers first, for as-you-type lookups.
+
+    SQLite ranks with bm25 (name columns weigh most), PostgreSQL with the
+    best trigram word similarity across the groups. One query.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return []
+
+    connection = connections[Customer.objects.db]
+    if connection.vendor == 'sqlite':
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        return list(Customer.objects.raw(
+            f'SELECT customers.* FROM {FTS_TABLE} '
+            f'JOIN {FTS_KEYS_TABLE} ON {FTS_KEYS_TABLE}.id = {FTS_TABLE}.rowid '
+            f'JOIN customers ON customers.uuid = {FTS_KEYS_TABLE}.uuid '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}), customers.last_name LIMIT %s',
+            [_fts_match(terms, groups), limit],
+        ))
+
+    queryset = search_customers(Customer.objects.all(), text, groups)
+    if connection.vendor == 'postgresql':
+        rank = 'greatest(' + ', '.join(
+            f'word_similarity(%s, {_group_expression(group)})' for group in groups
+        ) + ')'
+        queryset = queryset.annotate(
+            search_rank=RawSQL(rank, [' '.join(terms)] * len(groups), output_field=FloatField())
+        ).order_by('-search_rank', 'last_name')
+    else:
+        queryset = queryset.order_by('last_name', 'first_name')
+    return list(queryset[:limit])
+
+
+class CustomerSearchFilter(filters.SearchFilter):
+    """SearchFilter that answers ?search= from the customer search index"""
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        if not is_indexed(connections[queryset.db]):
+            return super().filter_queryset(request, queryset, view)
+        return search_customers(queryset, text)
@@ -0,0 +1,166 @@
+"""
+Marketing audience segments.
+
+A segment definition (validated by SegmentDefinitionSerializer) combines
+customer predicates: tags, preferences, location, gender, age, last order
+date, lifetime spend and appointment frequency. All of them compile into a
+single customers query; lifetime spend is read from CustomerStats, the other
+order and appointment aggregates are correlated subqueries on the
+(customer, created_at/start_time) indexes.
+
+Segment membership is cached per definition under the `segments` cache
+version, which customer, appointment and order writes bump, so a write
+invalidates all cached segments at once without tracking which segments it
+affects.
+"""
+import hashlib
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from finances.models import Order
+from queenbe_backend.caching import bump_version, current_version
+from .labels import filter_by_labels
+from .models import Appointment, Customer
+
+SEGMENTS_NAMESPACE = 'segments'
+
+# Columns streamed for each segment member
+MEMBER_FIELDS = ('uuid', 'first_name', 'last_name', 'email', 'phone', 'preferences', 'tags')
+
+
+def cache_timeout():
+    return getattr(settings, 'SEGMENT_CACHE_TIMEOUT', 3600)
+
+
+def cache_max_members():
+    return getattr(settings, 'SEGMENT_CACHE_MAX_MEMBERS', 100000)
+
+
+def years_before(day, years):
+    """The same calendar day `years` earlier (Feb 29 becomes Feb 28)"""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def segment_queryset(definition, today=None):
+    """Customers matching every predicate of a validated segment definition"""
+    today = today or timezone.localdate()
+    queryset = filter_by_labels(
+        Customer.objects.all(),
+        tags=definition.get('tags', ()),
+        preferences=definition.get('preferences', ()),
+    )
+
+    for param, field in (('cities', 'address_city'), ('states', 'address_state'), ('countries', 'address_country')):
+        if definition.get(param):
+            queryset = queryset.filter(**{f'{field}__in': definition[param]})
+    if definition.get('gender'):
+        queryset = queryset.filter(gender=definition['gender'])
+    if definition.get('is_active') is not None:
+        queryset = queryset.filter(is_active=definition['is_active'])
+
+    if definition.get('min_age') is not None:
+        queryset = queryset.filter(date_of_birth__lte=years_before(today, definition['min_age']))
+    if definition.get('max_age') is not None:
+        queryset = queryset.filter(date_of_birth__gt=years_before(today, definition['max_age'] + 1))
+
+    orders = Order.objects.filter(customer=OuterRef('pk')).order_by()
+    if definition.get('last_order_after') or definition.get('last_order_before'):
+        queryset = queryset.annotate(
+            last_order_at=Subquery(orders.order_by('-created_at').values('created_at')[:1])
+        )
+        if definition.get('last_order_after'):
+            queryset = queryset.filter(last_order_at__gte=day_start(definition['last_order_after']))
+        if definition.get('last_order_before'):
+            queryset = queryset.filter(last_order_at__lt=day_start(definition['last_order_before']))
+
+    if definition.get('min_spend') is not None or definition.get('max_spend') is not None:
+        # Lifetime spend is the denormalized income of CustomerStats (Income orders only)
+        queryset = queryset.annotate(lifetime_spend=Coalesce(
+            'stats__lifetime_income', Value(0), output_field=DecimalField(max_digits=14, decimal_places=2)
+        ))
+        if definition.get('min_spend') is not None:
+            queryset = queryset.filter(lifetime_spend__gte=definition['min_spend'])
+        if definition.get('max_spend') is not None:
+            queryset = queryset.filter(lifetime_spend__lte=definition['max_spend'])
+
+    if definition.get('min_appointments') is not None or definition.get('max_appointments') is not None:
+        appointments = Appointment.objects.filter(customer=OuterRef('pk')).exclude(status='cancelled').order_by()
+        if definition.get('appointments_since'):
+            appointments = appointments.filter(start_time__gte=day_start(definition['appointments_since']))
+        visits = appointments.values('customer').annotate(visits=Count('pk')).values('visits')
+        queryset = queryset.annotate(
+            appointment_count=Coalesce(Subquery(visits), Value(0), output_field=IntegerField())
+        )
+        if definition.get('min_appointments') is not None:
+            queryset = queryset.filter(appointment_count__gte=definition['min_appointments'])
+        if definition.get('max_appointments') is not None:
+            queryset = queryset.filter(appointment_count__lte=definition['max_appointments'])
+
+    return queryset
+
+
+# Membership cache
+
+def invalidate_segments():
+    """Make every cached segment stale; called on customer, appointment and order writes"""
+    bump_version(SEGMENTS_NAMESPACE)
+
+
+def definition_digest(definition):
+    canonical = {
+        key: sorted(value) if isinstance(value, list) else value
+        for key, value in definition.items()
+        if value not in (None, [], '')
+    }
+    payload = json.dumps(canonical, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def segment_membership(definition, today=None):
+    """
+    Cached {'count': n, 'members': [uuid, ...] or None} for a definition.
+
+    Member ids are cached up to SEGMENT_CACHE_MAX_MEMBERS; larger segments
+    only cache their count and stream members straight from the query.
+    """
+    today = today or timezone.localdate()
+    # Age predicates move with the calendar, so the day is part of the key
+    key = f'{SEGMENTS_NAMESPACE}:{current_version(SEGMENTS_NAMESPACE)}:{today.isoformat()}:{definition_digest(definition)}'
+    membership = cache.get(key)
+    if membership is None:
+        queryset = segment_queryset(definition, today)
+        limit = cache_max_members()
+        ids = [str(pk) for pk in queryset.order_by('pk').values_list('pk', flat=True)[:limit + 1]]
+        if len(ids) > limit:
+            membership = {'count': queryset.count(), 'members': None}
+        else:
+            membership = {'count': len(ids), 'members': ids}
+        cache.set(key, membership, cache_timeout())
+    return membership
+
+
+def segment_member_rows(definition, chunk_size=2000, today=None):
+    """Yield MEMBER_FIELDS dicts for every member, in uuid order"""
+    membership = segment_membership(definition, today)
+    ids = membership['members']
+    if ids is None:
+        rows = segment_queryset(definition, today).order_by('pk').values(*MEMBER_FIELDS)
+        yield from rows.iterator(chunk_size=chunk_size)
+        return
+
+    for start in range(0, len(ids), chunk_size):
+        yield from Customer.objects.filter(pk__in=ids[start:start + chunk_size]).order_by('pk').values(*MEMBER_FIELDS)
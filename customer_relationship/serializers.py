@@ -1,10 +1,27 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import Customer, AppointmentType, Appointment
+from rest_framework.settings import api_settings
+from .availability import (
+    ACTIVE_STATUSES, OVERLAP_MESSAGE, is_overlap_violation, max_duration, overlapping, slot_taken,
+)
+from .models import Customer, CustomerStats, AppointmentType, Appointment, Segment
+
+
+class CustomerStatsSerializer(serializers.ModelSerializer):
+    """Read-only lifetime value and visit statistics of a customer"""
+    
+    class Meta:
+        model = CustomerStats
+        fields = ['lifetime_income', 'order_count', 'last_order_at', 'last_appointment_at', 'cancelled_count']
+        read_only_fields = fields
 
 
 class CustomerSerializer(serializers.ModelSerializer):
     full_name = serializers.ReadOnlyField()
     full_address = serializers.ReadOnlyField()
+    stats = CustomerStatsSerializer(read_only=True)
     
     class Meta:
         model = Customer
@@ -13,7 +30,7 @@ class CustomerSerializer(serializers.ModelSerializer):
             'date_of_birth', 'gender', 'created_at', 'updated_at', 'is_active',
             'address_street', 'address_number', 'address_neighborhood',
             'address_city', 'address_state', 'address_zip_code', 'address_country',
-            'preferences', 'tags', 'full_name', 'full_address'
+            'preferences', 'tags', 'full_name', 'full_address', 'stats'
         ]
         read_only_fields = ['uuid', 'created_at', 'updated_at']
     
@@ -74,6 +91,16 @@ class CustomerUpdateSerializer(CustomerSerializer):
         pass
 
 
+class CustomerLookupSerializer(serializers.ModelSerializer):
+    """Compact customer representation for search box lookups"""
+    full_name = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = Customer
+        fields = ['uuid', 'full_name', 'nickname', 'email', 'phone', 'is_active']
+        read_only_fields = fields
+
+
 class AppointmentTypeSerializer(serializers.ModelSerializer):
     """Serializer for AppointmentType model"""
     
@@ -115,12 +142,62 @@ class AppointmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['uuid', 'created_at', 'updated_at']
     
     def validate(self, data):
-        """Validate that end_time is after start_time"""
+        """Validate that end_time is after start_time and the slot is not double-booked"""
         if 'start_time' in data and 'end_time' in data:
             if data['end_time'] <= data['start_time']:
                 raise serializers.ValidationError("End time must be after start time.")
+        self.validate_schedule(data)
         return data
     
+    def save(self, **kwargs):
+        """Re-check the slot under the appointment type lock and write in the same transaction"""
+        try:
+            with transaction.atomic():
+                try:
+                    self.validate_schedule({**self.validated_data, **kwargs}, lock=True)
+                except serializers.ValidationError as error:
+                    raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: error.detail})
+                return super().save(**kwargs)
+        except IntegrityError as error:
+            if not is_overlap_violation(error):
+                raise
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [OVERLAP_MESSAGE]})
+    
+    def validate_schedule(self, data, lock=False):
+        """
+        Reject schedule changes overlapping another active appointment of the same type.
+        
+        Validation checks without locking for early feedback; save() checks
+        again with `lock` inside its transaction.
+        """
+        schedule_fields = ('start_time', 'end_time', 'appointment_type', 'status')
+        if not any(field in data for field in schedule_fields):
+            return
+        
+        # Partial updates are checked against the stored values of the other fields
+        values = {
+            field: data[field] if field in data else getattr(self.instance, field, None)
+            for field in schedule_fields
+        }
+        start, end = values['start_time'], values['end_time']
+        if start is None or end is None or values['appointment_type'] is None:
+            return
+        if end <= start:
+            raise serializers.ValidationError("End time must be after start time.")
+        if end - start > max_duration():
+            hours = max_duration() / timedelta(hours=1)
+            raise serializers.ValidationError(f"Appointments cannot last longer than {hours:g} hours.")
+        
+        if (values['status'] or 'scheduled') not in ACTIVE_STATUSES:
+            return
+        exclude = getattr(self.instance, 'pk', None)
+        if lock:
+            taken = slot_taken(values['appointment_type'], start, end, exclude=exclude)
+        else:
+            taken = overlapping(values['appointment_type'], start, end, exclude=exclude).exists()
+        if taken:
+            raise serializers.ValidationError(OVERLAP_MESSAGE)
+    
     def validate_status(self, value):
         """Validate status against allowed choices"""
         valid_statuses = [choice[0] for choice in Appointment.STATUS_CHOICES]
@@ -148,4 +225,71 @@ class AppointmentUpdateSerializer(AppointmentSerializer):
     """Serializer for updating appointments with optional fields"""
     
     class Meta(AppointmentSerializer.Meta):
-        pass
\ No newline at end of file
+        pass
+
+
+class SegmentDefinitionSerializer(serializers.Serializer):
+    """
+    Customer predicates of a segment; every given predicate must hold.
+
+    List predicates on location match any listed value, tags and preferences
+    must all be present. Ages are in whole years, spend is the sum of Income
+    order totals and appointments count non-cancelled visits since
+    `appointments_since` (all time when omitted).
+    """
+    tags = serializers.ListField(
+        child=serializers.ChoiceField(choices=Customer.TAGS_CHOICES), required=False
+    )
+    preferences = serializers.ListField(
+        child=serializers.ChoiceField(choices=Customer.PREFERENCES_CHOICES), required=False
+    )
+    cities = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+    states = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+    countries = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+    gender = serializers.ChoiceField(choices=Customer.GENDER_CHOICES, required=False)
+    is_active = serializers.BooleanField(required=False, allow_null=True)
+    min_age = serializers.IntegerField(min_value=0, required=False)
+    max_age = serializers.IntegerField(min_value=0, required=False)
+    last_order_after = serializers.DateField(required=False)
+    last_order_before = serializers.DateField(required=False)
+    min_spend = serializers.DecimalField(max_digits=14, decimal_places=2, min_value=Decimal('0'), required=False)
+    max_spend = serializers.DecimalField(max_digits=14, decimal_places=2, min_value=Decimal('0'), required=False)
+    min_appointments = serializers.IntegerField(min_value=0, required=False)
+    max_appointments = serializers.IntegerField(min_value=0, required=False)
+    appointments_since = serializers.DateField(required=False)
+
+    RANGES = (
+        ('min_age', 'max_age'),
+        ('last_order_after', 'last_order_before'),
+        ('min_spend', 'max_spend'),
+        ('min_appointments', 'max_appointments'),
+    )
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            unknown = set(data) - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError({
+                    field: 'Unknown segment predicate.' for field in sorted(unknown)
+                })
+        return super().to_internal_value(data)
+
+    def validate(self, data):
+        for lower, upper in self.RANGES:
+            if data.get(lower) is not None and data.get(upper) is not None and data[lower] > data[upper]:
+                raise serializers.ValidationError(f"{lower} must not be greater than {upper}.")
+        return data
+
+
+class SegmentSerializer(serializers.ModelSerializer):
+    """Serializer for Segment model; the definition is stored in its validated form"""
+
+    class Meta:
+        model = Segment
+        fields = ['uuid', 'name', 'description', 'definition', 'created_at', 'updated_at']
+        read_only_fields = ['uuid', 'created_at', 'updated_at']
+
+    def validate_definition(self, value):
+        definition = SegmentDefinitionSerializer(data=value)
+        definition.is_valid(raise_exception=True)
+        return definition.data
@@ -0,0 +1,60 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from queenbe_backend.caching import invalidate_cached_responses
+from .labels import LABEL_FIELDS, sync_labels
+from .models import Appointment, AppointmentType, Customer, CustomerStats
+from .segments import invalidate_segments
+from .stats import create_empty_stats, refresh_customer_stats
+
+
+@receiver(post_save, sender=Customer)
+def sync_labels_on_customer_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not set(LABEL_FIELDS.values()) & set(update_fields):
+        return
+    sync_labels([instance], created=created)
+
+
+@receiver(post_save, sender=Customer)
+def create_stats_on_customer_create(sender, instance, created, **kwargs):
+    if created:
+        create_empty_stats([instance.pk])
+
+
+@receiver(post_delete, sender=Customer)
+def delete_stats_on_customer_delete(sender, instance, **kwargs):
+    # Cascaded order/appointment deletes refresh the stats row before the customer goes
+    CustomerStats.objects.filter(customer_id=instance.pk).delete()
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_appointment_customer(sender, instance, **kwargs):
+    """Keep the customer an existing appointment belonged to before it is updated"""
+    instance._previous_customer_id = (
+        None if instance._state.adding
+        else Appointment.objects.filter(pk=instance.pk).values_list('customer_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Appointment)
+def update_stats_on_appointment_save(sender, instance, **kwargs):
+    refresh_customer_stats([instance.customer_id, getattr(instance, '_previous_customer_id', None)])
+
+
+@receiver(post_delete, sender=Appointment)
+def update_stats_on_appointment_delete(sender, instance, **kwargs):
+    refresh_customer_stats([instance.customer_id])
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_segments_on_write(sender, **kwargs):
+    invalidate_segments()
+
+
+@receiver(post_save, sender=AppointmentType)
+@receiver(post_delete, sender=AppointmentType)
+def invalidate_appointment_type_responses(sender, **kwargs):
+    invalidate_cached_responses(sender)
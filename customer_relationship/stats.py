@@ -0,0 +1,103 @@
+"""
+Denormalized per-customer lifetime value and visit statistics.
+
+CustomerStats holds one row per customer so the customer list can be sorted
+and filtered by spend or recency without aggregating orders and appointments
+per request. Rows are refreshed for the affected customers on every order
+and appointment write (signals, bulk orders) and can be rebuilt from scratch
+with the `rebuild_customer_stats` management command.
+"""
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+
+from finances.models import Order
+from .models import Appointment, Customer, CustomerStats
+
+STAT_FIELDS = ['lifetime_income', 'order_count', 'last_order_at', 'last_appointment_at', 'cancelled_count']
+
+
+def _order_totals(orders):
+    return orders.order_by().values('customer_id').annotate(
+        lifetime_income=Sum('total', filter=Q(order_type__type='Income')),
+        order_count=Count('pk'),
+        last_order_at=Max('created_at'),
+    )
+
+
+def _appointment_totals(appointments):
+    return appointments.order_by().values('customer_id').annotate(
+        last_appointment_at=Max('start_time', filter=~Q(status='cancelled')),
+        cancelled_count=Count('pk', filter=Q(status='cancelled')),
+    )
+
+
+def _build_stats(customer_ids, orders, appointments):
+    orders = {row['customer_id']: row for row in orders}
+    appointments = {row['customer_id']: row for row in appointments}
+    stats = []
+    for customer_id in customer_ids:
+        order_row = orders.get(customer_id, {})
+        appointment_row = appointments.get(customer_id, {})
+        stats.append(CustomerStats(
+            customer_id=customer_id,
+            lifetime_income=order_row.get('lifetime_income') or 0,
+            order_count=order_row.get('order_count', 0),
+            last_order_at=order_row.get('last_order_at'),
+            last_appointment_at=appointment_row.get('last_appointment_at'),
+            cancelled_count=appointment_row.get('cancelled_count', 0),
+        ))
+    return stats
+
+
+def refresh_customer_stats(customer_ids):
+    """
+    Recompute the stats rows of the given customers.
+
+    Reads only those customers' orders and appointments (index ranges on the
+    per-customer indexes) and upserts every row in one statement: four
+    queries for any number of customers. Ids of deleted customers are skipped.
+    """
+    ids = {customer_id for customer_id in customer_ids if customer_id is not None}
+    if not ids:
+        return
+    existing = list(Customer.objects.filter(pk__in=ids).values_list('pk', flat=True))
+    if not existing:
+        return
+
+    stats = _build_stats(
+        existing,
+        _order_totals(Order.objects.filter(customer_id__in=existing)),
+        _appointment_totals(Appointment.objects.filter(customer_id__in=existing)),
+    )
+    CustomerStats.objects.bulk_create(
+        stats,
+        update_conflicts=True,
+        unique_fields=['customer'],
+        update_fields=STAT_FIELDS + ['updated_at'],
+    )
+
+
+def create_empty_stats(customer_ids):
+    """Insert zeroed rows for new customers (existing rows are left alone)"""
+    CustomerStats.objects.bulk_create(
+        [CustomerStats(customer_id=customer_id) for customer_id in customer_ids],
+        ignore_conflicts=True,
+    )
+
+
+@transaction.atomic
+def rebuild_customer_stats():
+    """
+    Rebuild every stats row from scratch (backfill or repair).
+
+    Two grouped queries over orders and appointments and a bulk insert.
+    Returns the number of rows written.
+    """
+    stats = _build_stats(
+        Customer.objects.values_list('pk', flat=True),
+        _order_totals(Order.objects.all()),
+        _appointment_totals(Appointment.objects.all()),
+    )
+    CustomerStats.objects.all().delete()
+    CustomerStats.objects.bulk_create(stats, batch_size=1000)
+    return len(stats)
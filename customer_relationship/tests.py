@@ -1,3 +1,1171 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from finances.models import Order, OrderItem, OrderItemLine, OrderType, PaymentType
+from queenbe_backend.testing import IndexUsageMixin, QueryCountMixin
+from .models import (
+    MAX_APPOINTMENT_DURATION, Customer, CustomerLabel, CustomerStats, AppointmentType, Appointment, Segment,
+)
+from .search import install_search_index, lookup_customers, remove_search_index
+from .serializers import AppointmentCreateSerializer
+
+
+class CustomerRelationshipIndexTests(IndexUsageMixin, TestCase):
+    """EXPLAIN based checks that the hot customer/appointment endpoints use an index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('indexer', 'indexer@example.com', 'secret-pass')
+        cls.customer = create_customer(1)
+        cls.appointment_type = AppointmentType.objects.create(description='Haircut')
+        start = timezone.now() + timedelta(hours=1)
+        Appointment.objects.create(
+            customer=cls.customer, appointment_type=cls.appointment_type,
+            start_time=start, end_time=start + timedelta(hours=1),
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertEndpointUsesIndex(self, table, url):
+        self.assertUsesIndex(table, lambda: self.assertEqual(self.client.get(url).status_code, 200))
+
+    def test_customer_list(self):
+        self.assertEndpointUsesIndex('customers', '/api/customers/')
+
+    def test_customer_active(self):
+        self.assertEndpointUsesIndex('customers', '/api/customers/active/')
+
+    def test_customer_filter_by_city(self):
+        self.assertEndpointUsesIndex('customers', '/api/customers/?address_city=New%20York')
+
+    def test_customer_filter_by_state(self):
+        self.assertEndpointUsesIndex('customers', '/api/customers/?address_state=NY')
+
+    def test_customer_filter_by_country(self):
+        self.assertEndpointUsesIndex('customers', '/api/customers/?address_country=USA')
+
+    def test_appointment_list(self):
+        self.assertEndpointUsesIndex('appointments', '/api/appointments/')
+
+    def test_appointment_today(self):
+        self.assertEndpointUsesIndex('appointments', '/api/appointments/today/')
+
+    def test_appointment_upcoming(self):
+        self.assertEndpointUsesIndex('appointments', '/api/appointments/upcoming/')
+
+    def test_appointment_filter_by_status(self):
+        self.assertEndpointUsesIndex('appointments', '/api/appointments/?status=scheduled')
+
+    def test_appointment_by_customer(self):
+        self.assertEndpointUsesIndex(
+            'appointments', f'/api/appointments/by_customer/?customer_uuid={self.customer.uuid}'
+        )
+
+    def test_appointment_calendar(self):
+        day = timezone.localdate()
+        self.assertEndpointUsesIndex(
+            'appointments', f'/api/appointments/calendar/?start={day}&end={day + timedelta(days=6)}'
+        )
+
+    def test_appointment_availability(self):
+        self.assertEndpointUsesIndex(
+            'appointments', f'/api/appointments/availability/?appointment_type={self.appointment_type.uuid}'
+        )
+
+
+class AppointmentAvailabilityTests(TestCase):
+    """Overlapping active appointments of a type are rejected and free slots skip busy intervals"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('scheduler', 'scheduler@example.com', 'secret-pass')
+        cls.customer = create_customer(1)
+        cls.haircut = AppointmentType.objects.create(description='Haircut')
+        cls.manicure = AppointmentType.objects.create(description='Manicure')
+        cls.day = timezone.localdate() + timedelta(days=1)
+        cls.booked = Appointment.objects.create(
+            customer=cls.customer, appointment_type=cls.haircut,
+            start_time=cls.at(10), end_time=cls.at(11),
+        )
+
+    @classmethod
+    def at(cls, hour, minute=0):
+        return timezone.make_aware(datetime.combine(cls.day, time(hour, minute)))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def book(self, start, end, appointment_type=None):
+        return self.client.post('/api/appointments/', {
+            'customer': str(self.customer.uuid),
+            'appointment_type': str((appointment_type or self.haircut).uuid),
+            'start_time': start.isoformat(), 'end_time': end.isoformat(),
+        }, format='json')
+
+    def test_rejects_overlap(self):
+        response = self.book(self.at(10, 30), self.at(11, 30))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('overlaps', str(response.data))
+
+    def test_allows_adjacent_and_other_types(self):
+        self.assertEqual(self.book(self.at(11), self.at(12)).status_code, 201)
+        self.assertEqual(self.book(self.at(10), self.at(11), self.manicure).status_code, 201)
+
+    def test_cancelled_frees_the_slot(self):
+        self.client.post(f'/api/appointments/{self.booked.uuid}/cancel/')
+        self.assertEqual(self.book(self.at(10), self.at(11)).status_code, 201)
+
+        response = self.client.post(f'/api/appointments/{self.booked.uuid}/confirm/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_save_rechecks_the_slot_after_validation(self):
+        serializer = AppointmentCreateSerializer(data={
+            'customer': str(self.customer.uuid), 'appointment_type': str(self.haircut.uuid),
+            'start_time': self.at(14).isoformat(), 'end_time': self.at(15).isoformat(),
+        })
+        self.assertTrue(serializer.is_valid())
+        # A concurrent booking commits between validation and save
+        Appointment.objects.create(
+            customer=self.customer, appointment_type=self.haircut, start_time=self.at(14, 30), end_time=self.at(15, 30),
+        )
+        with self.assertRaises(ValidationError) as raised:
+            serializer.save()
+        self.assertIn('overlaps', str(raised.exception.detail['non_field_errors']))
+        self.assertEqual(Appointment.objects.filter(start_time=self.at(14)).count(), 0)
+
+    def test_confirm_rejects_a_slot_taken_since_cancellation(self):
+        Appointment.objects.filter(pk=self.booked.pk).update(status='cancelled')
+        Appointment.objects.create(
+            customer=self.customer, appointment_type=self.haircut, start_time=self.at(10, 30), end_time=self.at(11),
+        )
+        response = self.client.post(f'/api/appointments/{self.booked.uuid}/confirm/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('overlaps', response.data['error'])
+        self.booked.refresh_from_db()
+        self.assertEqual(self.booked.status, 'cancelled')
+
+    @skipUnless(connection.vendor == 'postgresql', 'exclusion constraint is PostgreSQL only')
+    def test_database_rejects_overlapping_inserts(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Appointment.objects.create(
+                customer=self.customer, appointment_type=self.haircut, start_time=self.at(10, 30), end_time=self.at(12),
+            )
+
+    def test_database_rejects_appointments_longer_than_the_limit(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Appointment.objects.create(
+                customer=self.customer, appointment_type=self.manicure,
+                start_time=self.at(10), end_time=self.at(10) + MAX_APPOINTMENT_DURATION + timedelta(minutes=1),
+            )
+
+    def test_update_does_not_conflict_with_itself(self):
+        response = self.client.patch(
+            f'/api/appointments/{self.booked.uuid}/', {'end_time': self.at(11, 30).isoformat()}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_free_slots(self):
+        Appointment.objects.create(
+            customer=self.customer, appointment_type=self.haircut,
+            start_time=self.at(10, 30), end_time=self.at(12, 15),
+        )
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                f'/api/appointments/availability/?appointment_type={self.haircut.uuid}'
+                f'&date_from={self.day}&date_to={self.day}&duration=60&opening=08:00&closing=15:00'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(busy['start'], busy['end']) for busy in response.data['busy']],
+            [(self.at(10), self.at(12, 15))],
+        )
+        self.assertEqual(
+            [slot['start'] for slot in response.data['slots']],
+            [self.at(8), self.at(9), self.at(13), self.at(14)],
+        )
+
+    def test_calendar(self):
+        Appointment.objects.create(
+            customer=self.customer, appointment_type=self.manicure,
+            start_time=self.at(23), end_time=self.at(23, 30),
+        )
+        outside = self.day + timedelta(days=2)
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/appointments/calendar/?start={self.day}&end={self.day}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        appointments = response.data['appointments']
+        self.assertEqual(appointments['uuid'][0], str(self.booked.uuid))
+        self.assertEqual(appointments['status'], ['scheduled', 'scheduled'])
+        self.assertEqual(
+            response.data['appointment_types'],
+            {str(self.haircut.uuid): 'Haircut', str(self.manicure.uuid): 'Manicure'},
+        )
+        self.assertEqual(response.data['customers'], {str(self.customer.uuid): 'Customer1 Doe'})
+
+        response = self.client.get(
+            f'/api/appointments/calendar/?start={self.day}T10:30:00&end={outside}&appointment_type={self.manicure.uuid}'
+        )
+        self.assertEqual(response.data['appointments']['appointment_type'], [str(self.manicure.uuid)])
+
+        self.assertEqual(self.client.get('/api/appointments/calendar/?start=2024-01-01').status_code, 400)
+        self.assertEqual(
+            self.client.get('/api/appointments/calendar/?start=2024-01-01&end=2024-06-01').status_code, 400
+        )
+
+    @override_settings(TIME_ZONE='America/New_York')
+    def test_today_covers_the_local_day_across_dst_changes(self):
+        # 2026-03-08 has 23 hours in New York
+        noon = timezone.make_aware(datetime(2026, 3, 8, 12, 0))
+        late, next_day = (
+            Appointment.objects.create(
+                customer=self.customer, appointment_type=self.manicure,
+                start_time=start, end_time=start + timedelta(minutes=30),
+            )
+            for start in (
+                timezone.make_aware(datetime(2026, 3, 8, 23, 0)), timezone.make_aware(datetime(2026, 3, 9, 0, 30)),
+            )
+        )
+        with mock.patch('django.utils.timezone.now', return_value=noon):
+            response = self.client.get('/api/appointments/today/')
+        uuids = {appointment['uuid'] for appointment in response.data['results']}
+        self.assertIn(str(late.uuid), uuids)
+        self.assertNotIn(str(next_day.uuid), uuids)
+
+    def test_calendar_includes_appointments_longer_than_the_api_limit(self):
+        # Written outside the API, past APPOINTMENT_MAX_DURATION but within the database limit
+        long = Appointment.objects.create(
+            customer=self.customer, appointment_type=self.manicure,
+            start_time=self.at(0) - timedelta(hours=16), end_time=self.at(6),
+        )
+        response = self.client.get(f'/api/appointments/calendar/?start={self.day}&end={self.day}')
+        self.assertEqual(response.data['appointments']['uuid'], [str(long.uuid), str(self.booked.uuid)])
+
+    def test_availability_validation(self):
+        self.assertEqual(self.client.get('/api/appointments/availability/').status_code, 400)
+        response = self.client.get(
+            f'/api/appointments/availability/?appointment_type={self.haircut.uuid}&duration=abc'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class AppointmentDurationMigrationTests(TransactionTestCase):
+    """The duration constraint is not added over appointments that already exceed it"""
+
+    migrate_from = [('customer_relationship', '0011_customer_search_keys')]
+    migrate_to = [('customer_relationship', '0012_appointment_max_duration')]
+
+    def tearDown(self):
+        Appointment.objects.all().delete()
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_existing_long_appointments_abort_the_migration(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        customer = apps.get_model('customer_relationship', 'Customer').objects.create(
+            first_name='John', last_name='Doe', email='john.doe@example.com', phone='5551234567',
+            date_of_birth=date(1990, 1, 15), gender='male', address_street='123 Main Street',
+            address_number='4B', address_neighborhood='Downtown', address_city='New York',
+            address_state='NY', address_zip_code='10001', address_country='USA',
+        )
+        start = timezone.now()
+        long = apps.get_model('customer_relationship', 'Appointment').objects.create(
+            customer=customer, appointment_type=apps.get_model('customer_relationship', 'AppointmentType').objects.create(
+                description='Retreat',
+            ),
+            start_time=start, end_time=start + timedelta(days=2),
+        )
+
+        executor = MigrationExecutor(connection)
+        with self.assertRaisesMessage(RuntimeError, str(long.uuid)):
+            executor.migrate(self.migrate_to)
+
+
+class CustomerSearchTests(IndexUsageMixin, TestCase):
+    """Customer search matches word prefixes through the search index and ranks lookups"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('searcher', 'searcher@example.com', 'secret-pass')
+        cls.joana = create_customer(1, first_name='Joana', last_name='Müller', email='joana@example.com')
+        cls.john = create_customer(2, first_name='John', last_name='Smith', email='jsmith@example.com')
+        cls.other = create_customer(
+            3, first_name='Maria', last_name='Costa', email='johnny.fan@example.com',
+            address_city='Recife', address_country='Brazil',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, text):
+        response = self.client.get('/api/customers/', {'search': text})
+        self.assertEqual(response.status_code, 200)
+        return {row['email'] for row in response.data['results']}
+
+    def test_prefix_terms_must_all_match(self):
+        self.assertEqual(self.search('jo'), {'joana@example.com', 'jsmith@example.com', 'johnny.fan@example.com'})
+        self.assertEqual(self.search('jo smi'), {'jsmith@example.com'})
+        self.assertEqual(self.search('mull'), {'joana@example.com'})
+        self.assertEqual(self.search('555123'), {'joana@example.com', 'jsmith@example.com', 'johnny.fan@example.com'})
+        self.assertEqual(self.search('recife'), set())
+
+    def test_index_follows_writes(self):
+        Customer.objects.filter(pk=self.john.pk).update(last_name='Walker')
+        self.assertEqual(self.search('smith'), set())
+        self.assertEqual(self.search('walk'), {'jsmith@example.com'})
+
+        self.client.delete(f'/api/customers/{self.joana.uuid}/')
+        self.assertEqual(self.search('joana'), set())
+
+    def test_search_uses_index(self):
+        self.assertUsesIndex('customers', lambda: self.client.get('/api/customers/?search=jo'))
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS index is SQLite only')
+    def test_index_does_not_depend_on_customer_rowids(self):
+        # VACUUM may renumber the implicit rowids of a table with a non-integer primary key
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE customers SET rowid = rowid + 1000')
+        self.assertEqual(self.search('joana'), {'joana@example.com'})
+        self.assertEqual([customer.email for customer in lookup_customers('smi')], ['jsmith@example.com'])
+
+    def test_rebuild_restores_the_index(self):
+        create_customer(4, first_name='Joaquim', last_name='Reis', email='joaquim@example.com')
+        remove_search_index(connection)
+        install_search_index(connection)
+        self.assertEqual(self.search('joaq'), {'joaquim@example.com'})
+        self.assertEqual(self.search('jo smi'), {'jsmith@example.com'})
+
+    def test_lookup_ranks_name_matches_first(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/customers/lookup/', {'q': 'john'})
+        self.assertEqual(
+            [row['email'] for row in response.data['results']], ['jsmith@example.com', 'johnny.fan@example.com']
+        )
+        self.assertEqual(response.data['results'][0]['full_name'], 'John Smith')
+        self.assertEqual(self.client.get('/api/customers/lookup/', {'q': ''}).data['results'], [])
+        self.assertEqual(self.client.get('/api/customers/lookup/', {'limit': 'x'}).status_code, 400)
+
+    def test_search_advanced_name_and_location(self):
+        response = self.client.get('/api/customers/search_advanced/', {'name': 'jo', 'location': 'new york'})
+        self.assertEqual({row['email'] for row in response.data['results']}, {'joana@example.com', 'jsmith@example.com'})
+        response = self.client.get('/api/customers/search_advanced/', {'location': 'reci'})
+        self.assertEqual([row['email'] for row in response.data['results']], ['johnny.fan@example.com'])
+
+
+class CustomerLabelTests(IndexUsageMixin, TestCase):
+    """Tag/preference label rows follow the JSON fields and back audience filters"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('labeler', 'labeler@example.com', 'secret-pass')
+        cls.vip = create_customer(1, tags=['VIP'], preferences=['whatsapp_news'])
+        cls.vip_email = create_customer(2, tags=['VIP', 'Diabetic'], preferences=['email_news'])
+        cls.plain = create_customer(3)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def labels(self, customer):
+        return set(CustomerLabel.objects.filter(customer=customer).values_list('kind', 'value'))
+
+    def audience(self, query):
+        response = self.client.get(f'/api/customers/search_advanced/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return {row['email'] for row in response.data['results']}
+
+    def test_labels_follow_saves(self):
+        self.assertEqual(self.labels(self.vip_email), {
+            ('tag', 'VIP'), ('tag', 'Diabetic'), ('preference', 'email_news'),
+        })
+        response = self.client.patch(
+            f'/api/customers/{self.vip_email.uuid}/', {'tags': ['Diabetic']}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.labels(self.vip_email), {('tag', 'Diabetic'), ('preference', 'email_news')})
+
+    def test_import_syncs_labels(self):
+        content = CustomerImportTests.HEADER + (
+            f'Ana,Silva,{self.plain.email},5551234567,1990-01-15,female,1 Street,1,Center,Recife,PE,50000,Brazil,'
+            'whatsapp_news,VIP\n'
+        )
+        upload = SimpleUploadedFile('customers.csv', content.encode(), content_type='text/csv')
+        self.client.post('/api/customers/import/', {'file': upload}, format='multipart')
+        self.assertEqual(self.labels(self.plain), {('tag', 'VIP'), ('preference', 'whatsapp_news')})
+
+    def test_audience_filters(self):
+        self.assertEqual(self.audience('tags=VIP'), {self.vip.email, self.vip_email.email})
+        self.assertEqual(self.audience('tags=VIP&preferences=whatsapp_news'), {self.vip.email})
+        self.assertEqual(self.audience('tags=VIP,Diabetic'), {self.vip_email.email})
+
+    def test_audience_filter_uses_index(self):
+        request = lambda: self.client.get('/api/customers/search_advanced/?tags=VIP&preferences=whatsapp_news')
+        self.assertUsesIndex('customers', request)
+        # Label subqueries are aliased (U0) in the plan; none of them may be a full scan
+        for sql in self.capture_table_queries('customers', request):
+            plan = self.explain(sql)
+            full_scans = [
+                line for line in plan
+                if 'Seq Scan' in line or (line.startswith('SCAN') and 'INDEX' not in line)
+            ]
+            self.assertFalse(full_scans, '\n'.join(plan))
+
+
+class CustomerOverviewTests(TestCase):
+    """The profile overview bundles the customer, statistics and recent activity in fixed queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('viewer', 'viewer@example.com', 'secret-pass')
+        cls.customer = create_customer(1)
+        cls.other = create_customer(2)
+        appointment_type = AppointmentType.objects.create(description='Haircut')
+        now = timezone.now()
+        for days, status in ((-10, 'confirmed'), (-5, 'cancelled'), (-2, 'scheduled'), (3, 'scheduled')):
+            start = now + timedelta(days=days)
+            Appointment.objects.create(
+                customer=cls.customer, appointment_type=appointment_type, status=status,
+                start_time=start, end_time=start + timedelta(hours=1),
+            )
+        order_type = OrderType.objects.create(type='Income')
+        payment_type = PaymentType.objects.create(type='Cash')
+        item = OrderItem.objects.create(description='Shampoo', unit_price='10.00', inventory_quantity=5)
+        for customer, total in ((cls.customer, '30.00'), (cls.customer, '12.50'), (cls.other, '99.00')):
+            order = Order.objects.create(
+                customer=customer, order_type=order_type, payment_type=payment_type, total=total
+            )
+            OrderItemLine.objects.create(order=order, order_item=item, quantity=1, unit_price='10.00')
+        # Expenses are not spend
+        Order.objects.create(
+            customer=cls.customer, order_type=OrderType.objects.create(type='Expense'),
+            payment_type=payment_type, total='7.00',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_overview(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/customers/{self.customer.uuid}/overview/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['customer']['email'], self.customer.email)
+        statistics = response.data['statistics']
+        self.assertEqual(statistics['lifetime_income'], '42.50')
+        self.assertEqual(statistics['order_count'], 3)
+        self.assertEqual(statistics['cancelled_count'], 1)
+        self.assertIsNotNone(statistics['last_order_at'])
+        self.assertEqual(statistics['visit_count'], 2)
+        self.assertEqual(statistics['upcoming_appointments'], 1)
+        self.assertLess(statistics['last_visit_at'], statistics['last_appointment_at'])
+        # Stored figures are the customer's stats, under the same names
+        for name, value in response.data['customer']['stats'].items():
+            self.assertEqual(statistics[name], value)
+
+        starts = [appointment['start_time'] for appointment in response.data['recent_appointments']]
+        self.assertEqual(len(starts), 4)
+        self.assertEqual(starts, sorted(starts, reverse=True))
+        self.assertEqual(len(response.data['recent_orders']), 3)
+        self.assertEqual(len(response.data['recent_orders'][1]['order_items']), 1)
+
+    def test_limits(self):
+        response = self.client.get(f'/api/customers/{self.customer.uuid}/overview/?appointments=1&orders=0')
+        self.assertEqual(len(response.data['recent_appointments']), 1)
+        self.assertEqual(response.data['recent_orders'], [])
+        for query in ('orders=-1', 'appointments=51', 'orders=all'):
+            response = self.client.get(f'/api/customers/{self.customer.uuid}/overview/?{query}')
+            self.assertEqual(response.status_code, 400)
+
+    def test_customer_without_history(self):
+        customer = create_customer(3)
+        response = self.client.get(f'/api/customers/{customer.uuid}/overview/')
+        self.assertEqual(response.data['statistics'], {
+            'lifetime_income': '0.00', 'order_count': 0, 'last_order_at': None, 'last_appointment_at': None,
+            'cancelled_count': 0, 'visit_count': 0, 'last_visit_at': None, 'upcoming_appointments': 0,
+        })
+
+
+class CustomerStatsTests(TestCase):
+    """Denormalized customer statistics follow order/appointment writes and back sorting and filtering"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst', 'analyst@example.com', 'secret-pass')
+        cls.customer = create_customer(1)
+        cls.other = create_customer(2)
+        cls.income = OrderType.objects.create(type='Income')
+        cls.expense = OrderType.objects.create(type='Expense')
+        cls.cash = PaymentType.objects.create(type='Cash')
+        cls.appointment_type = AppointmentType.objects.create(description='Haircut')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_order(self, customer, total, order_type=None):
+        return Order.objects.create(
+            customer=customer, order_type=order_type or self.income, payment_type=self.cash, total=total
+        )
+
+    def create_appointment(self, customer, days, status='scheduled'):
+        start = timezone.now() + timedelta(days=days)
+        return Appointment.objects.create(
+            customer=customer, appointment_type=self.appointment_type, status=status,
+            start_time=start, end_time=start + timedelta(hours=1),
+        )
+
+    def stats(self, customer):
+        return CustomerStats.objects.get(customer=customer)
+
+    def test_new_customers_start_empty(self):
+        stats = self.stats(self.customer)
+        self.assertEqual((stats.lifetime_income, stats.order_count, stats.last_order_at), (0, 0, None))
+
+    def test_orders_update_stats(self):
+        first = self.create_order(self.customer, '40.00')
+        self.create_order(self.customer, '15.00', order_type=self.expense)
+        stats = self.stats(self.customer)
+        self.assertEqual(stats.lifetime_income, Decimal('40.00'))
+        self.assertEqual(stats.order_count, 2)
+        self.assertIsNotNone(stats.last_order_at)
+
+        # Moving an order refreshes both customers
+        first.customer = self.other
+        first.save()
+        self.assertEqual(self.stats(self.customer).lifetime_income, 0)
+        self.assertEqual(self.stats(self.other).lifetime_income, Decimal('40.00'))
+
+        first.delete()
+        self.assertEqual(self.stats(self.other).order_count, 0)
+
+    def test_appointments_update_stats(self):
+        appointment = self.create_appointment(self.customer, days=-2)
+        self.create_appointment(self.customer, days=-5, status='cancelled')
+        stats = self.stats(self.customer)
+        self.assertEqual(stats.last_appointment_at, appointment.start_time)
+        self.assertEqual(stats.cancelled_count, 1)
+
+        appointment.status = 'cancelled'
+        appointment.save()
+        stats = self.stats(self.customer)
+        self.assertIsNone(stats.last_appointment_at)
+        self.assertEqual(stats.cancelled_count, 2)
+
+    def test_bulk_orders_update_stats(self):
+        item = OrderItem.objects.create(description='Shampoo', unit_price='10.00', inventory_quantity=5)
+        response = self.client.post('/finances/api/orders/bulk/', [{
+            'customer': str(self.other.uuid), 'order_type': str(self.income.uuid),
+            'payment_type': str(self.cash.uuid),
+            'order_items': [{'order_item': str(item.uuid), 'quantity': 2, 'unit_price': '10.00'}],
+        }], format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.stats(self.other).order_count, 1)
+        self.assertEqual(self.stats(self.other).lifetime_income, Decimal('20.00'))
+
+    def test_deleting_a_customer_with_history(self):
+        self.create_order(self.customer, '10.00')
+        self.create_appointment(self.customer, days=1)
+        self.customer.delete()
+        self.assertFalse(CustomerStats.objects.filter(customer_id=self.customer.pk).exists())
+
+    def test_rebuild_command(self):
+        self.create_order(self.customer, '25.00')
+        CustomerStats.objects.all().delete()
+        out = io.StringIO()
+        call_command('rebuild_customer_stats', stdout=out)
+        self.assertIn('Rebuilt statistics for 2 customers', out.getvalue())
+        self.assertEqual(self.stats(self.customer).lifetime_income, Decimal('25.00'))
+        self.assertEqual(self.stats(self.other).order_count, 0)
+
+    def test_order_and_filter_by_stats(self):
+        self.create_order(self.customer, '10.00')
+        self.create_order(self.other, '90.00')
+        response = self.client.get('/api/customers/?ordering=-stats__lifetime_income')
+        self.assertEqual(
+            [row['email'] for row in response.data['results']], [self.other.email, self.customer.email]
+        )
+        self.assertEqual(response.data['results'][0]['stats']['lifetime_income'], '90.00')
+
+        response = self.client.get('/api/customers/?stats__lifetime_income__gte=50')
+        self.assertEqual([row['email'] for row in response.data['results']], [self.other.email])
+        response = self.client.get('/api/customers/?stats__last_appointment_at__isnull=true')
+        self.assertEqual(response.data['count'], 2)
+
+
+class SegmentTests(TestCase):
+    """Segment predicates compile to one query; counts are cached until the next relevant write"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('marketer', 'marketer@example.com', 'secret-pass')
+        today = timezone.localdate()
+        cls.vip = create_customer(
+            1, tags=['VIP'], preferences=['email_news'], address_city='Boston',
+            date_of_birth=today.replace(year=today.year - 30),
+        )
+        cls.regular = create_customer(2, date_of_birth=today.replace(year=today.year - 50))
+        cls.inactive = create_customer(3, tags=['VIP'], is_active=False)
+        cls.order_type = OrderType.objects.create(type='Income')
+        cls.payment_type = PaymentType.objects.create(type='Cash')
+        cls.appointment_type = AppointmentType.objects.create(description='Haircut')
+        cls.create_order(cls.vip, '150.00')
+        cls.create_order(cls.vip, '100.00')
+        cls.create_order(cls.regular, '20.00')
+        # Expenses do not count as spend
+        Order.objects.create(
+            customer=cls.regular, order_type=OrderType.objects.create(type='Expense'),
+            payment_type=cls.payment_type, total='500.00',
+        )
+        for status in ('confirmed', 'cancelled'):
+            start = timezone.now() - timedelta(days=3)
+            Appointment.objects.create(
+                customer=cls.vip, appointment_type=cls.appointment_type, status=status,
+                start_time=start, end_time=start + timedelta(hours=1),
+            )
+
+    @classmethod
+    def create_order(cls, customer, total):
+        return Order.objects.create(
+            customer=customer, order_type=cls.order_type, payment_type=cls.payment_type, total=total
+        )
+
+    def setUp(self):
+        # Rolled back test data does not bump the generation, start every test cold
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def preview(self, definition):
+        response = self.client.post('/api/segments/preview/', definition, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['count']
+
+    def create_segment(self, definition):
+        response = self.client.post(
+            '/api/segments/', {'name': 'Audience', 'definition': definition}, format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['uuid']
+
+    def test_predicates(self):
+        self.assertEqual(self.preview({}), 3)
+        self.assertEqual(self.preview({'tags': ['VIP']}), 2)
+        self.assertEqual(self.preview({'tags': ['VIP'], 'is_active': True}), 1)
+        self.assertEqual(self.preview({'cities': ['Boston', 'Chicago']}), 1)
+        self.assertEqual(self.preview({'preferences': ['email_news'], 'gender': 'female'}), 1)
+        self.assertEqual(self.preview({'min_age': 30, 'max_age': 30}), 1)
+        self.assertEqual(self.preview({'min_age': 31}), 2)
+        self.assertEqual(self.preview({'min_spend': '200'}), 1)
+        self.assertEqual(self.preview({'max_spend': '50'}), 2)
+        self.assertEqual(self.preview({'last_order_after': str(timezone.localdate())}), 2)
+        self.assertEqual(self.preview({'last_order_before': str(timezone.localdate())}), 0)
+        # Cancelled visits do not count
+        self.assertEqual(self.preview({'min_appointments': 1, 'max_appointments': 1}), 1)
+        self.assertEqual(self.preview({
+            'min_appointments': 1, 'appointments_since': str(timezone.localdate()),
+        }), 0)
+
+    def test_definition_is_validated(self):
+        for definition in ({'tags': ['Gold']}, {'min_age': 40, 'max_age': 30}, {'city': 'Boston'}):
+            response = self.client.post('/api/segments/preview/', definition, format='json')
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/segments/', {'name': 'Bad', 'definition': {'min_spend': -1}}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_segment_is_a_single_query(self):
+        definition = {
+            'tags': ['VIP'], 'preferences': ['email_news'], 'cities': ['Boston'], 'min_age': 18,
+            'last_order_after': '2000-01-01', 'min_spend': '100', 'min_appointments': 1,
+        }
+        with self.assertNumQueries(1):
+            self.assertEqual(self.preview(definition), 1)
+
+    def test_count_is_cached_until_an_order_is_written(self):
+        url = f"/api/segments/{self.create_segment({'min_spend': '100'})}/count/"
+        self.assertEqual(self.client.get(url).data['count'], 1)
+        # Only the segment lookup; membership comes from the cache
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).data['count'], 1)
+
+        self.create_order(self.regular, '90.00')
+        self.assertEqual(self.client.get(url).data['count'], 2)
+
+    def test_customer_and_appointment_writes_invalidate(self):
+        url = f"/api/segments/{self.create_segment({'tags': ['VIP'], 'min_appointments': 1})}/count/"
+        self.assertEqual(self.client.get(url).data['count'], 1)
+
+        self.inactive.tags = []
+        self.inactive.save()
+        start = timezone.now()
+        Appointment.objects.create(
+            customer=self.inactive, appointment_type=self.appointment_type,
+            start_time=start, end_time=start + timedelta(hours=1),
+        )
+        self.assertEqual(self.client.get(url).data['count'], 1)
+
+        self.inactive.tags = ['VIP']
+        self.inactive.save()
+        self.assertEqual(self.client.get(url).data['count'], 2)
+
+    def test_members_stream(self):
+        segment = self.create_segment({'tags': ['VIP']})
+        response = self.client.get(f'/api/segments/{segment}/members/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual({row['email'] for row in rows}, {self.vip.email, self.inactive.email})
+        self.assertEqual([row['uuid'] for row in rows], sorted(row['uuid'] for row in rows))
+
+    @override_settings(SEGMENT_CACHE_MAX_MEMBERS=1)
+    def test_large_segments_stream_from_the_query(self):
+        segment = self.create_segment({'tags': ['VIP']})
+        self.assertEqual(self.client.get(f'/api/segments/{segment}/count/').data['count'], 2)
+        response = self.client.get(f'/api/segments/{segment}/members/')
+        rows = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(rows), 2)
+
+
+class KeysetPaginationTests(TestCase):
+    """Keyset mode walks every row exactly once without issuing a COUNT"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('pager', 'pager@example.com', 'secret-pass')
+        for i in range(45):
+            create_customer(i)
+        # Identical timestamps force the uuid tie breaker to do its job
+        Customer.objects.filter(first_name__endswith='1').update(created_at=timezone.now())
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_walks_all_rows_in_order(self):
+        seen = []
+        url = '/api/customers/?pagination=cursor'
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(row['uuid'] for row in response.data['results'])
+            url = response.data['next']
+
+        expected = [
+            str(pk) for pk in
+            Customer.objects.order_by('-created_at', 'uuid').values_list('uuid', flat=True)
+        ]
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/customers/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_mode_is_default(self):
+        response = self.client.get('/api/customers/?page=2')
+        self.assertEqual(response.data['count'], 45)
+        self.assertEqual(len(response.data['results']), 20)
+
+
+class ConditionalGetTests(TestCase):
+    """Detail and list endpoints answer revalidations with 304 before serializing"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('poller', 'poller@example.com', 'secret-pass')
+        cls.customers = [create_customer(i, email=f'poll{i}@example.com') for i in range(3)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/customers/{self.customers[0].uuid}/'
+
+    def test_detail_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertEqual(cached.content, b'')
+
+        since = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+    def test_detail_changes_with_related_stats(self):
+        etag = self.client.get(self.url)['ETag']
+        CustomerStats.objects.filter(customer=self.customers[0]).update(
+            order_count=4, updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stats']['order_count'], 4)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_not_modified_until_rows_change(self):
+        response = self.client.get('/api/customers/')
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/customers/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Other query strings are other representations
+        self.assertEqual(self.client.get('/api/customers/?ordering=email', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.customers[2].delete()
+        response = self.client.get('/api/customers/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_writes_do_not_get_validators(self):
+        response = self.client.patch(self.url, {'nickname': 'Cee'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+class CustomerImportTests(TestCase):
+    """CSV/NDJSON imports upsert customers by email and report invalid rows"""
+
+    HEADER = (
+        'first_name,last_name,email,phone,date_of_birth,gender,address_street,address_number,'
+        'address_neighborhood,address_city,address_state,address_zip_code,address_country,preferences,tags\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('importer', 'importer@example.com', 'secret-pass')
+        create_customer(1, first_name='Old', last_name='Name', email='ana@example.com')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_csv_upsert(self):
+        content = self.HEADER + (
+            'Ana,Silva,ana@example.com,5551234567,1990-01-15,female,1 Street,1,Center,Recife,PE,50000,Brazil,'
+            '"whatsapp_news,email_news",VIP\n'
+            'Bia,Souza,bia@example.com,5551234568,1992-03-01,female,2 Street,2,Center,Recife,PE,50000,Brazil,,\n'
+            'Bad,Row,not-an-email,123,1992-03-01,female,2 Street,2,Center,Recife,PE,50000,Brazil,,unknown\n'
+        )
+        upload = SimpleUploadedFile('customers.csv', content.encode(), content_type='text/csv')
+        response = self.client.post('/api/customers/import/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {key: response.data[key] for key in ('processed', 'created', 'updated', 'failed')},
+            {'processed': 3, 'created': 1, 'updated': 1, 'failed': 1},
+        )
+        self.assertEqual(response.data['errors'][0]['row'], 3)
+        self.assertIn('tags', response.data['errors'][0]['errors'])
+
+        ana = Customer.objects.get(email='ana@example.com')
+        self.assertEqual(ana.first_name, 'Ana')
+        self.assertEqual(ana.preferences, ['whatsapp_news', 'email_news'])
+        self.assertEqual(ana.tags, ['VIP'])
+
+    def test_ndjson_command(self):
+        row = (
+            '{"first_name": "Caio", "last_name": "Lima", "email": "caio@example.com", '
+            '"phone": "5551234569", "date_of_birth": "1988-07-07", "gender": "male", '
+            '"address_street": "3 Street", "address_number": "3", "address_neighborhood": "Center", '
+            '"address_city": "Recife", "address_state": "PE", "address_zip_code": "50000", '
+            '"address_country": "Brazil", "tags": ["Diabetic"]}\n'
+        )
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as handle:
+            handle.write(row + 'not json\n')
+            handle.flush()
+            out = io.StringIO()
+            call_command('import_customers', handle.name, stdout=out)
+
+        self.assertIn('1 created, 0 updated, 1 failed', out.getvalue())
+        self.assertEqual(Customer.objects.get(email='caio@example.com').tags, ['Diabetic'])
+
+
+def create_customer(index, **fields):
+    values = dict(
+        first_name=f'Customer{index}', last_name='Doe', email=f'customer{index}@example.com',
+        phone='5551234567', date_of_birth=date(1990, 1, 15), gender='female',
+        address_street='123 Main Street', address_number='4B',
+        address_neighborhood='Downtown', address_city='New York',
+        address_state='NY', address_zip_code='10001', address_country='USA',
+    )
+    values.update(fields)
+    return Customer.objects.create(**values)
+
+
+class CustomerRelationshipQueryCountTests(QueryCountMixin, TestCase):
+    """Every customer and appointment action costs a fixed number of queries as data grows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', 'counter@example.com', 'secret-pass')
+        cls.customer = create_customer(0)
+        cls.appointment_type = AppointmentType.objects.create(description='Haircut')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.seeded = 0
+        self.slots_taken = 0
+
+    def grow(self, count):
+        """Add customers, each with an appointment of their own and one for self.customer"""
+        for _ in range(count):
+            self.seeded += 1
+            customer = create_customer(f'seed{self.seeded}')
+            for owner in (customer, self.customer):
+                self.create_appointment(owner)
+
+    def create_appointment(self, customer=None):
+        start = timezone.now() + timedelta(minutes=5)
+        return Appointment.objects.create(
+            customer=customer or self.customer, appointment_type=self.appointment_type,
+            start_time=start, end_time=start + timedelta(hours=1),
+        )
+
+    def customer_payload(self, email):
+        return {
+            'first_name': 'New', 'last_name': 'Customer', 'email': email,
+            'phone': '5550000000', 'date_of_birth': '1991-02-03', 'gender': 'male',
+            'address_street': 'Main Street', 'address_number': '1',
+            'address_neighborhood': 'Center', 'address_city': 'Boston',
+            'address_state': 'MA', 'address_zip_code': '02101', 'address_country': 'USA',
+        }
+
+    def appointment_payload(self):
+        # A new slot per call so repeated requests never double-book
+        self.slots_taken += 1
+        start = timezone.now() + timedelta(days=1, hours=2 * self.slots_taken)
+        return {
+            'customer': str(self.customer.uuid), 'appointment_type': str(self.appointment_type.uuid),
+            'start_time': start.isoformat(), 'end_time': (start + timedelta(hours=1)).isoformat(),
+        }
+
+    def fresh_customer(self):
+        return create_customer(f'fresh{Customer.objects.count()}')
+
+    # Customers
+
+    def test_customer_list(self):
+        self.assertConstantQueries(lambda: self.client.get('/api/customers/'))
+
+    def test_customer_list_keyset(self):
+        self.assertConstantQueries(lambda: self.client.get('/api/customers/?pagination=cursor'))
+
+    def test_customer_retrieve(self):
+        self.assertConstantQueries(lambda: self.client.get(f'/api/customers/{self.customer.uuid}/'))
+
+    def test_customer_overview(self):
+        response = self.assertConstantQueries(
+            lambda: self.client.get(f'/api/customers/{self.customer.uuid}/overview/')
+        )
+        self.assertEqual(len(response.data['recent_appointments']), 5)
+
+    def test_customer_create(self):
+        response = self.assertConstantQueries(
+            lambda email: self.client.post('/api/customers/', self.customer_payload(email), format='json'),
+            prepare=lambda: f'new{Customer.objects.count()}@example.com',
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_customer_update(self):
+        response = self.assertConstantQueries(
+            lambda customer: self.client.put(
+                f'/api/customers/{customer.uuid}/', self.customer_payload(customer.email), format='json'
+            ),
+            prepare=self.fresh_customer,
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_customer_partial_update(self):
+        self.assertConstantQueries(lambda: self.client.patch(
+            f'/api/customers/{self.customer.uuid}/', {'nickname': 'JD'}, format='json'
+        ))
+
+    def test_customer_destroy(self):
+        response = self.assertConstantQueries(
+            lambda customer: self.client.delete(f'/api/customers/{customer.uuid}/'),
+            prepare=self.fresh_customer,
+        )
+        self.assertEqual(response.status_code, 204)
+
+    def test_customer_active(self):
+        self.assertConstantQueries(lambda: self.client.get('/api/customers/active/'))
+
+    def test_customer_deactivate_and_activate(self):
+        for name in ('deactivate', 'activate'):
+            response = self.assertConstantQueries(
+                lambda: self.client.post(f'/api/customers/{self.customer.uuid}/{name}/')
+            )
+            self.assertEqual(response.status_code, 200)
+
+    def test_customer_search_advanced(self):
+        self.assertConstantQueries(
+            lambda: self.client.get(
+                '/api/customers/search_advanced/?name=Customer&location=York&tags=VIP&preferences=email_news'
+            )
+        )
+
+    def test_customer_import(self):
+        def upload(index):
+            content = CustomerImportTests.HEADER + (
+                f'Imported,Customer,imported{index}@example.com,5551234567,1990-01-15,female,'
+                '1 Street,1,Center,Recife,PE,50000,Brazil,,\n'
+            )
+            return SimpleUploadedFile('customers.csv', content.encode(), content_type='text/csv')
+
+        response = self.assertConstantQueries(
+            lambda file: self.client.post('/api/customers/import/', {'file': file}, format='multipart'),
+            prepare=lambda: upload(Customer.objects.count()),
+        )
+        self.assertEqual(response.data['created'], 1)
+
+    # Appointment types
+
+    def test_appointment_type_list(self):
+        self.assertConstantQueries(lambda: self.client.get('/api/appointment-types/'))
+
+    def test_appointment_type_responses_are_cached(self):
+        self.client.get('/api/appointment-types/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/appointment-types/')
+        AppointmentType.objects.create(description='Color')
+        response = self.client.get('/api/appointment-types/')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_appointment_type_crud(self):
+        url = f'/api/appointment-types/{self.appointment_type.uuid}/'
+        self.assertConstantQueries(lambda: self.client.get(url))
+        self.assertConstantQueries(lambda: self.client.put(url, {'description': 'Cut'}, format='json'))
+        self.assertConstantQueries(lambda: self.client.patch(url, {'description': 'Trim'}, format='json'))
+        self.assertConstantQueries(
+            lambda: self.client.post('/api/appointment-types/', {'description': 'Color'}, format='json')
+        )
+        self.assertConstantQueries(
+            lambda appointment_type: self.client.delete(f'/api/appointment-types/{appointment_type.uuid}/'),
+            prepare=lambda: AppointmentType.objects.create(description='Temporary'),
+        )
+
+    # Appointments
+
+    def test_appointment_list(self):
+        self.assertConstantQueries(lambda: self.client.get('/api/appointments/'))
+
+    def test_appointment_retrieve(self):
+        appointment = self.create_appointment()
+        self.assertConstantQueries(lambda: self.client.get(f'/api/appointments/{appointment.uuid}/'))
+
+    def test_appointment_create(self):
+        response = self.assertConstantQueries(
+            lambda: self.client.post('/api/appointments/', self.appointment_payload(), format='json')
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_appointment_update(self):
+        response = self.assertConstantQueries(
+            lambda appointment: self.client.put(
+                f'/api/appointments/{appointment.uuid}/', self.appointment_payload(), format='json'
+            ),
+            prepare=self.create_appointment,
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_appointment_partial_update(self):
+        self.assertConstantQueries(
+            lambda appointment: self.client.patch(
+                f'/api/appointments/{appointment.uuid}/', {'notes': 'Bring photos'}, format='json'
+            ),
+            prepare=self.create_appointment,
+        )
+
+    def test_appointment_destroy(self):
+        response = self.assertConstantQueries(
+            lambda appointment: self.client.delete(f'/api/appointments/{appointment.uuid}/'),
+            prepare=self.create_appointment,
+        )
+        self.assertEqual(response.status_code, 204)
+
+    def test_appointment_today_and_upcoming(self):
+        for name in ('today', 'upcoming'):
+            response = self.assertConstantQueries(lambda: self.client.get(f'/api/appointments/{name}/'))
+            self.assertEqual(response.status_code, 200)
+
+    def test_appointment_confirm_and_cancel(self):
+        for name in ('confirm', 'cancel'):
+            response = self.assertConstantQueries(
+                lambda appointment: self.client.post(f'/api/appointments/{appointment.uuid}/{name}/'),
+                prepare=self.create_appointment,
+            )
+            self.assertEqual(response.status_code, 200)
+
+    def test_appointment_by_customer(self):
+        self.assertConstantQueries(
+            lambda: self.client.get(f'/api/appointments/by_customer/?customer_uuid={self.customer.uuid}')
+        )
+
+    def test_appointment_calendar(self):
+        day = timezone.localdate()
+        response = self.assertConstantQueries(
+            lambda: self.client.get(f'/api/appointments/calendar/?start={day}&end={day + timedelta(days=6)}')
+        )
+        self.assertEqual(response.data['count'], 30)
+
+    def test_appointment_availability(self):
+        response = self.assertConstantQueries(lambda: self.client.get(
+            f'/api/appointments/availability/?appointment_type={self.appointment_type.uuid}'
+        ))
+        self.assertEqual(response.status_code, 200)
+
+
+    # Segments
+
+    def test_segment_list_and_crud(self):
+        segment = Segment.objects.create(name='VIP', definition={'tags': ['VIP']})
+        url = f'/api/segments/{segment.uuid}/'
+        self.assertConstantQueries(lambda: self.client.get('/api/segments/'))
+        self.assertConstantQueries(lambda: self.client.get(url))
+        self.assertConstantQueries(
+            lambda: self.client.patch(url, {'definition': {'tags': ['VIP'], 'min_age': 18}}, format='json')
+        )
+        response = self.assertConstantQueries(
+            lambda name: self.client.post('/api/segments/', {'name': name, 'definition': {}}, format='json'),
+            prepare=lambda: f'Segment {Segment.objects.count()}',
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_segment_count_and_members(self):
+        segment = Segment.objects.create(name='Regulars', definition={
+            'cities': ['New York'], 'min_appointments': 1, 'max_spend': '1000',
+        })
+        for name in ('count', 'members'):
+            response = self.assertConstantQueries(lambda: self.client.get(f'/api/segments/{segment.uuid}/{name}/'))
+            self.assertEqual(response.status_code, 200)
+
+    def test_segment_preview(self):
+        response = self.assertConstantQueries(lambda: self.client.post(
+            '/api/segments/preview/', {'tags': ['VIP'], 'last_order_before': '2030-01-01'}, format='json'
+        ))
+        self.assertEqual(response.status_code, 200)
@@ -1,12 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CustomerViewSet, AppointmentTypeViewSet, AppointmentViewSet
+from .views import CustomerViewSet, AppointmentTypeViewSet, AppointmentViewSet, SegmentViewSet
 
 # Create a router and register the ViewSets
 router = DefaultRouter()
 router.register(r'customers', CustomerViewSet, basename='customer')
 router.register(r'appointment-types', AppointmentTypeViewSet, basename='appointment-type')
 router.register(r'appointments', AppointmentViewSet, basename='appointment')
+router.register(r'segments', SegmentViewSet, basename='segment')
 
 app_name = 'customer_relationship'
 
@@ -28,6 +29,9 @@ urlpatterns = [
 # POST /api/customers/{uuid}/deactivate/ - Deactivate a customer
 # POST /api/customers/{uuid}/activate/ - Activate a customer
 # GET /api/customers/search_advanced/ - Advanced search with multiple criteria
+# GET /api/customers/{uuid}/overview/ - Customer with lifetime spend/visit statistics, recent appointments and orders with lines (?appointments=5, ?orders=5, max 50)
+# GET /api/customers/lookup/ - Ranked as-you-type lookup (?q=jo sm, ?limit=10) served by the search index
+# POST /api/customers/import/ - Upsert customers by email from a CSV/NDJSON upload (multipart 'file')
 
 # APPOINTMENT TYPES:
 # GET /api/appointment-types/ - List all appointment types (with pagination, filtering, search)
@@ -49,13 +53,39 @@ urlpatterns = [
 # POST /api/appointments/{uuid}/confirm/ - Confirm an appointment
 # POST /api/appointments/{uuid}/cancel/ - Cancel an appointment
 # GET /api/appointments/by_customer/ - Get appointments for a specific customer
+# GET /api/appointments/calendar/ - Appointments overlapping ?start=&end= (dates or ISO datetimes) as columns plus name lookup tables
+# GET /api/appointments/availability/ - Free slots for an appointment type (?appointment_type={uuid}, ?date_from=, ?date_to=, ?duration=minutes, ?opening=HH:MM, ?closing=HH:MM)
+
+# SEGMENTS:
+# GET /api/segments/ - List all segments (?search=, ?ordering=name,-created_at)
+# POST /api/segments/ - Create a segment ({"name": ..., "definition": {predicates}})
+# GET /api/segments/{uuid}/ - Retrieve a specific segment
+# PUT /api/segments/{uuid}/ - Update a specific segment (full update)
+# PATCH /api/segments/{uuid}/ - Partial update a specific segment
+# DELETE /api/segments/{uuid}/ - Delete a specific segment
+# GET /api/segments/{uuid}/count/ - Number of matching customers (cached)
+# GET /api/segments/{uuid}/members/ - Matching customers streamed as NDJSON
+# POST /api/segments/preview/ - Count customers matching an unsaved definition
+# Definition predicates: tags, preferences, cities, states, countries, gender, is_active, min_age, max_age,
+# last_order_after, last_order_before, min_spend, max_spend, min_appointments, max_appointments, appointments_since
 
 # Query parameters for filtering:
 # Customers: ?is_active=true/false, ?gender=male/female/other, ?address_country=USA, etc.
+# Customer statistics (maintained on order/appointment writes, rebuilt by `manage.py rebuild_customer_stats`):
+# ?stats__lifetime_income__gte=500, ?stats__order_count__lte=1, ?stats__last_order_at__lte=2025-01-01,
+# ?stats__last_appointment_at__isnull=true, ?stats__cancelled_count__gte=2 and the same fields in ?ordering=-stats__lifetime_income
 # Appointments: ?status=scheduled/confirmed/cancelled, ?appointment_type={uuid}, ?customer={uuid}
-# ?search=term (searches in relevant fields)
+# Pagination: ?page=N (default, includes count) or ?pagination=cursor for keyset pages;
+# keyset responses only carry `next` (follow it, it holds ?cursor=...) and skip the count query
+# ?search=term (searches in relevant fields; customers match word prefixes of name/email/phone through the search index)
 # ?ordering=created_at,-updated_at,start_time,-end_time (for appointments)
+# Appointment type list and retrieve responses are cached until the next write and carry an ETag;
+# send it back in If-None-Match to get 304 Not Modified
+# Other list and detail responses carry an ETag (details also Last-Modified) computed from updated_at
+# of the page/object and its related rows; If-None-Match / If-Modified-Since get 304 without a body
 
 # Advanced search query parameters:
 # Customer search: ?name=John, ?location=New York, ?tags=VIP,Diabetic, ?preferences=whatsapp_news
-# Appointment search: ?customer_uuid={uuid} (for by_customer endpoint)
\ No newline at end of file
+# (every listed tag/preference must be present; matched through the indexed customer_labels table)
+# Appointment search: ?customer_uuid={uuid} (for by_customer endpoint)
+# Scheduled/confirmed appointments of the same type may not overlap (create, update and confirm return 400)
\ No newline at end of file
@@ -1,18 +1,33 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db import IntegrityError, transaction
 from django.utils import timezone
-from .models import Customer, AppointmentType, Appointment
+from queenbe_backend.caching import CachedResponseMixin, ConditionalGetMixin
+from queenbe_backend.streaming import stream_ndjson
+from finances.rollups import day_bounds
+from .availability import (
+    ACTIVE_STATUSES, OVERLAP_MESSAGE, find_availability, is_overlap_violation, parse_availability_params,
+    slot_taken,
+)
+from .calendars import build_calendar, calendar_rows, parse_calendar_range
+from .importers import CustomerImporter, IMPORT_FORMATS, detect_format, read_rows
+from .labels import filter_by_labels
+from .models import Customer, AppointmentType, Appointment, Segment
+from .overviews import build_overview, parse_overview_params, with_statistics
+from .search import CustomerSearchFilter, lookup_customers, search_customers
+from .segments import segment_member_rows, segment_membership
 from .serializers import (
-    CustomerSerializer, CustomerCreateSerializer, CustomerUpdateSerializer,
+    CustomerSerializer, CustomerCreateSerializer, CustomerUpdateSerializer, CustomerLookupSerializer,
     AppointmentTypeSerializer, AppointmentTypeCreateSerializer, AppointmentTypeUpdateSerializer,
-    AppointmentSerializer, AppointmentCreateSerializer, AppointmentUpdateSerializer
+    AppointmentSerializer, AppointmentCreateSerializer, AppointmentUpdateSerializer,
+    SegmentSerializer, SegmentDefinitionSerializer
 )
 
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Customer CRUD operations
     
@@ -28,17 +43,43 @@ class CustomerViewSet(viewsets.ModelViewSet):
     - GET /api/customers/active/ - List only active customers
     - POST /api/customers/{uuid}/deactivate/ - Deactivate a customer
     - POST /api/customers/{uuid}/activate/ - Activate a customer
+    - POST /api/customers/import/ - Upsert customers (by email) from a CSV/NDJSON file
+    - GET /api/customers/lookup/?q= - Ranked as-you-type customer lookup
+    - GET /api/customers/{uuid}/overview/ - Customer, statistics, recent appointments and orders
+    
+    ?search= and the lookup are answered from the customer search index (see search.py).
     """
     
-    queryset = Customer.objects.all()
+    queryset = Customer.objects.select_related('stats')
     serializer_class = CustomerSerializer
     lookup_field = 'uuid'
+    # Related rows shown in responses; their changes invalidate the ETag
+    conditional_dependencies = ('stats',)
+    
+    # Maximum number of results returned by the lookup endpoint
+    lookup_max_results = 50
     
     # Enable filtering, searching, and ordering
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['is_active', 'gender', 'address_country', 'address_state', 'address_city']
+    filter_backends = [DjangoFilterBackend, CustomerSearchFilter, filters.OrderingFilter]
+    filterset_fields = {
+        'is_active': ['exact'],
+        'gender': ['exact'],
+        'address_country': ['exact'],
+        'address_state': ['exact'],
+        'address_city': ['exact'],
+        # Denormalized statistics (see stats.py), e.g. ?stats__lifetime_income__gte=500
+        'stats__lifetime_income': ['gte', 'lte'],
+        'stats__order_count': ['gte', 'lte'],
+        'stats__last_order_at': ['gte', 'lte', 'isnull'],
+        'stats__last_appointment_at': ['gte', 'lte', 'isnull'],
+        'stats__cancelled_count': ['gte', 'lte'],
+    }
     search_fields = ['first_name', 'last_name', 'nickname', 'email', 'phone']
-    ordering_fields = ['created_at', 'updated_at', 'first_name', 'last_name', 'email']
+    ordering_fields = [
+        'created_at', 'updated_at', 'first_name', 'last_name', 'email',
+        'stats__lifetime_income', 'stats__order_count', 'stats__last_order_at',
+        'stats__last_appointment_at', 'stats__cancelled_count',
+    ]
     ordering = ['-created_at']
     
     def get_serializer_class(self):
@@ -49,6 +90,12 @@ class CustomerViewSet(viewsets.ModelViewSet):
             return CustomerUpdateSerializer
         return CustomerSerializer
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'overview':
+            queryset = with_statistics(queryset)
+        return queryset
+    
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Get only active customers"""
@@ -91,6 +138,75 @@ class CustomerViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
     
+    @action(
+        detail=False, methods=['post'], url_path='import',
+        parser_classes=[MultiPartParser, JSONParser]
+    )
+    def import_customers(self, request):
+        """
+        Import customers from an uploaded CSV or NDJSON file
+        
+        Multipart form with a 'file' field and an optional 'file_format'
+        (csv/ndjson, guessed from the file name otherwise). Rows are upserted
+        by email in batches; the response summarizes the import.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'file is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        file_format = request.data.get('file_format') or detect_format(upload.name)
+        if file_format not in IMPORT_FORMATS:
+            return Response(
+                {'error': f"file_format must be one of: {', '.join(IMPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        report = CustomerImporter().run(read_rows(upload, file_format))
+        return Response(report, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'])
+    def overview(self, request, uuid=None):
+        """
+        Get everything the customer profile shows in one response
+        
+        Returns the customer, lifetime spend and visit statistics, the most
+        recent appointments and the most recent orders with their item lines
+        (?appointments= and ?orders= set how many, default 5). Four queries.
+        """
+        try:
+            limits = parse_overview_params(request.query_params)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        customer = self.get_object()
+        return Response(build_overview(customer, self.get_serializer(customer).data, **limits))
+    
+    @action(detail=False, methods=['get'])
+    def lookup(self, request):
+        """
+        Ranked customer lookup for the search box
+        
+        ?q= matches word prefixes of names, email and phone (every word must
+        match); ?limit= caps the results (default 10). Best matches first.
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), self.lookup_max_results)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be a number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        customers = lookup_customers(request.query_params.get('q', ''), limit=max(limit, 1))
+        serializer = CustomerLookupSerializer(customers, many=True)
+        return Response({'results': serializer.data})
+    
     @action(detail=False, methods=['get'])
     def search_advanced(self, request):
         """Advanced search with multiple criteria"""
@@ -103,28 +219,17 @@ class CustomerViewSet(viewsets.ModelViewSet):
         preferences = request.query_params.get('preferences', None)
         
         if name:
-            queryset = queryset.filter(
-                Q(first_name__icontains=name) |
-                Q(last_name__icontains=name) |
-                Q(nickname__icontains=name)
-            )
+            queryset = search_customers(queryset, name, groups=['name'])
         
         if location:
-            queryset = queryset.filter(
-                Q(address_city__icontains=location) |
-                Q(address_state__icontains=location) |
-                Q(address_country__icontains=location)
-            )
-        
-        if tags:
-            tag_list = tags.split(',')
-            for tag in tag_list:
-                queryset = queryset.filter(tags__contains=[tag.strip()])
+            queryset = search_customers(queryset, location, groups=['location'])
         
-        if preferences:
-            pref_list = preferences.split(',')
-            for pref in pref_list:
-                queryset = queryset.filter(preferences__contains=[pref.strip()])
+        # Tags and preferences are matched through the indexed label table
+        queryset = filter_by_labels(
+            queryset,
+            tags=[tag.strip() for tag in (tags or '').split(',') if tag.strip()],
+            preferences=[pref.strip() for pref in (preferences or '').split(',') if pref.strip()],
+        )
         
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -135,7 +240,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class AppointmentTypeViewSet(viewsets.ModelViewSet):
+class AppointmentTypeViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
     ViewSet for AppointmentType CRUD operations
     
@@ -146,6 +251,8 @@ class AppointmentTypeViewSet(viewsets.ModelViewSet):
     - PUT /api/appointment-types/{uuid}/ - Update a specific appointment type (full update)
     - PATCH /api/appointment-types/{uuid}/ - Partial update a specific appointment type
     - DELETE /api/appointment-types/{uuid}/ - Delete a specific appointment type
+    
+    List and retrieve responses are cached with an ETag until the next write.
     """
     
     queryset = AppointmentType.objects.all()
@@ -167,7 +274,7 @@ class AppointmentTypeViewSet(viewsets.ModelViewSet):
         return AppointmentTypeSerializer
 
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+class AppointmentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Appointment CRUD operations
     
@@ -184,11 +291,17 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     - GET /api/appointments/upcoming/ - List upcoming appointments
     - POST /api/appointments/{uuid}/confirm/ - Confirm an appointment
     - POST /api/appointments/{uuid}/cancel/ - Cancel an appointment
+    - GET /api/appointments/availability/ - Free slots for an appointment type
+    - GET /api/appointments/calendar/ - Compact payload for a calendar range
+    
+    Scheduled and confirmed appointments of the same type cannot overlap.
     """
     
     queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
     lookup_field = 'uuid'
+    # Related rows shown in responses; their changes invalidate the ETag
+    conditional_dependencies = ('customer', 'appointment_type')
     
     # Enable filtering, searching, and ordering
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -215,9 +328,11 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def today(self, request):
         """Get appointments for today"""
-        today = timezone.now().date()
+        # Range filter (rather than start_time__date) so the start_time index is used
+        start, end = day_bounds(timezone.localdate())
         today_appointments = self.get_queryset().filter(
-            start_time__date=today
+            start_time__gte=start,
+            start_time__lt=end
         )
         page = self.paginate_queryset(today_appointments)
         if page is not None:
@@ -247,8 +362,23 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     def confirm(self, request, uuid=None):
         """Confirm an appointment"""
         appointment = self.get_object()
-        appointment.status = 'confirmed'
-        appointment.save()
+        try:
+            with transaction.atomic():
+                # Reactivating a cancelled appointment must not double-book its slot
+                if appointment.status not in ACTIVE_STATUSES and slot_taken(
+                    appointment.appointment_type_id, appointment.start_time, appointment.end_time,
+                    exclude=appointment.pk
+                ):
+                    return Response(
+                        {'error': OVERLAP_MESSAGE},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                appointment.status = 'confirmed'
+                appointment.save()
+        except IntegrityError as error:
+            if not is_overlap_violation(error):
+                raise
+            return Response({'error': OVERLAP_MESSAGE}, status=status.HTTP_400_BAD_REQUEST)
         serializer = self.get_serializer(appointment)
         return Response(
             {
@@ -297,3 +427,112 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         
         serializer = self.get_serializer(customer_appointments, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        """
+        Get free slots for an appointment type
+        
+        Query parameters: appointment_type (uuid, required), date_from and
+        date_to (YYYY-MM-DD, default: the next 7 days), duration (minutes)
+        and opening/closing (HH:MM) to override the configured business hours.
+        Busy intervals are read in one indexed range scan.
+        """
+        try:
+            params = parse_availability_params(request.query_params)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        appointment_type = AppointmentType.objects.filter(uuid=params.pop('appointment_type')).first()
+        if appointment_type is None:
+            return Response(
+                {'error': 'Appointment type not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response(find_availability(appointment_type, **params))
+    
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Get appointments overlapping a calendar range in a compact columnar payload
+        
+        Query parameters: start and end (YYYY-MM-DD or ISO datetime, required),
+        plus the list filters (status, appointment_type, customer). Answered
+        with a single query and no pagination.
+        """
+        try:
+            start, end = parse_calendar_range(request.query_params)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(build_calendar(calendar_rows(queryset, start, end), start, end))
+
+
+class SegmentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    """
+    ViewSet for marketing audience segments
+    
+    Provides:
+    - GET /api/segments/ - List all segments
+    - POST /api/segments/ - Create a segment (name, description, definition)
+    - GET /api/segments/{uuid}/ - Retrieve a specific segment
+    - PUT /api/segments/{uuid}/ - Update a specific segment (full update)
+    - PATCH /api/segments/{uuid}/ - Partial update a specific segment
+    - DELETE /api/segments/{uuid}/ - Delete a specific segment
+    
+    Additional endpoints:
+    - GET /api/segments/{uuid}/count/ - Number of matching customers
+    - GET /api/segments/{uuid}/members/ - Stream matching customers as NDJSON
+    - POST /api/segments/preview/ - Count the customers matching an unsaved definition
+    
+    Counts and member ids are cached until the next customer, appointment or
+    order write (see segments.py).
+    """
+    
+    queryset = Segment.objects.all()
+    serializer_class = SegmentSerializer
+    lookup_field = 'uuid'
+    
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['name', 'description']
+    ordering_fields = ['created_at', 'updated_at', 'name']
+    ordering = ['name']
+    
+    def get_definition(self, segment):
+        """Typed predicates of a stored (already validated) definition"""
+        definition = SegmentDefinitionSerializer(data=segment.definition)
+        definition.is_valid(raise_exception=True)
+        return definition.validated_data
+    
+    @action(detail=True, methods=['get'])
+    def count(self, request, uuid=None):
+        """Get the number of customers in the segment"""
+        segment = self.get_object()
+        membership = segment_membership(self.get_definition(segment))
+        return Response({'segment': segment.uuid, 'count': membership['count']})
+    
+    @action(detail=True, methods=['get'])
+    def members(self, request, uuid=None):
+        """Stream the segment's customers, one JSON object per line"""
+        segment = self.get_object()
+        return stream_ndjson(
+            segment_member_rows(self.get_definition(segment)),
+            filename=f'segment-{segment.uuid}.ndjson',
+        )
+    
+    @action(detail=False, methods=['post'])
+    def preview(self, request):
+        """Count the customers matching a definition before saving it as a segment"""
+        definition = SegmentDefinitionSerializer(data=request.data)
+        if not definition.is_valid():
+            return Response(definition.errors, status=status.HTTP_400_BAD_REQUEST)
+        membership = segment_membership(definition.validated_data)
+        return Response({'count': membership['count']})
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Order, OrderItem, OrderType, PaymentType, OrderItemLine
+from .exports import csv_export_response
+from .models import Order, OrderItem, OrderType, PaymentType, OrderItemLine, OrderDailyRollup
 
 
 @admin.register(OrderType)
@@ -196,3 +197,35 @@ class OrderAdmin(admin.ModelAdmin):
             f"Net=${income_total - expense_total}"
         )
     calculate_totals.short_description = "Calculate totals for selected orders"
+    
+    def export_orders(self, request, queryset):
+        """Stream the selected orders with their item lines as CSV"""
+        return csv_export_response(queryset)
+    export_orders.short_description = "Export selected orders (CSV)"
+
+
+@admin.register(OrderDailyRollup)
+class OrderDailyRollupAdmin(admin.ModelAdmin):
+    list_display = [
+        'day', 'order_type', 'payment_type', 'order_count', 'total_amount',
+        'line_count', 'items_sold', 'updated_at'
+    ]
+    list_filter = ['order_type__type', 'payment_type__type', 'day']
+    readonly_fields = [
+        'uuid', 'day', 'order_type', 'payment_type', 'order_count', 'total_amount',
+        'line_count', 'items_sold', 'created_at', 'updated_at'
+    ]
+    
+    list_per_page = 25
+    date_hierarchy = 'day'
+    
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return queryset.select_related('order_type', 'payment_type')
+    
+    # Rollups are maintained from orders, never edited by hand
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
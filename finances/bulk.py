@@ -0,0 +1,114 @@
+from django.db import transaction
+
+from customer_relationship.models import Appointment, Customer
+from customer_relationship.segments import invalidate_segments
+from customer_relationship.stats import refresh_customer_stats
+from .models import Order, OrderItem, OrderItemLine, OrderType, PaymentType
+from .rollups import refresh_rollups, rollup_key
+from .serializers import BulkOrderSerializer
+
+# Reference fields of a bulk order row and the model each one points to
+ORDER_REFERENCES = {
+    'customer': Customer,
+    'order_type': OrderType,
+    'payment_type': PaymentType,
+    'appointment': Appointment,
+}
+
+
+def create_orders_in_bulk(rows):
+    """
+    Validate and insert many orders (with their item lines) at once.
+
+    Rows are shape-validated individually, then every referenced customer,
+    order type, payment type, appointment and order item is resolved with a
+    single IN query per model. Valid rows are written with bulk_create in
+    one transaction; invalid rows are skipped and reported.
+
+    Returns (orders, errors) where errors is a list of
+    {'index': <row position>, 'errors': {...}} in row order.
+    """
+    errors = {}
+    validated = []
+    for index, row in enumerate(rows):
+        serializer = BulkOrderSerializer(data=row)
+        if serializer.is_valid():
+            validated.append((index, serializer.validated_data))
+        else:
+            errors[index] = serializer.errors
+
+    existing = {
+        field: _existing_pks(model, {data.get(field) for _, data in validated})
+        for field, model in ORDER_REFERENCES.items()
+    }
+    existing_items = _existing_pks(
+        OrderItem,
+        {line['order_item'] for _, data in validated for line in data['order_items']}
+    )
+
+    orders = []
+    lines = []
+    for index, data in validated:
+        row_errors = _missing_references(data, existing, existing_items)
+        if row_errors:
+            errors[index] = row_errors
+            continue
+
+        order = Order(
+            customer_id=data['customer'],
+            order_type_id=data['order_type'],
+            payment_type_id=data['payment_type'],
+            appointment_id=data.get('appointment'),
+            total=sum(line['quantity'] * line['unit_price'] for line in data['order_items']),
+        )
+        orders.append(order)
+        lines.extend(
+            OrderItemLine(
+                order=order,
+                order_item_id=line['order_item'],
+                quantity=line['quantity'],
+                unit_price=line['unit_price'],
+                total_price=line['quantity'] * line['unit_price'],
+            )
+            for line in data['order_items']
+        )
+
+    if orders:
+        with transaction.atomic():
+            Order.objects.bulk_create(orders, batch_size=500)
+            OrderItemLine.objects.bulk_create(lines, batch_size=1000)
+            # bulk_create does not send signals, refresh the touched rollups once
+            refresh_rollups(
+                rollup_key(order.created_at, order.order_type_id, order.payment_type_id)
+                for order in orders
+            )
+            refresh_customer_stats(order.customer_id for order in orders)
+            invalidate_segments()
+
+    return orders, [
+        {'index': index, 'errors': errors[index]} for index in sorted(errors)
+    ]
+
+
+def _existing_pks(model, pks):
+    pks = {pk for pk in pks if pk is not None}
+    if not pks:
+        return set()
+    return set(model.objects.filter(pk__in=pks).values_list('pk', flat=True))
+
+
+def _missing_references(data, existing, existing_items):
+    row_errors = {}
+    for field, model in ORDER_REFERENCES.items():
+        value = data.get(field)
+        if value is not None and value not in existing[field]:
+            row_errors[field] = [f'{model._meta.verbose_name} {value} does not exist.']
+
+    line_errors = [
+        {'order_item': [f'Order item {line["order_item"]} does not exist.']}
+        if line['order_item'] not in existing_items else {}
+        for line in data['order_items']
+    ]
+    if any(line_errors):
+        row_errors['order_items'] = line_errors
+    return row_errors
@@ -0,0 +1,126 @@
+import csv
+import itertools
+import tempfile
+import uuid
+from datetime import datetime
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import Workbook
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+# (column header, Order.values_list() path); one row per order item line
+EXPORT_COLUMNS = [
+    ('order_uuid', 'uuid'),
+    ('created_at', 'created_at'),
+    ('customer_uuid', 'customer_id'),
+    ('customer_first_name', 'customer__first_name'),
+    ('customer_last_name', 'customer__last_name'),
+    ('customer_email', 'customer__email'),
+    ('order_type', 'order_type__type'),
+    ('payment_type', 'payment_type__type'),
+    ('appointment_uuid', 'appointment_id'),
+    ('order_total', 'total'),
+    ('item_description', 'order_items__order_item__description'),
+    ('item_quantity', 'order_items__quantity'),
+    ('item_unit_price', 'order_items__unit_price'),
+    ('item_total_price', 'order_items__total_price'),
+]
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class Echo:
+    """File-like object whose write() returns the written value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=2000):
+    """
+    Yield one flattened tuple of raw values per order item line.
+
+    Orders and lines are read in a single LEFT JOIN query through a
+    server-side cursor (.iterator), so memory use does not grow with the
+    number of exported orders. Orders without lines produce one row with
+    empty line columns.
+    """
+    rows = (
+        queryset.prefetch_related(None)
+        .order_by('created_at', 'uuid', 'order_items__created_at')
+        .values_list(*[path for _, path in EXPORT_COLUMNS])
+    )
+    yield from rows.iterator(chunk_size=chunk_size)
+
+
+def export_headers():
+    return [header for header, _ in EXPORT_COLUMNS]
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _xlsx_cell(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        # Spreadsheets have no time zone support, export local wall time
+        return timezone.make_naive(value)
+    return value
+
+
+def export_filename(extension):
+    return f"orders-{timezone.localtime().strftime('%Y%m%d-%H%M%S')}.{extension}"
+
+
+def csv_export_response(queryset):
+    """Stream the export as CSV; bytes start flowing before the query finishes"""
+    writer = csv.writer(Echo())
+    lines = itertools.chain(
+        [export_headers()],
+        ([_csv_cell(value) for value in row] for row in export_rows(queryset)),
+    )
+    response = StreamingHttpResponse(
+        (writer.writerow(line) for line in lines),
+        content_type='text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename("csv")}"'
+    return response
+
+
+def xlsx_export_response(queryset):
+    """
+    Export as XLSX.
+
+    The workbook is written row by row in openpyxl's write-only mode into a
+    temporary file (XLSX is a zip archive and cannot be emitted before it is
+    complete), then streamed from disk; memory stays constant either way.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Orders')
+    sheet.append(export_headers())
+    for row in export_rows(queryset):
+        sheet.append([_xlsx_cell(value) for value in row])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=export_filename('xlsx'),
+        content_type=XLSX_CONTENT_TYPE,
+    )
+
+
+def export_response(queryset, file_format='csv'):
+    if file_format == 'xlsx':
+        return xlsx_export_response(queryset)
+    return csv_export_response(queryset)
@@ -0,0 +1,121 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from customer_relationship.models import Appointment, AppointmentType, Customer
+from finances.models import Order, OrderItem, OrderItemLine, OrderType, PaymentType
+from finances.projections import order_rows, project_orders
+from finances.serializers import OrderSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare per-order serialization cost of OrderSerializer and the flat projection '
+        'path for several page sizes. Benchmark data is created in a transaction that is '
+        'rolled back, the database is left untouched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[20, 100, 1000],
+            help='Page sizes to benchmark (default: 20 100 1000)',
+        )
+        parser.add_argument(
+            '--lines',
+            type=int,
+            default=3,
+            help='Item lines per order (default: 3)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per measurement, the best one is reported (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.create_data(max(options['sizes']), options['lines'])
+                self.run(options['sizes'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_data(self, count, lines_per_order):
+        customer = Customer.objects.create(
+            first_name='Bench', last_name='Mark', email='benchmark-orders@example.invalid',
+            phone='5550000000', date_of_birth=date(1990, 1, 1), gender='other',
+            address_street='Bench Street', address_number='1', address_neighborhood='Bench',
+            address_city='Bench', address_state='BE', address_zip_code='00000',
+            address_country='Bench',
+        )
+        order_type = OrderType.objects.create(type='Income')
+        payment_type = PaymentType.objects.create(type='Cash')
+        appointment_type = AppointmentType.objects.create(description='Benchmark')
+        start = timezone.now()
+        appointment = Appointment.objects.create(
+            customer=customer, appointment_type=appointment_type,
+            start_time=start, end_time=start + timedelta(hours=1),
+        )
+        items = OrderItem.objects.bulk_create([
+            OrderItem(description=f'Benchmark item {i}', unit_price=Decimal('10.00'))
+            for i in range(lines_per_order)
+        ])
+
+        orders = Order.objects.bulk_create([
+            Order(
+                customer=customer, order_type=order_type, payment_type=payment_type,
+                appointment=appointment if i % 2 else None,
+                total=Decimal('10.00') * lines_per_order,
+            )
+            for i in range(count)
+        ])
+        OrderItemLine.objects.bulk_create([
+            OrderItemLine(
+                order=order, order_item=item, quantity=1,
+                unit_price=Decimal('10.00'), total_price=Decimal('10.00'),
+            )
+            for order in orders for item in items
+        ])
+
+    def run(self, sizes, repeat):
+        queryset = Order.objects.select_related(
+            'customer', 'order_type', 'payment_type', 'appointment__appointment_type'
+        ).prefetch_related('order_items__order_item')
+
+        self.stdout.write(f"{'orders':>8} {'path':>12} {'queries':>8} {'total ms':>10} {'us/order':>10}")
+        for size in sizes:
+            # Slice inside the callables: a fresh queryset per run, no result cache reuse
+            paths = [
+                ('serializer', lambda: OrderSerializer(queryset[:size], many=True).data),
+                ('projection', lambda: project_orders(order_rows(queryset[:size]))),
+            ]
+            for name, serialize in paths:
+                elapsed, queries = self.measure(serialize, repeat)
+                self.stdout.write(
+                    f'{size:>8} {name:>12} {queries:>8} {elapsed * 1000:>10.2f} '
+                    f'{elapsed / size * 1_000_000:>10.1f}'
+                )
+
+    def measure(self, serialize, repeat):
+        best = None
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                serialize()
+                elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, len(captured)
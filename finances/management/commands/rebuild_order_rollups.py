@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from finances.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily order rollups from the orders table (backfill or repair)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date-from',
+            help='First day to rebuild, YYYY-MM-DD (default: earliest order)',
+        )
+        parser.add_argument(
+            '--date-to',
+            help='Last day to rebuild, YYYY-MM-DD (default: latest order)',
+        )
+
+    def handle(self, *args, **options):
+        date_from = self.parse_day(options['date_from'], '--date-from')
+        date_to = self.parse_day(options['date_to'], '--date-to')
+
+        if date_from and date_to and date_from > date_to:
+            raise CommandError('--date-from must be before or equal to --date-to')
+
+        written = rebuild_rollups(date_from=date_from, date_to=date_to)
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {written} daily order rollups')
+        )
+
+    def parse_day(self, value, option):
+        if not value:
+            return None
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'{option} must be a date in YYYY-MM-DD format')
+        return day
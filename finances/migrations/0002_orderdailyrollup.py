@@ -0,0 +1,70 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:49
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    """Compute the rollup rows of existing orders (as finances.rollups.rebuild_rollups does)"""
+    Order = apps.get_model('finances', 'Order')
+    OrderItemLine = apps.get_model('finances', 'OrderItemLine')
+    OrderDailyRollup = apps.get_model('finances', 'OrderDailyRollup')
+
+    line_totals = {
+        (row['day'], row['order__order_type_id'], row['order__payment_type_id']): row
+        for row in OrderItemLine.objects.order_by().values(
+            'order__order_type_id', 'order__payment_type_id', day=TruncDate('order__created_at'),
+        ).annotate(line_count=Count('pk'), items_sold=Sum('quantity'))
+    }
+
+    rollups = []
+    for row in Order.objects.order_by().values(
+        'order_type_id', 'payment_type_id', day=TruncDate('created_at'),
+    ).annotate(order_count=Count('pk'), total_amount=Sum('total')):
+        line_row = line_totals.get((row['day'], row['order_type_id'], row['payment_type_id']), {})
+        rollups.append(OrderDailyRollup(
+            day=row['day'],
+            order_type_id=row['order_type_id'],
+            payment_type_id=row['payment_type_id'],
+            order_count=row['order_count'],
+            total_amount=row['total_amount'] or 0,
+            line_count=line_row.get('line_count', 0),
+            items_sold=line_row.get('items_sold') or 0,
+        ))
+    OrderDailyRollup.objects.bulk_create(rollups, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderDailyRollup',
+            fields=[
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('day', models.DateField()),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('line_count', models.PositiveIntegerField(default=0)),
+                ('items_sold', models.PositiveIntegerField(default=0)),
+                ('order_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='finances.ordertype')),
+                ('payment_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='finances.paymenttype')),
+            ],
+            options={
+                'verbose_name': 'Order Daily Rollup',
+                'verbose_name_plural': 'Order Daily Rollups',
+                'db_table': 'order_daily_rollups',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'order_type', 'payment_type'), name='unique_order_daily_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_relationship', '0003_query_indexes'),
+        ('finances', '0002_orderdailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='orders_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', 'created_at'], name='orders_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_type', 'created_at'], name='orders_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['payment_type', 'created_at'], name='orders_payment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['inventory_quantity'], name='order_items_inventory_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitemline',
+            index=models.Index(fields=['created_at'], name='order_item_lines_created_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_relationship', '0009_sync_indexes'),
+        ('finances', '0003_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at', 'uuid'], name='orders_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['updated_at', 'uuid'], name='order_items_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitemline',
+            index=models.Index(fields=['updated_at', 'uuid'], name='order_item_lines_sync_idx'),
+        ),
+    ]
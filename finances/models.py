@@ -64,6 +64,11 @@ class OrderItem(BaseModel):
         ordering = ["description"]
         verbose_name = "Order Item"
         verbose_name_plural = "Order Items"
+        indexes = [
+            models.Index(fields=["inventory_quantity"], name="order_items_inventory_idx"),
+            # Incremental sync reads changes in (updated_at, uuid) order
+            models.Index(fields=["updated_at", "uuid"], name="order_items_sync_idx"),
+        ]
     
     def __str__(self):
         return f"{self.description} - ${self.unit_price}"
@@ -110,6 +115,13 @@ class Order(BaseModel):
         ordering = ["-created_at"]
         verbose_name = "Order"
         verbose_name_plural = "Orders"
+        indexes = [
+            models.Index(fields=["created_at"], name="orders_created_idx"),
+            models.Index(fields=["customer", "created_at"], name="orders_customer_created_idx"),
+            models.Index(fields=["order_type", "created_at"], name="orders_type_created_idx"),
+            models.Index(fields=["payment_type", "created_at"], name="orders_payment_created_idx"),
+            models.Index(fields=["updated_at", "uuid"], name="orders_sync_idx"),
+        ]
     
     def __str__(self):
         return f"Order {self.uuid} - {self.customer.full_name} - ${self.total}"
@@ -150,6 +162,10 @@ class OrderItemLine(BaseModel):
         ordering = ["order", "order_item"]
         verbose_name = "Order Item Line"
         verbose_name_plural = "Order Item Lines"
+        indexes = [
+            models.Index(fields=["created_at"], name="order_item_lines_created_idx"),
+            models.Index(fields=["updated_at", "uuid"], name="order_item_lines_sync_idx"),
+        ]
     
     def __str__(self):
         return f"{self.order_item.description} x{self.quantity} - ${self.total_price}"
@@ -158,3 +174,40 @@ class OrderItemLine(BaseModel):
         """Calculate total_price automatically"""
         self.total_price = self.quantity * self.unit_price
         super().save(*args, **kwargs)
+
+
+class OrderDailyRollup(BaseModel):
+    """Model for daily order totals per order type and payment type"""
+    
+    day = models.DateField()
+    order_type = models.ForeignKey(
+        OrderType, 
+        on_delete=models.CASCADE, 
+        related_name="daily_rollups"
+    )
+    payment_type = models.ForeignKey(
+        PaymentType, 
+        on_delete=models.CASCADE, 
+        related_name="daily_rollups"
+    )
+    
+    # Aggregated figures for the bucket
+    order_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    line_count = models.PositiveIntegerField(default=0)
+    items_sold = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = "order_daily_rollups"
+        ordering = ["-day"]
+        verbose_name = "Order Daily Rollup"
+        verbose_name_plural = "Order Daily Rollups"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "order_type", "payment_type"],
+                name="unique_order_daily_rollup",
+            )
+        ]
+    
+    def __str__(self):
+        return f"{self.day} - {self.order_type} / {self.payment_type}: {self.order_count} orders"
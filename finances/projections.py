@@ -0,0 +1,88 @@
+from collections import defaultdict
+
+from rest_framework import serializers
+
+from .models import OrderItemLine
+
+# Columns read for each order; joins replace select_related()
+ORDER_VALUES = (
+    'uuid', 'customer_id', 'customer__first_name', 'customer__last_name',
+    'order_type_id', 'order_type__type', 'payment_type_id', 'payment_type__type',
+    'appointment_id', 'appointment__start_time', 'appointment__appointment_type__description',
+    'total', 'created_at', 'updated_at',
+)
+
+LINE_VALUES = (
+    'uuid', 'order_id', 'order_item_id', 'order_item__description',
+    'quantity', 'unit_price', 'total_price', 'created_at', 'updated_at',
+)
+
+# Stateless DRF fields reused for value formatting, so the output matches
+# OrderSerializer field by field
+_uuid = serializers.UUIDField()
+_datetime = serializers.DateTimeField()
+_money = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+def order_rows(queryset):
+    """Turn an Order queryset (filters and ordering kept) into flat value rows"""
+    return queryset.prefetch_related(None).values(*ORDER_VALUES)
+
+
+def project_orders(rows):
+    """
+    Build OrderSerializer-shaped dicts from order_rows() output.
+
+    Item lines for all rows are fetched with one values() query, so a page
+    costs two queries in total and no model instances or nested serializers
+    are created per order.
+    """
+    rows = list(rows)
+    lines = defaultdict(list)
+    if rows:
+        for line in OrderItemLine.objects.filter(
+            order_id__in=[row['uuid'] for row in rows]
+        ).values(*LINE_VALUES):
+            lines[line['order_id']].append(project_line(line))
+
+    return [project_order(row, lines[row['uuid']]) for row in rows]
+
+
+def project_order(row, order_items):
+    appointment_info = None
+    if row['appointment_id']:
+        appointment_info = {
+            'uuid': row['appointment_id'],
+            'start_time': row['appointment__start_time'],
+            'appointment_type': row['appointment__appointment_type__description'],
+        }
+
+    return {
+        'uuid': _uuid.to_representation(row['uuid']),
+        'customer': row['customer_id'],
+        'customer_name': f"{row['customer__first_name']} {row['customer__last_name']}",
+        'order_type': row['order_type_id'],
+        'order_type_name': row['order_type__type'],
+        'payment_type': row['payment_type_id'],
+        'payment_type_name': row['payment_type__type'],
+        'appointment': row['appointment_id'],
+        'appointment_info': appointment_info,
+        'total': _money.to_representation(row['total']),
+        'order_items': order_items,
+        'created_at': _datetime.to_representation(row['created_at']),
+        'updated_at': _datetime.to_representation(row['updated_at']),
+    }
+
+
+def project_line(line):
+    return {
+        'uuid': _uuid.to_representation(line['uuid']),
+        'order': line['order_id'],
+        'order_item': line['order_item_id'],
+        'order_item_description': line['order_item__description'],
+        'quantity': line['quantity'],
+        'unit_price': _money.to_representation(line['unit_price']),
+        'total_price': _money.to_representation(line['total_price']),
+        'created_at': _datetime.to_representation(line['created_at']),
+        'updated_at': _datetime.to_representation(line['updated_at']),
+    }
@@ -0,0 +1,128 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Order, OrderItemLine, OrderDailyRollup
+
+
+def day_bounds(day):
+    """Return the aware [start, end) datetimes covering a local day"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def month_bounds(day):
+    """Return the aware [start, end) datetimes covering the month of a day"""
+    first = day.replace(day=1)
+    following = (first + timedelta(days=32)).replace(day=1)
+    return day_bounds(first)[0], day_bounds(following)[0]
+
+
+def rollup_key(created_at, order_type_id, payment_type_id):
+    """Return the (day, order_type_id, payment_type_id) bucket of an order"""
+    return (timezone.localdate(created_at), order_type_id, payment_type_id)
+
+
+def order_rollup_key(order_id):
+    """Look up the rollup bucket of a stored order, or None if it is gone"""
+    row = Order.objects.filter(pk=order_id).values_list(
+        'created_at', 'order_type_id', 'payment_type_id'
+    ).first()
+    return rollup_key(*row) if row else None
+
+
+def refresh_rollup(key):
+    """
+    Recompute a single rollup bucket from the orders it covers.
+
+    Only the orders of one day, order type and payment type are read, so the
+    cost of keeping the rollup current is independent of the table size.
+    """
+    day, order_type_id, payment_type_id = key
+    start, end = day_bounds(day)
+    bucket = {
+        'created_at__gte': start,
+        'created_at__lt': end,
+        'order_type_id': order_type_id,
+        'payment_type_id': payment_type_id,
+    }
+    orders = Order.objects.filter(**bucket).aggregate(
+        order_count=Count('pk'), total_amount=Sum('total')
+    )
+    lookup = {'day': day, 'order_type_id': order_type_id, 'payment_type_id': payment_type_id}
+
+    if not orders['order_count']:
+        OrderDailyRollup.objects.filter(**lookup).delete()
+        return
+
+    lines = OrderItemLine.objects.filter(
+        **{f'order__{field}': value for field, value in bucket.items()}
+    ).aggregate(line_count=Count('pk'), items_sold=Sum('quantity'))
+
+    OrderDailyRollup.objects.update_or_create(
+        **lookup,
+        defaults={
+            'order_count': orders['order_count'],
+            'total_amount': orders['total_amount'] or 0,
+            'line_count': lines['line_count'],
+            'items_sold': lines['items_sold'] or 0,
+        }
+    )
+
+
+def refresh_rollups(keys):
+    """Recompute every distinct bucket in keys"""
+    for key in set(keys):
+        if key is not None:
+            refresh_rollup(key)
+
+
+@transaction.atomic
+def rebuild_rollups(date_from=None, date_to=None):
+    """
+    Rebuild rollups from scratch for an optional inclusive date range.
+
+    Uses two grouped queries (orders and order lines) and a bulk insert.
+    Returns the number of rollup rows written.
+    """
+    orders = Order.objects.all()
+    lines = OrderItemLine.objects.all()
+    rollups = OrderDailyRollup.objects.all()
+    if date_from:
+        orders = orders.filter(created_at__gte=day_bounds(date_from)[0])
+        lines = lines.filter(order__created_at__gte=day_bounds(date_from)[0])
+        rollups = rollups.filter(day__gte=date_from)
+    if date_to:
+        orders = orders.filter(created_at__lt=day_bounds(date_to)[1])
+        lines = lines.filter(order__created_at__lt=day_bounds(date_to)[1])
+        rollups = rollups.filter(day__lte=date_to)
+
+    line_totals = {
+        (row['day'], row['order__order_type_id'], row['order__payment_type_id']): row
+        for row in lines.order_by().values(
+            'order__order_type_id', 'order__payment_type_id',
+            day=TruncDate('order__created_at'),
+        ).annotate(line_count=Count('pk'), items_sold=Sum('quantity'))
+    }
+
+    new_rollups = []
+    for row in orders.order_by().values(
+        'order_type_id', 'payment_type_id', day=TruncDate('created_at'),
+    ).annotate(order_count=Count('pk'), total_amount=Sum('total')):
+        line_row = line_totals.get((row['day'], row['order_type_id'], row['payment_type_id']), {})
+        new_rollups.append(OrderDailyRollup(
+            day=row['day'],
+            order_type_id=row['order_type_id'],
+            payment_type_id=row['payment_type_id'],
+            order_count=row['order_count'],
+            total_amount=row['total_amount'] or 0,
+            line_count=line_row.get('line_count', 0),
+            items_sold=line_row.get('items_sold') or 0,
+        ))
+
+    rollups.delete()
+    OrderDailyRollup.objects.bulk_create(new_rollups, batch_size=1000)
+    return len(new_rollups)
@@ -1,5 +1,8 @@
+from decimal import Decimal
+from django.db import transaction
 from rest_framework import serializers
 from .models import Order, OrderItem, OrderType, PaymentType, OrderItemLine
+from .rollups import order_rollup_key, refresh_rollups
 
 
 class OrderTypeSerializer(serializers.ModelSerializer):
@@ -171,9 +174,22 @@ class OrderUpdateSerializer(OrderSerializer):
         pass
 
 
+class OrderItemLineNestedCreateSerializer(OrderItemLineCreateSerializer):
+    """Serializer for order item lines nested in an order being created (no order field)"""
+    
+    class Meta(OrderItemLineCreateSerializer.Meta):
+        fields = [
+            field for field in OrderItemLineCreateSerializer.Meta.fields if field != 'order'
+        ]
+        extra_kwargs = {
+            field: options for field, options in OrderItemLineCreateSerializer.Meta.extra_kwargs.items()
+            if field != 'order'
+        }
+
+
 class OrderWithItemsCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating orders with order items in a single request"""
-    order_items = OrderItemLineCreateSerializer(many=True)
+    order_items = OrderItemLineNestedCreateSerializer(many=True)
     
     class Meta:
         model = Order
@@ -194,15 +210,67 @@ class OrderWithItemsCreateSerializer(serializers.ModelSerializer):
         )
         validated_data['total'] = total
         
-        # Create the order
-        order = Order.objects.create(**validated_data)
-        
-        # Create order items
-        for item_data in order_items_data:
-            OrderItemLine.objects.create(order=order, **item_data)
+        with transaction.atomic():
+            # Create the order
+            order = Order.objects.create(**validated_data)
+            
+            # Create order items in one statement; bulk_create skips save(),
+            # so total_price is computed here and the rollup refreshed once
+            OrderItemLine.objects.bulk_create([
+                OrderItemLine(
+                    order=order,
+                    total_price=item_data['quantity'] * item_data['unit_price'],
+                    **item_data
+                )
+                for item_data in order_items_data
+            ])
+            refresh_rollups([order_rollup_key(order.pk)])
         
         return order
     
     def to_representation(self, instance):
         """Use the full OrderSerializer for representation"""
-        return OrderSerializer(instance, context=self.context).data
\ No newline at end of file
+        return OrderSerializer(instance, context=self.context).data
+
+
+def _max_amount(model, field_name):
+    """Largest value a model's DecimalField column can store"""
+    field = model._meta.get_field(field_name)
+    return Decimal(10) ** (field.max_digits - field.decimal_places) - Decimal(10) ** -field.decimal_places
+
+
+class BulkOrderItemLineSerializer(serializers.Serializer):
+    """Shape validation for an order item line in a bulk order payload"""
+    order_item = serializers.UUIDField()
+    # Upper bound of the PositiveIntegerField column
+    quantity = serializers.IntegerField(min_value=1, max_value=2147483647)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'))
+    
+    def validate(self, data):
+        """The line total must fit OrderItemLine.total_price"""
+        limit = _max_amount(OrderItemLine, 'total_price')
+        if data['quantity'] * data['unit_price'] > limit:
+            raise serializers.ValidationError(f"Line total must not exceed {limit}.")
+        return data
+
+
+class BulkOrderSerializer(serializers.Serializer):
+    """
+    Shape validation for one order in a bulk order payload.
+
+    References are plain uuids here; their existence is checked for the
+    whole batch at once by finances.bulk.create_orders_in_bulk.
+    """
+    customer = serializers.UUIDField()
+    order_type = serializers.UUIDField()
+    payment_type = serializers.UUIDField()
+    appointment = serializers.UUIDField(required=False, allow_null=True)
+    order_items = BulkOrderItemLineSerializer(many=True, allow_empty=False)
+    
+    def validate(self, data):
+        """The order total (sum of the line totals) must fit Order.total"""
+        limit = _max_amount(Order, 'total')
+        total = sum(line['quantity'] * line['unit_price'] for line in data['order_items'])
+        if total > limit:
+            raise serializers.ValidationError({'total': [f"Order total must not exceed {limit}."]})
+        return data
@@ -0,0 +1,65 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from customer_relationship.segments import invalidate_segments
+from customer_relationship.stats import refresh_customer_stats
+from queenbe_backend.caching import invalidate_cached_responses
+from .models import Order, OrderItemLine, OrderType, PaymentType
+from .rollups import order_rollup_key, refresh_rollups, rollup_key
+
+
+@receiver(pre_save, sender=Order)
+def remember_previous_order(sender, instance, **kwargs):
+    """Keep the bucket and customer an existing order belonged to before it is updated"""
+    previous = None if instance._state.adding else Order.objects.filter(pk=instance.pk).values_list(
+        'created_at', 'order_type_id', 'payment_type_id', 'customer_id'
+    ).first()
+    instance._previous_rollup_key = rollup_key(*previous[:3]) if previous else None
+    instance._previous_customer_id = previous[3] if previous else None
+
+
+@receiver(post_save, sender=Order)
+def update_rollup_on_order_save(sender, instance, **kwargs):
+    refresh_rollups([
+        rollup_key(instance.created_at, instance.order_type_id, instance.payment_type_id),
+        getattr(instance, '_previous_rollup_key', None),
+    ])
+    refresh_customer_stats([instance.customer_id, getattr(instance, '_previous_customer_id', None)])
+    invalidate_segments()
+
+
+@receiver(post_delete, sender=Order)
+def update_rollup_on_order_delete(sender, instance, **kwargs):
+    refresh_rollups([
+        rollup_key(instance.created_at, instance.order_type_id, instance.payment_type_id),
+    ])
+    refresh_customer_stats([instance.customer_id])
+    invalidate_segments()
+
+
+@receiver(pre_save, sender=OrderItemLine)
+def remember_line_order(sender, instance, **kwargs):
+    """Keep the order an existing line belonged to before it is updated"""
+    instance._previous_order_id = (
+        None if instance._state.adding
+        else OrderItemLine.objects.filter(pk=instance.pk).values_list('order_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=OrderItemLine)
+def update_rollup_on_line_save(sender, instance, **kwargs):
+    order_ids = {instance.order_id, getattr(instance, '_previous_order_id', None)}
+    refresh_rollups(order_rollup_key(order_id) for order_id in order_ids if order_id)
+
+
+@receiver(post_delete, sender=OrderItemLine)
+def update_rollup_on_line_delete(sender, instance, **kwargs):
+    refresh_rollups([order_rollup_key(instance.order_id)])
+
+
+@receiver(post_save, sender=OrderType)
+@receiver(post_delete, sender=OrderType)
+@receiver(post_save, sender=PaymentType)
+@receiver(post_delete, sender=PaymentType)
+def invalidate_reference_responses(sender, **kwargs):
+    invalidate_cached_responses(sender)
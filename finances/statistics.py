@@ -0,0 +1,183 @@
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Order, OrderDailyRollup
+from .rollups import day_bounds
+
+ZERO = Decimal('0.00')
+
+
+def parse_statistics_filters(query_params):
+    """
+    Validate statistics query parameters.
+
+    Supported parameters:
+    - date_from / date_to: inclusive dates (YYYY-MM-DD) applied to created_at
+    - payment_type: payment type uuid
+    - customer: customer uuid
+
+    Raises ValueError with a user facing message on invalid input.
+    """
+    filters = {}
+
+    for param in ('date_from', 'date_to'):
+        value = query_params.get(param)
+        if value:
+            filters[param] = parse_date(value)
+            if filters[param] is None:
+                raise ValueError(f'{param} must be a date in YYYY-MM-DD format')
+
+    if 'date_from' in filters and 'date_to' in filters and filters['date_from'] > filters['date_to']:
+        raise ValueError('date_from must be before or equal to date_to')
+
+    for param in ('payment_type', 'customer'):
+        value = query_params.get(param)
+        if value:
+            try:
+                filters[param] = uuid.UUID(value)
+            except ValueError:
+                raise ValueError(f'{param} must be a valid uuid')
+
+    return filters
+
+
+def order_statistics(filters=None, breakdown=False, now=None):
+    """
+    Compute order statistics in a single aggregation query.
+
+    Rows are grouped by order type and month bucket; every counter in the
+    response (totals, income/expense splits, current month) is then derived
+    from those few grouped rows. The daily rollup table is used whenever the
+    filters allow it, otherwise orders are aggregated directly.
+    """
+    filters = filters or {}
+    if 'customer' in filters:
+        rows = _order_rows(filters)
+    else:
+        rows = _rollup_rows(filters)
+    return build_statistics(rows, breakdown=breakdown, now=now)
+
+
+def order_lookups(filters):
+    """Translate parsed filters into ORM lookups on Order"""
+    lookups = {}
+    if 'date_from' in filters:
+        lookups['created_at__gte'] = day_bounds(filters['date_from'])[0]
+    if 'date_to' in filters:
+        lookups['created_at__lt'] = day_bounds(filters['date_to'])[1]
+    if 'payment_type' in filters:
+        lookups['payment_type_id'] = filters['payment_type']
+    if 'customer' in filters:
+        lookups['customer_id'] = filters['customer']
+    return lookups
+
+
+def _order_rows(filters):
+    return (
+        Order.objects.filter(**order_lookups(filters))
+        .order_by()
+        .values('order_type__type', month=TruncMonth('created_at'))
+        .annotate(orders=Count('pk'), amount=Sum('total'))
+    )
+
+
+def _rollup_rows(filters):
+    lookups = {}
+    if 'date_from' in filters:
+        lookups['day__gte'] = filters['date_from']
+    if 'date_to' in filters:
+        lookups['day__lte'] = filters['date_to']
+    if 'payment_type' in filters:
+        lookups['payment_type_id'] = filters['payment_type']
+
+    return (
+        OrderDailyRollup.objects.filter(**lookups)
+        .order_by()
+        .values('order_type__type', month=TruncMonth('day'))
+        .annotate(orders=Sum('order_count'), amount=Sum('total_amount'))
+    )
+
+
+def build_statistics(rows, breakdown=False, now=None):
+    """
+    Fold grouped (order type, month) rows into the statistics payload.
+
+    Each row must provide 'order_type__type', 'month', 'orders' and 'amount'.
+    """
+    now = timezone.localtime(now or timezone.now())
+    totals = _empty_bucket()
+    this_month = _empty_bucket()
+    months = {}
+
+    for row in rows:
+        month = row['month']
+        if isinstance(month, datetime) and timezone.is_aware(month):
+            month = timezone.localtime(month)
+        key = (month.year, month.month)
+
+        buckets = [totals]
+        if key == (now.year, now.month):
+            buckets.append(this_month)
+        if breakdown:
+            buckets.append(months.setdefault(key, _empty_bucket()))
+
+        for bucket in buckets:
+            _add_row(bucket, row['order_type__type'], row['orders'], row['amount'])
+
+    statistics = {
+        'total_orders': totals['orders'],
+        'income_orders': totals['income_orders'],
+        'expense_orders': totals['expense_orders'],
+        'total_income': totals['income'],
+        'total_expense': totals['expense'],
+        'net_profit': totals['income'] - totals['expense'],
+        'this_month': {
+            'orders': this_month['orders'],
+            'income': this_month['income'],
+            'expense': this_month['expense'],
+            'net_profit': this_month['income'] - this_month['expense'],
+        }
+    }
+
+    if breakdown:
+        statistics['monthly'] = [
+            {
+                'month': f'{year:04d}-{month:02d}',
+                'orders': bucket['orders'],
+                'income_orders': bucket['income_orders'],
+                'expense_orders': bucket['expense_orders'],
+                'income': bucket['income'],
+                'expense': bucket['expense'],
+                'net_profit': bucket['income'] - bucket['expense'],
+            }
+            for (year, month), bucket in sorted(months.items())
+        ]
+
+    return statistics
+
+
+def _empty_bucket():
+    return {
+        'orders': 0,
+        'income_orders': 0,
+        'expense_orders': 0,
+        'income': ZERO,
+        'expense': ZERO,
+    }
+
+
+def _add_row(bucket, order_type, orders, amount):
+    amount = amount or ZERO
+    bucket['orders'] += orders
+    if order_type == 'Income':
+        bucket['income_orders'] += orders
+        bucket['income'] += amount
+    elif order_type == 'Expense':
+        bucket['expense_orders'] += orders
+        bucket['expense'] += amount
@@ -1,3 +1,760 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework.utils.encoders import JSONEncoder
+
+from customer_relationship.models import Appointment, AppointmentType, Customer
+from customer_relationship.tests import create_customer
+from queenbe_backend.testing import IndexUsageMixin, QueryCountMixin
+from .models import Order, OrderItem, OrderType, PaymentType, OrderItemLine, OrderDailyRollup
+from .serializers import OrderSerializer
+from .statistics import order_statistics
+
+
+class FinancesIndexTests(IndexUsageMixin, TestCase):
+    """EXPLAIN based checks that the hot order endpoints use an index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('indexer', 'indexer@example.com', 'secret-pass')
+        cls.customer = create_customer(1)
+        cls.income = OrderType.objects.create(type='Income')
+        cls.expense = OrderType.objects.create(type='Expense')
+        cls.cash = PaymentType.objects.create(type='Cash')
+        item = OrderItem.objects.create(description='Shampoo', unit_price=Decimal('10.00'), inventory_quantity=2)
+        for order_type in (cls.income, cls.expense):
+            order = Order.objects.create(
+                customer=cls.customer, order_type=order_type,
+                payment_type=cls.cash, total=Decimal('20.00'),
+            )
+            OrderItemLine.objects.create(order=order, order_item=item, quantity=2, unit_price=Decimal('10.00'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertEndpointUsesIndex(self, table, url):
+        self.assertUsesIndex(table, lambda: self.assertEqual(self.client.get(url).status_code, 200))
+
+    def test_order_list(self):
+        self.assertEndpointUsesIndex('orders', '/finances/api/orders/')
+
+    def test_order_today(self):
+        self.assertEndpointUsesIndex('orders', '/finances/api/orders/today/')
+
+    def test_order_this_month(self):
+        self.assertEndpointUsesIndex('orders', '/finances/api/orders/this_month/')
+
+    def test_order_by_customer(self):
+        self.assertEndpointUsesIndex(
+            'orders', f'/finances/api/orders/by_customer/?customer_uuid={self.customer.uuid}'
+        )
+
+    def test_order_income(self):
+        self.assertEndpointUsesIndex('orders', '/finances/api/orders/income/')
+
+    def test_order_expense(self):
+        self.assertEndpointUsesIndex('orders', '/finances/api/orders/expense/')
+
+    def test_order_filter_by_payment_type(self):
+        self.assertEndpointUsesIndex('orders', f'/finances/api/orders/?payment_type={self.cash.uuid}')
+
+    def test_order_item_low_stock(self):
+        self.assertEndpointUsesIndex('order_items', '/finances/api/order-items/low_stock/')
+
+    def test_order_statistics(self):
+        self.assertEndpointUsesIndex(
+            'orders', f'/finances/api/orders/statistics/?customer={self.customer.uuid}'
+        )
+
+
+class OrderListActionTests(TestCase):
+    """Custom order list actions are paginated and can be streamed as NDJSON"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('lister', 'lister@example.com', 'secret-pass')
+        customer = create_customer(1)
+        income = OrderType.objects.create(type='Income')
+        cash = PaymentType.objects.create(type='Cash')
+        item = OrderItem.objects.create(description='Conditioner', unit_price=Decimal('5.00'))
+        appointment = Appointment.objects.create(
+            customer=customer, appointment_type=AppointmentType.objects.create(description='Haircut'),
+            start_time=timezone.now(), end_time=timezone.now(),
+        )
+        for index in range(25):
+            order = Order.objects.create(
+                customer=customer, order_type=income, payment_type=cash, total=Decimal('5.00'),
+                appointment=appointment if index % 2 else None,
+            )
+            OrderItemLine.objects.create(order=order, order_item=item, quantity=1, unit_price=Decimal('5.00'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_income_is_paginated(self):
+        response = self.client.get('/finances/api/orders/income/')
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_income_streams_ndjson(self):
+        response = self.client.get('/finances/api/orders/income/?format=ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(len(rows[0]['order_items']), 1)
+
+    def test_list_matches_order_serializer(self):
+        with self.assertNumQueries(4):  # count, orders page, ETag of related rows, item lines
+            response = self.client.get('/finances/api/orders/')
+        orders = Order.objects.filter(
+            uuid__in=[row['uuid'] for row in response.data['results']]
+        ).order_by('-created_at')
+        expected = json.loads(json.dumps(OrderSerializer(orders, many=True).data, cls=JSONEncoder))
+        self.assertEqual(json.loads(response.content)['results'], expected)
+        self.assertTrue(any(row['appointment_info'] for row in expected))
+
+    def test_order_etag_follows_related_rows(self):
+        order = Order.objects.first()
+        url = f'/finances/api/orders/{order.uuid}/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(3):  # order with its prefetched lines and items, no serialization
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Customer.objects.filter(pk=order.customer_id).update(
+            last_name='Jones', updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['customer_name'], 'Customer1 Jones')
+
+        list_etag = self.client.get('/finances/api/orders/')['ETag']
+        self.assertEqual(self.client.get('/finances/api/orders/', HTTP_IF_NONE_MATCH=list_etag).status_code, 304)
+        OrderItem.objects.update(description='Shampoo', updated_at=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(self.client.get('/finances/api/orders/', HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+    def test_export_csv_has_one_row_per_line(self):
+        response = self.client.get('/finances/api/orders/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Disposition'].startswith('attachment;'))
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows[0]['item_description'], 'Conditioner')
+        self.assertEqual(rows[0]['customer_email'], 'customer1@example.com')
+
+    def test_export_rejects_unknown_format(self):
+        response = self.client.get('/finances/api/orders/export/?file_format=pdf')
+        self.assertEqual(response.status_code, 400)
+
+    def test_low_stock_streams_ndjson(self):
+        response = self.client.get('/finances/api/order-items/low_stock/?format=ndjson')
+        rows = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(rows), 1)
+
+
+class BulkOrderTests(TestCase):
+    """Bulk order ingestion validates references per batch and reports per-row errors"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('pos', 'pos@example.com', 'secret-pass')
+        cls.customer = create_customer(1)
+        cls.income = OrderType.objects.create(type='Income')
+        cls.cash = PaymentType.objects.create(type='Cash')
+        cls.item = OrderItem.objects.create(description='Conditioner', unit_price=Decimal('5.00'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def order_row(self, **overrides):
+        row = {
+            'customer': str(self.customer.uuid),
+            'order_type': str(self.income.uuid),
+            'payment_type': str(self.cash.uuid),
+            'order_items': [{'order_item': str(self.item.uuid), 'quantity': 2, 'unit_price': '5.00'}],
+        }
+        row.update(overrides)
+        return row
+
+    def post_rows(self, count):
+        rows = [self.order_row() for _ in range(count)]
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post('/finances/api/orders/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], count)
+        return len(captured)
+
+    def test_creates_orders_with_constant_queries(self):
+        self.post_rows(1)  # creates the day's rollup row
+        self.assertEqual(self.post_rows(5), self.post_rows(50))
+        self.assertEqual(Order.objects.count(), 56)
+        self.assertEqual(OrderItemLine.objects.filter(total_price=Decimal('10.00')).count(), 56)
+
+        rollup = OrderDailyRollup.objects.get()
+        self.assertEqual((rollup.order_count, rollup.total_amount, rollup.items_sold), (56, Decimal('560.00'), 112))
+
+    def test_reports_invalid_rows(self):
+        missing = '00000000-0000-0000-0000-000000000000'
+        rows = [self.order_row(), self.order_row(customer=missing), {'customer': 'nope'}]
+        response = self.client.post('/finances/api/orders/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertIn('customer', response.data['errors'][0]['errors'])
+
+    def test_reports_totals_too_large_for_their_columns(self):
+        line = {'order_item': str(self.item.uuid), 'quantity': 1, 'unit_price': '60000000.00'}
+        rows = [
+            self.order_row(),
+            self.order_row(order_items=[line, line]),
+            self.order_row(order_items=[dict(line, quantity=2)]),
+        ]
+        response = self.client.post('/finances/api/orders/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertIn('total', response.data['errors'][0]['errors'])
+        self.assertIn('non_field_errors', response.data['errors'][1]['errors']['order_items'][0])
+
+    def test_rejects_non_list_body(self):
+        response = self.client.post('/finances/api/orders/bulk/', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ReferenceResponseCacheTests(TestCase):
+    """Order and payment type responses are served from the cache until a write"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cashier', 'cashier@example.com', 'secret-pass')
+        cls.income = OrderType.objects.create(type='Income')
+        cls.cash = PaymentType.objects.create(type='Cash')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def types(self, response):
+        return [row['type'] for row in response.data['results']]
+
+    def test_repeat_requests_skip_the_database(self):
+        for url in ('/finances/api/order-types/', f'/finances/api/payment-types/{self.cash.uuid}/'):
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(second.data, first.data)
+            self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_if_none_match(self):
+        etag = self.client.get('/finances/api/order-types/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/finances/api/order-types/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        response = self.client.get('/finances/api/order-types/', HTTP_IF_NONE_MATCH='W/"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_parameters_are_cached_separately(self):
+        OrderType.objects.create(type='Expense')
+        self.assertEqual(self.types(self.client.get('/finances/api/order-types/')), ['Expense', 'Income'])
+        self.assertEqual(self.types(self.client.get('/finances/api/order-types/?type=Income')), ['Income'])
+
+    def test_writes_invalidate(self):
+        etag = self.client.get('/finances/api/order-types/')['ETag']
+        response = self.client.post('/finances/api/order-types/', {'type': 'Expense'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.get('/finances/api/order-types/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.types(response), ['Expense', 'Income'])
+
+        # ORM writes (admin, shell, commands) invalidate too
+        self.client.get('/finances/api/payment-types/')
+        self.cash.delete()
+        self.assertEqual(self.types(self.client.get('/finances/api/payment-types/')), [])
+
+    def test_errors_are_not_cached(self):
+        url = '/finances/api/order-types/00000000-0000-0000-0000-000000000000/'
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_authentication_is_still_required(self):
+        self.client.get('/finances/api/order-types/')
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/finances/api/order-types/').status_code, 401)
+
+
+class FinancesQueryCountTests(QueryCountMixin, TestCase):
+    """Every finances action costs a fixed number of queries as data grows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', 'counter@example.com', 'secret-pass')
+        cls.customer = create_customer(1)
+        cls.appointment = Appointment.objects.create(
+            customer=cls.customer, appointment_type=AppointmentType.objects.create(description='Haircut'),
+            start_time=timezone.now(), end_time=timezone.now(),
+        )
+        cls.income = OrderType.objects.create(type='Income')
+        cls.expense = OrderType.objects.create(type='Expense')
+        cls.cash = PaymentType.objects.create(type='Cash')
+        cls.item = OrderItem.objects.create(description='Shampoo', unit_price=Decimal('10.00'), inventory_quantity=2)
+
+    def setUp(self):
+        # Rolled back test data does not invalidate cached responses, start every test cold
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.seeded = 0
+
+    def grow(self, count):
+        """Add orders of both types with two lines each, half of them tied to an appointment"""
+        for _ in range(count):
+            self.seeded += 1
+            item = OrderItem.objects.create(
+                description=f'Item {self.seeded}', unit_price=Decimal('5.00'), inventory_quantity=1
+            )
+            self.create_order(
+                order_type=self.income if self.seeded % 2 else self.expense,
+                appointment=self.appointment if self.seeded % 2 else None,
+                items=(self.item, item),
+            )
+
+    def create_order(self, order_type=None, appointment=None, items=()):
+        order = Order.objects.create(
+            customer=self.customer, order_type=order_type or self.income,
+            payment_type=self.cash, appointment=appointment, total=Decimal('15.00'),
+        )
+        for item in items:
+            OrderItemLine.objects.create(order=order, order_item=item, quantity=1, unit_price=item.unit_price)
+        return order
+
+    def order_payload(self):
+        return {
+            'customer': str(self.customer.uuid), 'order_type': str(self.income.uuid),
+            'payment_type': str(self.cash.uuid), 'total': '15.00',
+        }
+
+    def order_with_items_payload(self):
+        payload = self.order_payload()
+        del payload['total']
+        payload['order_items'] = [{'order_item': str(self.item.uuid), 'quantity': 2, 'unit_price': '10.00'}]
+        return payload
+
+    def assertReferenceCrud(self, url, model, payload):
+        """CRUD for the small reference tables (order types, payment types, order items)"""
+        self.assertConstantQueries(lambda: self.client.get(url))
+        self.assertConstantQueries(lambda: self.client.post(url, payload, format='json'))
+        self.assertConstantQueries(
+            lambda instance: self.client.get(f'{url}{instance.uuid}/'),
+            prepare=lambda: model.objects.create(**payload),
+        )
+        self.assertConstantQueries(
+            lambda instance: self.client.put(f'{url}{instance.uuid}/', payload, format='json'),
+            prepare=lambda: model.objects.create(**payload),
+        )
+        self.assertConstantQueries(
+            lambda instance: self.client.patch(f'{url}{instance.uuid}/', payload, format='json'),
+            prepare=lambda: model.objects.create(**payload),
+        )
+        self.assertConstantQueries(
+            lambda instance: self.client.delete(f'{url}{instance.uuid}/'),
+            prepare=lambda: model.objects.create(**payload),
+        )
+
+    # Reference tables
+
+    def test_order_type_crud(self):
+        self.assertReferenceCrud('/finances/api/order-types/', OrderType, {'type': 'Refund'})
+
+    def test_payment_type_crud(self):
+        self.assertReferenceCrud('/finances/api/payment-types/', PaymentType, {'type': 'Pix'})
+
+    def test_order_item_crud(self):
+        self.assertReferenceCrud(
+            '/finances/api/order-items/', OrderItem, {'description': 'Gel', 'unit_price': '3.00'}
+        )
+
+    def test_order_item_low_stock(self):
+        for suffix in ('', '?format=ndjson'):
+            self.assertConstantQueries(lambda: self.client.get(f'/finances/api/order-items/low_stock/{suffix}'))
+
+    # Order item lines
+
+    def test_order_item_line_list(self):
+        self.assertConstantQueries(lambda: self.client.get('/finances/api/order-item-lines/'))
+
+    def test_order_item_line_crud(self):
+        url = '/finances/api/order-item-lines/'
+        payload = lambda order: {
+            'order': str(order.uuid), 'order_item': str(self.item.uuid), 'quantity': 1, 'unit_price': '10.00',
+        }
+        line = lambda: self.create_order(items=[self.item]).order_items.get()
+
+        response = self.assertConstantQueries(
+            lambda order: self.client.post(url, payload(order), format='json'), prepare=self.create_order
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertConstantQueries(lambda line: self.client.get(f'{url}{line.uuid}/'), prepare=line)
+        self.assertConstantQueries(
+            lambda line: self.client.put(f'{url}{line.uuid}/', payload(line.order), format='json'), prepare=line
+        )
+        self.assertConstantQueries(
+            lambda line: self.client.patch(f'{url}{line.uuid}/', {'quantity': 3}, format='json'), prepare=line
+        )
+        self.assertConstantQueries(lambda line: self.client.delete(f'{url}{line.uuid}/'), prepare=line)
+
+    # Orders
+
+    def test_order_list(self):
+        for suffix in ('', '?pagination=cursor', '?format=ndjson', '?search=Jane'):
+            self.assertConstantQueries(lambda: self.client.get(f'/finances/api/orders/{suffix}'))
+
+    def test_order_list_actions(self):
+        urls = [
+            f'/finances/api/orders/{name}/' for name in ('today', 'this_month', 'income', 'expense')
+        ] + [f'/finances/api/orders/by_customer/?customer_uuid={self.customer.uuid}']
+        for url in urls:
+            response = self.assertConstantQueries(lambda: self.client.get(url))
+            self.assertEqual(response.status_code, 200)
+
+    def test_order_retrieve(self):
+        self.assertConstantQueries(
+            lambda order: self.client.get(f'/finances/api/orders/{order.uuid}/'),
+            prepare=lambda: self.create_order(appointment=self.appointment, items=[self.item, self.item]),
+        )
+
+    def test_order_create(self):
+        response = self.assertConstantQueries(
+            lambda: self.client.post('/finances/api/orders/', self.order_payload(), format='json')
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_order_update(self):
+        for method in ('put', 'patch'):
+            response = self.assertConstantQueries(
+                lambda order: getattr(self.client, method)(
+                    f'/finances/api/orders/{order.uuid}/', self.order_payload(), format='json'
+                ),
+                prepare=lambda: self.create_order(items=[self.item]),
+            )
+            self.assertEqual(response.status_code, 200)
+
+    def test_order_destroy(self):
+        response = self.assertConstantQueries(
+            lambda order: self.client.delete(f'/finances/api/orders/{order.uuid}/'),
+            prepare=lambda: self.create_order(items=[self.item, self.item]),
+        )
+        self.assertEqual(response.status_code, 204)
+
+    def test_order_create_with_items(self):
+        response = self.assertConstantQueries(lambda: self.client.post(
+            '/finances/api/orders/create_with_items/', self.order_with_items_payload(), format='json'
+        ))
+        self.assertEqual(response.status_code, 201)
+
+    def test_order_bulk(self):
+        response = self.assertConstantQueries(lambda: self.client.post(
+            '/finances/api/orders/bulk/', [self.order_with_items_payload()] * 3, format='json'
+        ))
+        self.assertEqual(response.status_code, 201)
+
+    def test_order_export(self):
+        for file_format in ('csv', 'xlsx'):
+            response = self.assertConstantQueries(
+                lambda: self.client.get(f'/finances/api/orders/export/?file_format={file_format}')
+            )
+            self.assertEqual(response.status_code, 200)
+
+    def test_order_statistics(self):
+        for query in ('', '?breakdown=month', f'?customer={self.customer.uuid}'):
+            self.assertConstantQueries(lambda: self.client.get(f'/finances/api/orders/statistics/{query}'))
+
+
+class OrderStatisticsTests(TestCase):
+    """Order statistics honour their filters and monthly breakdown in a single query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('accountant', 'accountant@example.com', 'secret-pass')
+        cls.first = create_customer(1)
+        cls.second = create_customer(2)
+        cls.income = OrderType.objects.create(type='Income')
+        cls.expense = OrderType.objects.create(type='Expense')
+        cls.cash = PaymentType.objects.create(type='Cash')
+        cls.card = PaymentType.objects.create(type='Card')
+        cls.today = timezone.localdate()
+        for customer, order_type, payment_type, total, day in (
+            (cls.first, cls.income, cls.cash, '100.00', date(2024, 1, 15)),
+            (cls.first, cls.expense, cls.card, '30.00', date(2024, 1, 20)),
+            (cls.second, cls.income, cls.cash, '50.00', date(2024, 2, 10)),
+            (cls.second, cls.income, cls.card, '20.00', cls.today),
+        ):
+            order = Order.objects.create(
+                customer=customer, order_type=order_type, payment_type=payment_type, total=total
+            )
+            # created_at is only assigned on insert; moving it also moves the rollup bucket
+            order.created_at = timezone.make_aware(datetime.combine(day, time(12)))
+            order.save()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def statistics(self, query=''):
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/finances/api/orders/statistics/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def figures(self, data):
+        return (data['total_orders'], data['total_income'], data['total_expense'], data['net_profit'])
+
+    def test_unfiltered(self):
+        data = self.statistics()
+        self.assertEqual(self.figures(data), (4, Decimal('170.00'), Decimal('30.00'), Decimal('140.00')))
+        self.assertEqual((data['income_orders'], data['expense_orders']), (3, 1))
+        self.assertEqual(data['this_month'], {
+            'orders': 1, 'income': Decimal('20.00'), 'expense': Decimal('0.00'), 'net_profit': Decimal('20.00'),
+        })
+        self.assertNotIn('monthly', data)
+
+    def test_filters(self):
+        self.assertEqual(
+            self.figures(self.statistics('?date_from=2024-01-01&date_to=2024-01-31')),
+            (2, Decimal('100.00'), Decimal('30.00'), Decimal('70.00')),
+        )
+        # Both bounds are inclusive days
+        self.assertEqual(self.statistics('?date_from=2024-01-20&date_to=2024-02-10')['total_orders'], 2)
+        self.assertEqual(
+            self.figures(self.statistics(f'?payment_type={self.cash.uuid}')),
+            (2, Decimal('150.00'), Decimal('0.00'), Decimal('150.00')),
+        )
+        self.assertEqual(
+            self.figures(self.statistics(f'?customer={self.first.uuid}')),
+            (2, Decimal('100.00'), Decimal('30.00'), Decimal('70.00')),
+        )
+        self.assertEqual(
+            self.figures(self.statistics(f'?customer={self.second.uuid}&payment_type={self.card.uuid}')),
+            (1, Decimal('20.00'), Decimal('0.00'), Decimal('20.00')),
+        )
+
+    def test_monthly_breakdown(self):
+        monthly = self.statistics('?breakdown=month')['monthly']
+        self.assertEqual(
+            [month['month'] for month in monthly],
+            ['2024-01', '2024-02', self.today.strftime('%Y-%m')],
+        )
+        self.assertEqual(monthly[0], {
+            'month': '2024-01', 'orders': 2, 'income_orders': 1, 'expense_orders': 1,
+            'income': Decimal('100.00'), 'expense': Decimal('30.00'), 'net_profit': Decimal('70.00'),
+        })
+        self.assertEqual((monthly[1]['orders'], monthly[1]['income']), (1, Decimal('50.00')))
+
+        monthly = self.statistics(f'?breakdown=month&customer={self.first.uuid}')['monthly']
+        self.assertEqual([month['month'] for month in monthly], ['2024-01'])
+
+    def test_invalid_filters(self):
+        for query in (
+            'date_from=2024-13-01', 'date_to=yesterday', 'date_from=2024-02-01&date_to=2024-01-01',
+            'payment_type=cash', 'customer=42',
+        ):
+            response = self.client.get(f'/finances/api/orders/statistics/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', response.data)
+
+
+class OrderRollupTests(TestCase):
+    """The daily rollup follows order and line writes and can be rebuilt from the orders"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = create_customer(1)
+        cls.income = OrderType.objects.create(type='Income')
+        cls.expense = OrderType.objects.create(type='Expense')
+        cls.cash = PaymentType.objects.create(type='Cash')
+        cls.card = PaymentType.objects.create(type='Card')
+        cls.item = OrderItem.objects.create(description='Shampoo', unit_price=Decimal('10.00'))
+        cls.today = timezone.localdate()
+        cls.yesterday = cls.today - timedelta(days=1)
+
+    def create_order(self, total='10.00', order_type=None, payment_type=None, day=None):
+        order = Order.objects.create(
+            customer=self.customer, order_type=order_type or self.income,
+            payment_type=payment_type or self.cash, total=total,
+        )
+        if day is not None:
+            order.created_at = timezone.make_aware(datetime.combine(day, time(12)))
+            order.save()
+        return order
+
+    def rollup(self, day=None, order_type=None, payment_type=None):
+        """(order_count, total_amount, line_count, items_sold) of a bucket, None when it has no row"""
+        return OrderDailyRollup.objects.filter(
+            day=day or self.today, order_type=order_type or self.income, payment_type=payment_type or self.cash,
+        ).values_list('order_count', 'total_amount', 'line_count', 'items_sold').first()
+
+    def test_order_writes_keep_buckets_current(self):
+        order = self.create_order('10.00')
+        self.create_order('5.00')
+        self.assertEqual(self.rollup(), (2, Decimal('15.00'), 0, 0))
+
+        order.total = Decimal('12.00')
+        order.save()
+        self.assertEqual(self.rollup(), (2, Decimal('17.00'), 0, 0))
+
+        order.created_at -= timedelta(days=1)
+        order.save()
+        self.assertEqual(self.rollup(), (1, Decimal('5.00'), 0, 0))
+        self.assertEqual(self.rollup(day=self.yesterday), (1, Decimal('12.00'), 0, 0))
+
+        order.order_type = self.expense
+        order.save()
+        self.assertIsNone(self.rollup(day=self.yesterday))
+        self.assertEqual(self.rollup(day=self.yesterday, order_type=self.expense), (1, Decimal('12.00'), 0, 0))
+
+        order.payment_type = self.card
+        order.save()
+        self.assertIsNone(self.rollup(day=self.yesterday, order_type=self.expense))
+        self.assertEqual(
+            self.rollup(day=self.yesterday, order_type=self.expense, payment_type=self.card),
+            (1, Decimal('12.00'), 0, 0),
+        )
+
+        order.delete()
+        self.assertEqual(OrderDailyRollup.objects.count(), 1)
+        self.assertEqual(self.rollup(), (1, Decimal('5.00'), 0, 0))
+
+    def test_line_writes_update_line_count_and_items_sold(self):
+        order = self.create_order('50.00')
+        first = OrderItemLine.objects.create(order=order, order_item=self.item, quantity=2, unit_price=Decimal('10.00'))
+        OrderItemLine.objects.create(order=order, order_item=self.item, quantity=3, unit_price=Decimal('10.00'))
+        self.assertEqual(self.rollup(), (1, Decimal('50.00'), 2, 5))
+
+        first.quantity = 4
+        first.save()
+        self.assertEqual(self.rollup(), (1, Decimal('50.00'), 2, 7))
+
+        # Moving a line to another day's order updates both buckets
+        other = self.create_order('0.00', day=self.yesterday)
+        first.order = other
+        first.save()
+        self.assertEqual(self.rollup(), (1, Decimal('50.00'), 1, 3))
+        self.assertEqual(self.rollup(day=self.yesterday), (1, Decimal('0.00'), 1, 4))
+
+        first.delete()
+        self.assertEqual(self.rollup(day=self.yesterday), (1, Decimal('0.00'), 0, 0))
+
+    def test_rebuild_command_repairs_a_range(self):
+        order = self.create_order('10.00', day=self.yesterday)
+        OrderItemLine.objects.create(order=order, order_item=self.item, quantity=2, unit_price=Decimal('5.00'))
+        self.create_order('7.00', order_type=self.expense, day=self.yesterday)
+        self.create_order('20.00')
+        expected = {
+            'yesterday': self.rollup(day=self.yesterday),
+            'expense': self.rollup(day=self.yesterday, order_type=self.expense),
+        }
+
+        # Corrupt the range: a wrong bucket, a missing one and a stale one
+        OrderDailyRollup.objects.filter(day=self.yesterday, order_type=self.income).update(order_count=99, items_sold=0)
+        OrderDailyRollup.objects.filter(day=self.yesterday, order_type=self.expense).delete()
+        OrderDailyRollup.objects.create(
+            day=self.yesterday, order_type=self.income, payment_type=self.card, order_count=3, total_amount=1,
+        )
+        # Outside the range: left alone
+        OrderDailyRollup.objects.filter(day=self.today).update(order_count=42)
+
+        out = io.StringIO()
+        call_command(
+            'rebuild_order_rollups', f'--date-from={self.yesterday}', f'--date-to={self.yesterday}', stdout=out
+        )
+        self.assertIn('Rebuilt 2 daily order rollups', out.getvalue())
+        self.assertEqual(self.rollup(day=self.yesterday), expected['yesterday'])
+        self.assertEqual(self.rollup(day=self.yesterday, order_type=self.expense), expected['expense'])
+        self.assertIsNone(self.rollup(day=self.yesterday, payment_type=self.card))
+        self.assertEqual(self.rollup()[0], 42)
+
+        call_command('rebuild_order_rollups', stdout=io.StringIO())
+        self.assertEqual(self.rollup(), (1, Decimal('20.00'), 0, 0))
+
+    def test_rebuild_command_validates_dates(self):
+        for args in (['--date-from=yesterday'], ['--date-from=2024-02-01', '--date-to=2024-01-01']):
+            with self.assertRaises(CommandError):
+                call_command('rebuild_order_rollups', *args, stdout=io.StringIO())
+
+    def test_statistics_agree_between_rollup_and_orders(self):
+        self.create_order('10.00')
+        self.create_order('4.00', order_type=self.expense, payment_type=self.card)
+        self.create_order('30.00', day=self.yesterday)
+        self.create_order('8.00', payment_type=self.card, day=date(2024, 3, 1))
+
+        # Every order belongs to the customer, so both paths cover the same rows
+        for breakdown in (False, True):
+            from_rollup = order_statistics({}, breakdown=breakdown)
+            from_orders = order_statistics({'customer': self.customer.uuid}, breakdown=breakdown)
+            self.assertEqual(from_rollup, from_orders)
+            self.assertEqual(from_rollup['total_income'], Decimal('48.00'))
+            for filters in ({'payment_type': self.card.uuid}, {'date_from': self.yesterday}):
+                self.assertEqual(
+                    order_statistics(filters, breakdown=breakdown),
+                    order_statistics({**filters, 'customer': self.customer.uuid}, breakdown=breakdown),
+                )
+
+
+class RollupMigrationTests(TransactionTestCase):
+    """Migrating to the rollup table fills it for the orders that already exist"""
+
+    migrate_from = [('finances', '0001_initial')]
+    migrate_to = [('finances', '0002_orderdailyrollup')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_existing_orders_are_rolled_up(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        Customer = apps.get_model('customer_relationship', 'Customer')
+        Order = apps.get_model('finances', 'Order')
+        OrderItem = apps.get_model('finances', 'OrderItem')
+        OrderItemLine = apps.get_model('finances', 'OrderItemLine')
+        income = apps.get_model('finances', 'OrderType').objects.create(type='Income')
+        cash = apps.get_model('finances', 'PaymentType').objects.create(type='Cash')
+        customer = Customer.objects.create(
+            first_name='Jane', last_name='Doe', email='jane@example.com', phone='5551234567',
+            date_of_birth=date(1990, 1, 15), gender='female', address_street='Main Street',
+            address_number='1', address_neighborhood='Downtown', address_city='New York',
+            address_state='NY', address_zip_code='10001', address_country='USA',
+        )
+        item = OrderItem.objects.create(description='Shampoo', unit_price=Decimal('10.00'))
+        for total, quantity in (('10.00', 1), ('30.00', 3)):
+            order = Order.objects.create(customer=customer, order_type=income, payment_type=cash, total=total)
+            OrderItemLine.objects.create(
+                order=order, order_item=item, quantity=quantity, unit_price=Decimal('10.00'), total_price=total,
+            )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        apps = executor.loader.project_state(self.migrate_to).apps
+        rollups = apps.get_model('finances', 'OrderDailyRollup').objects.values_list(
+            'day', 'order_count', 'total_amount', 'line_count', 'items_sold'
+        )
+        self.assertEqual(list(rollups), [(timezone.localdate(), 2, Decimal('40.00'), 2, 4)])
@@ -65,6 +65,8 @@ urlpatterns = [
 # GET /api/orders/income/ - List income orders
 # GET /api/orders/expense/ - List expense orders
 # POST /api/orders/create_with_items/ - Create order with items in single request
+# POST /api/orders/bulk/ - Create many orders with items in single request (list body, per-row errors)
+# GET /api/orders/export/ - Export orders with item lines (?file_format=csv|xlsx, ?date_from=, ?date_to=, list filters)
 # GET /api/orders/statistics/ - Get order statistics
 
 # Query parameters for filtering:
@@ -72,9 +74,18 @@ urlpatterns = [
 # Payment Types: ?type=Cash/Credit Card/etc
 # Order Items: ?inventory_quantity=0, ?search=description
 # Orders: ?order_type={uuid}, ?payment_type={uuid}, ?customer={uuid}, ?appointment={uuid}
+# Pagination: ?page=N (default, includes count) or ?pagination=cursor for keyset pages;
+# keyset responses only carry `next` (follow it, it holds ?cursor=...) and skip the count query
+# Streaming: ?format=ndjson on order/order item lists and their custom list actions
+# (today, this_month, by_customer, income, expense, low_stock) streams one JSON object per line
 # ?search=term (searches customer name/email)
 # ?ordering=created_at,-updated_at,total (for orders)
+# Order/payment type list and retrieve responses are cached until the next write and carry an ETag;
+# send it back in If-None-Match to get 304 Not Modified
+# Other list and detail responses carry an ETag (details also Last-Modified) computed from updated_at
+# of the page/object and its related rows; If-None-Match / If-Modified-Since get 304 without a body
 
 # Advanced search query parameters:
 # Order by customer: ?customer_uuid={uuid} (for by_customer endpoint)
-# Order statistics: No parameters needed, returns comprehensive stats
\ No newline at end of file
+# Order statistics: ?date_from=YYYY-MM-DD, ?date_to=YYYY-MM-DD, ?payment_type={uuid}, ?customer={uuid},
+# ?breakdown=month (adds a per-month split, computed in the same single query)
\ No newline at end of file
@@ -2,9 +2,15 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Sum
 from django.utils import timezone
+from queenbe_backend.caching import CachedResponseMixin, ConditionalGetMixin
+from queenbe_backend.streaming import StreamingListMixin
 from .models import Order, OrderItem, OrderType, PaymentType, OrderItemLine
+from .bulk import create_orders_in_bulk
+from .exports import EXPORT_FORMATS, export_response
+from .projections import order_rows, project_orders
+from .rollups import day_bounds, month_bounds
+from .statistics import order_lookups, order_statistics, parse_statistics_filters
 from .serializers import (
     OrderSerializer, OrderCreateSerializer, OrderUpdateSerializer, OrderWithItemsCreateSerializer,
     OrderItemSerializer, OrderItemCreateSerializer, OrderItemUpdateSerializer,
@@ -14,7 +20,7 @@ from .serializers import (
 )
 
 
-class OrderTypeViewSet(viewsets.ModelViewSet):
+class OrderTypeViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
     ViewSet for OrderType CRUD operations
     
@@ -25,6 +31,8 @@ class OrderTypeViewSet(viewsets.ModelViewSet):
     - PUT /api/order-types/{uuid}/ - Update a specific order type (full update)
     - PATCH /api/order-types/{uuid}/ - Partial update a specific order type
     - DELETE /api/order-types/{uuid}/ - Delete a specific order type
+    
+    List and retrieve responses are cached with an ETag until the next write.
     """
     
     queryset = OrderType.objects.all()
@@ -47,7 +55,7 @@ class OrderTypeViewSet(viewsets.ModelViewSet):
         return OrderTypeSerializer
 
 
-class PaymentTypeViewSet(viewsets.ModelViewSet):
+class PaymentTypeViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
     ViewSet for PaymentType CRUD operations
     
@@ -58,6 +66,8 @@ class PaymentTypeViewSet(viewsets.ModelViewSet):
     - PUT /api/payment-types/{uuid}/ - Update a specific payment type (full update)
     - PATCH /api/payment-types/{uuid}/ - Partial update a specific payment type
     - DELETE /api/payment-types/{uuid}/ - Delete a specific payment type
+    
+    List and retrieve responses are cached with an ETag until the next write.
     """
     
     queryset = PaymentType.objects.all()
@@ -80,7 +90,7 @@ class PaymentTypeViewSet(viewsets.ModelViewSet):
         return PaymentTypeSerializer
 
 
-class OrderItemViewSet(viewsets.ModelViewSet):
+class OrderItemViewSet(ConditionalGetMixin, StreamingListMixin, viewsets.ModelViewSet):
     """
     ViewSet for OrderItem CRUD operations
     
@@ -94,6 +104,8 @@ class OrderItemViewSet(viewsets.ModelViewSet):
     
     Additional endpoints:
     - GET /api/order-items/low_stock/ - List items with low inventory
+    
+    List endpoints are paginated; add ?format=ndjson to stream every row instead.
     """
     
     queryset = OrderItem.objects.all()
@@ -119,11 +131,10 @@ class OrderItemViewSet(viewsets.ModelViewSet):
     def low_stock(self, request):
         """Get order items with low inventory (less than 5)"""
         low_stock_items = self.queryset.filter(inventory_quantity__lt=5)
-        serializer = self.get_serializer(low_stock_items, many=True)
-        return Response(serializer.data)
+        return self.list_response(low_stock_items)
 
 
-class OrderItemLineViewSet(viewsets.ModelViewSet):
+class OrderItemLineViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for OrderItemLine CRUD operations
     
@@ -139,6 +150,8 @@ class OrderItemLineViewSet(viewsets.ModelViewSet):
     queryset = OrderItemLine.objects.all()
     serializer_class = OrderItemLineSerializer
     lookup_field = 'uuid'
+    # Related rows shown in responses; their changes invalidate the ETag
+    conditional_dependencies = ('order', 'order_item')
     
     # Enable filtering, searching, and ordering
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -160,7 +173,7 @@ class OrderItemLineViewSet(viewsets.ModelViewSet):
         return OrderItemLineSerializer
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ConditionalGetMixin, StreamingListMixin, viewsets.ModelViewSet):
     """
     ViewSet for Order CRUD operations
     
@@ -179,12 +192,21 @@ class OrderViewSet(viewsets.ModelViewSet):
     - GET /api/orders/income/ - List income orders
     - GET /api/orders/expense/ - List expense orders
     - POST /api/orders/create_with_items/ - Create order with items in single request
+    - POST /api/orders/bulk/ - Create many orders with items in single request
+    - GET /api/orders/export/ - Download orders with their item lines as CSV/XLSX
     - GET /api/orders/statistics/ - Get order statistics
+    
+    List endpoints are paginated; add ?format=ndjson to stream every row instead.
     """
     
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     lookup_field = 'uuid'
+    # Related rows shown in responses; their changes invalidate the ETag
+    conditional_dependencies = (
+        'customer', 'order_type', 'payment_type', 'appointment', 'appointment__appointment_type',
+        'order_items', 'order_items__order_item',
+    )
     
     # Enable filtering, searching, and ordering
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -193,10 +215,13 @@ class OrderViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'updated_at', 'total']
     ordering = ['-created_at']
     
+    # Maximum number of orders accepted by a single bulk request
+    bulk_max_orders = 5000
+    
     def get_queryset(self):
         """Override queryset to include related objects"""
         return self.queryset.select_related(
-            'customer', 'order_type', 'payment_type', 'appointment'
+            'customer', 'order_type', 'payment_type', 'appointment__appointment_type'
         ).prefetch_related('order_items__order_item')
     
     def get_serializer_class(self):
@@ -209,24 +234,30 @@ class OrderViewSet(viewsets.ModelViewSet):
             return OrderUpdateSerializer
         return OrderSerializer
     
+    def get_list_source(self, queryset):
+        """List actions read flat value rows instead of model instances"""
+        return order_rows(queryset)
+    
+    def serialize_rows(self, rows):
+        """Build the OrderSerializer shape without per-order serializers"""
+        return project_orders(rows)
+    
     @action(detail=False, methods=['get'])
     def today(self, request):
         """Get orders created today"""
-        today = timezone.now().date()
-        today_orders = self.get_queryset().filter(created_at__date=today)
-        serializer = self.get_serializer(today_orders, many=True)
-        return Response(serializer.data)
+        start, end = day_bounds(timezone.localdate())
+        today_orders = self.get_queryset().filter(created_at__gte=start, created_at__lt=end)
+        return self.list_response(today_orders)
     
     @action(detail=False, methods=['get'])
     def this_month(self, request):
         """Get orders created this month"""
-        now = timezone.now()
+        start, end = month_bounds(timezone.localdate())
         this_month_orders = self.get_queryset().filter(
-            created_at__year=now.year,
-            created_at__month=now.month
+            created_at__gte=start,
+            created_at__lt=end
         )
-        serializer = self.get_serializer(this_month_orders, many=True)
-        return Response(serializer.data)
+        return self.list_response(this_month_orders)
     
     @action(detail=False, methods=['get'])
     def by_customer(self, request):
@@ -239,22 +270,19 @@ class OrderViewSet(viewsets.ModelViewSet):
             )
         
         customer_orders = self.get_queryset().filter(customer__uuid=customer_uuid)
-        serializer = self.get_serializer(customer_orders, many=True)
-        return Response(serializer.data)
+        return self.list_response(customer_orders)
     
     @action(detail=False, methods=['get'])
     def income(self, request):
         """Get income orders"""
         income_orders = self.get_queryset().filter(order_type__type='Income')
-        serializer = self.get_serializer(income_orders, many=True)
-        return Response(serializer.data)
+        return self.list_response(income_orders)
     
     @action(detail=False, methods=['get'])
     def expense(self, request):
         """Get expense orders"""
         expense_orders = self.get_queryset().filter(order_type__type='Expense')
-        serializer = self.get_serializer(expense_orders, many=True)
-        return Response(serializer.data)
+        return self.list_response(expense_orders)
     
     @action(detail=False, methods=['post'])
     def create_with_items(self, request):
@@ -268,48 +296,83 @@ class OrderViewSet(viewsets.ModelViewSet):
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    @action(detail=False, methods=['get'])
-    def statistics(self, request):
-        """Get order statistics"""
-        queryset = self.get_queryset()
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create many orders with order items in a single request
         
-        # Basic counts
-        total_orders = queryset.count()
-        income_orders = queryset.filter(order_type__type='Income').count()
-        expense_orders = queryset.filter(order_type__type='Expense').count()
+        Expects a JSON list of orders shaped like create_with_items payloads.
+        Valid orders are inserted together; invalid ones are reported by index.
+        """
+        rows = request.data
+        if not isinstance(rows, list) or not rows:
+            return Response(
+                {'error': 'A non-empty list of orders is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(rows) > self.bulk_max_orders:
+            return Response(
+                {'error': f'At most {self.bulk_max_orders} orders can be created per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Total amounts
-        total_income = queryset.filter(order_type__type='Income').aggregate(
-            total=Sum('total')
-        )['total'] or 0
-        total_expense = queryset.filter(order_type__type='Expense').aggregate(
-            total=Sum('total')
-        )['total'] or 0
+        orders, errors = create_orders_in_bulk(rows)
+        if not orders:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
         
-        # This month stats
-        now = timezone.now()
-        this_month_orders = queryset.filter(
-            created_at__year=now.year,
-            created_at__month=now.month
+        return Response(
+            {
+                'created': len(orders),
+                'orders': [order.uuid for order in orders],
+                'errors': errors,
+            },
+            status=response_status
         )
-        this_month_income = this_month_orders.filter(order_type__type='Income').aggregate(
-            total=Sum('total')
-        )['total'] or 0
-        this_month_expense = this_month_orders.filter(order_type__type='Expense').aggregate(
-            total=Sum('total')
-        )['total'] or 0
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Export orders joined with customer, types and item lines
+        
+        Accepts the list filters plus date_from/date_to (YYYY-MM-DD) and
+        file_format=csv (default, streamed) or xlsx.
+        """
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"file_format must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            filters = parse_statistics_filters(request.query_params)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.filter_queryset(self.get_queryset()).filter(**order_lookups(filters))
+        return export_response(queryset, file_format)
+    
+    @action(detail=False, methods=['get'])
+    def statistics(self, request):
+        """
+        Get order statistics
+
+        Optional query parameters: date_from, date_to (YYYY-MM-DD),
+        payment_type, customer (uuid) and breakdown=month for a per-month split.
+        """
+        try:
+            filters = parse_statistics_filters(request.query_params)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        return Response({
-            'total_orders': total_orders,
-            'income_orders': income_orders,
-            'expense_orders': expense_orders,
-            'total_income': total_income,
-            'total_expense': total_expense,
-            'net_profit': total_income - total_expense,
-            'this_month': {
-                'orders': this_month_orders.count(),
-                'income': this_month_income,
-                'expense': this_month_expense,
-                'net_profit': this_month_income - this_month_expense,
-            }
-        })
\ No newline at end of file
+        breakdown = request.query_params.get('breakdown') == 'month'
+        return Response(order_statistics(filters, breakdown=breakdown))
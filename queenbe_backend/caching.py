@@ -0,0 +1,272 @@
+"""
+Versioned caching shared by the apps.
+
+Cached entries embed a version number in their key. Writes bump the version
+(`bump_version`), which makes every entry of the previous version
+unreachable at once; the stale entries simply expire. Versions live in the
+default cache (see CACHES in settings), so a shared backend such as Redis
+shares invalidations between worker processes too.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def current_version(name):
+    """Current version number of a named cache namespace"""
+    key = f'version:{name}'
+    value = cache.get(key)
+    if value is None:
+        # Never restart from a small number: entries of an evicted version could match again
+        cache.add(key, time.time_ns(), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def _increment(name):
+    key = f'version:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_version(name):
+    """Invalidate every entry cached under the current version of a namespace"""
+    _increment(name)
+    # Inside a transaction a concurrent request may still cache the pre-write rows; bump again once committed
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _increment(name))
+
+
+def data_etag(data):
+    """Weak ETag of serialized response data (renderer independent)"""
+    payload = json.dumps(data, cls=JSONEncoder, sort_keys=True, separators=(',', ':'))
+    return f'W/"{hashlib.sha1(payload.encode()).hexdigest()}"'
+
+
+def etag_matches(request, etag):
+    """Whether the request's If-None-Match holds etag (weak comparison)"""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag.removeprefix('W/') in {value.removeprefix('W/') for value in etags}
+
+
+def not_modified_since(request, last_modified):
+    """Whether the request's If-Modified-Since is at or after last_modified (second precision)"""
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and int(last_modified.timestamp()) <= since
+
+
+def response_namespace(model):
+    return f'responses:{model._meta.label_lower}'
+
+
+def invalidate_cached_responses(model):
+    """Drop the cached responses of a model; call from its post_save/post_delete receivers"""
+    bump_version(response_namespace(model))
+
+
+class CachedResponseMixin:
+    """
+    Cache list/retrieve response data of small, rarely changing tables.
+
+    Entries are keyed by the model's response version and the full request
+    URL (filters, search, ordering and pagination included) and store the
+    serialized data with its ETag. Hits skip the database entirely (after
+    authentication and permission checks); a matching If-None-Match gets a
+    304 without a body. The model's post_save and post_delete receivers must
+    call `invalidate_cached_responses` so writes drop its cached responses.
+    """
+
+    cached_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def response_cache_key(self, request):
+        namespace = response_namespace(self.queryset.model)
+        url = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+        return f'{namespace}:{current_version(namespace)}:{url}'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if self.action not in self.cached_actions:
+            return handler(request, *args, **kwargs)
+
+        key = self.response_cache_key(request)
+        entry = cache.get(key)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = (data_etag(response.data), response.data)
+            cache.set(key, entry, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 3600))
+
+        etag, data = entry
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        # Clients may keep the body but must revalidate before reusing it
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class NotModified(Exception):
+    """Raised before serialization when the client's cached representation is current"""
+
+
+def _loaded_stamps(obj, path):
+    """
+    (pk, updated_at) of the rows reached from obj along a relation path, read
+    from select_related/prefetch_related caches; None when any step is not loaded.
+    """
+    objs = [obj]
+    for name in path.split('__'):
+        reached = []
+        for current in objs:
+            field = current._meta.get_field(name)
+            if field.many_to_many or field.one_to_many:
+                prefetched = getattr(current, '_prefetched_objects_cache', {})
+                cache_name = field.get_accessor_name() if field.auto_created else field.name
+                if cache_name not in prefetched:
+                    return None
+                reached.extend(prefetched[cache_name])
+            else:
+                if not field.is_cached(current):
+                    return None
+                value = field.get_cached_value(current)
+                if value is not None:
+                    reached.append(value)
+        objs = reached
+    return [(str(item.pk), item.updated_at) for item in objs]
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified validators for list and retrieve, checked before serialization.
+
+    The validator is built from rows the endpoint loads anyway: the paginated
+    page (or the retrieved object) with each row's primary key and
+    `updated_at`, the pagination envelope (count, next/previous links) and the
+    rows behind `conditional_dependencies`, relation paths whose data appears
+    in the representation. Related rows already loaded by select_related or
+    prefetch_related are read from memory; otherwise one aggregate query
+    (count and newest `updated_at` per path, restricted to the page's keys)
+    covers them. Hashed with the request URL and the negotiated media type,
+    this yields an ETag that changes whenever the rendered body could. A
+    matching If-None-Match (or, without one, an If-Modified-Since not older
+    than the detail row and its related rows) gets a 304 before any
+    serializer runs.
+
+    Lists send only the ETag: a deleted row does not change the newest
+    modification time, so Last-Modified cannot validate them.
+    """
+
+    conditional_actions = ('list', 'retrieve')
+    conditional_dependencies = ()
+
+    def initial(self, request, *args, **kwargs):
+        self.conditional_validators = None
+        super().initial(request, *args, **kwargs)
+
+    def get_object(self):
+        obj = super().get_object()
+        if self.action == 'retrieve':
+            self.check_conditional([obj])
+        return obj
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and self.action == 'list':
+            envelope = dict(self.get_paginated_response([]).data)
+            envelope.pop('results', None)
+            self.check_conditional(page, envelope)
+        return page
+
+    def conditional_stamps(self, rows):
+        """Primary key and modification time of each row (model instances or values() dicts)"""
+        pk_name = self.get_queryset().model._meta.pk.attname
+        stamps = []
+        for row in rows:
+            if isinstance(row, dict):
+                stamps.append((str(row[pk_name]), row['updated_at']))
+            else:
+                stamps.append((str(row.pk), row.updated_at))
+        return stamps
+
+    def dependency_stamps(self, rows, stamps):
+        """Stamps of the related rows, from memory when loaded or with one aggregate query"""
+        if not self.conditional_dependencies:
+            return []
+        if rows and not isinstance(rows[0], dict):
+            loaded = [_loaded_stamps(row, path) for row in rows for path in self.conditional_dependencies]
+            if None not in loaded:
+                return sorted({stamp for row_stamps in loaded for stamp in row_stamps})
+
+        aggregates = {}
+        for index, path in enumerate(self.conditional_dependencies):
+            aggregates[f'count_{index}'] = Count(path, distinct=True)
+            aggregates[f'modified_{index}'] = Max(f'{path}__updated_at')
+        model = self.get_queryset().model
+        row = model._default_manager.filter(pk__in=[pk for pk, _ in stamps]).aggregate(**aggregates)
+        return [(key, value) for key, value in row.items()]
+
+    def check_conditional(self, rows, envelope=None):
+        """Record the validators of the rows about to be serialized; raise NotModified when the client has them"""
+        request = self.request
+        if request.method not in ('GET', 'HEAD') or self.action not in self.conditional_actions:
+            return
+        rows = list(rows)
+        stamps = self.conditional_stamps(rows)
+        dependencies = self.dependency_stamps(rows, stamps)
+
+        renderer = getattr(request, 'accepted_renderer', None)
+        fingerprint = [request.build_absolute_uri(), getattr(renderer, 'media_type', ''), envelope, stamps, dependencies]
+        payload = json.dumps(fingerprint, cls=JSONEncoder, sort_keys=True)
+        etag = f'W/"{hashlib.sha1(payload.encode()).hexdigest()}"'
+
+        last_modified = None
+        if self.action == 'retrieve':
+            modified = [value for _, value in stamps + dependencies if hasattr(value, 'timestamp')]
+            last_modified = max(modified) if modified else None
+        self.conditional_validators = (etag, last_modified)
+
+        if request.headers.get('If-None-Match'):
+            unchanged = etag_matches(request, etag)
+        else:
+            unchanged = last_modified is not None and not_modified_since(request, last_modified)
+        if unchanged:
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, 'conditional_validators', None)
+        if validators and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            etag, last_modified = validators
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
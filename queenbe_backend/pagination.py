@@ -0,0 +1,146 @@
+"""
+Pagination classes shared by every API viewset.
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination on the view's default ordering plus the primary key.
+
+    Each page is fetched with a WHERE clause on the last row of the previous
+    page instead of an OFFSET, and no COUNT query is issued, so every page
+    costs the same regardless of how deep the client scrolls. The ordering is
+    always the view's `ordering` (first field) followed by the primary key as
+    a tie breaker; `?ordering=` is ignored in this mode.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size = PageNumberPagination.page_size
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.keys = self.get_keys(queryset, view)
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-')) for name in self.keys
+        ]
+
+        queryset = queryset.order_by(*self.keys)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.seek_filter(self.decode_cursor(cursor)))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_keys(self, queryset, view):
+        ordering = getattr(view, 'ordering', None) or queryset.model._meta.ordering
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        if not ordering:
+            raise ValueError(f'{view.__class__.__name__} needs an ordering for keyset pagination')
+
+        primary = ordering[0]
+        pk_name = queryset.model._meta.pk.name
+        if primary.lstrip('-') == pk_name:
+            return [primary]
+        return [primary, pk_name]
+
+    def seek_filter(self, values):
+        """Rows strictly after `values` in the (possibly mixed direction) ordering"""
+        condition = Q()
+        for position, key in enumerate(self.keys):
+            name = key.lstrip('-')
+            lookup = 'lt' if key.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[position]})
+            for previous_key, previous_value in zip(self.keys[:position], values):
+                step &= Q(**{previous_key.lstrip('-'): previous_value})
+            condition |= step
+        return condition
+
+    def encode_cursor(self, row):
+        """Encode the keys of a model instance or a values() dict row"""
+        values = []
+        for field in self.fields:
+            value = row[field.attname] if isinstance(row, dict) else field.value_from_object(row)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, UnicodeDecodeError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class DefaultPagination(PageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset mode.
+
+    Requests carrying `?pagination=cursor` (first page) or `?cursor=...`
+    (following pages) are paginated by KeysetPagination; everything else
+    keeps the regular `?page=` behaviour with a total count.
+    """
+
+    mode_query_param = 'pagination'
+    keyset_mode = 'cursor'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.wants_keyset(request):
+            self.keyset = self.keyset_class()
+            try:
+                return self.keyset.paginate_queryset(queryset, request, view)
+            except FieldDoesNotExist:
+                self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def wants_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == self.keyset_mode
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -44,6 +44,10 @@ AUTH_APPS = [
     "authentication",
 ]
 
+SYNCHRONIZATION_APPS = [
+    "synchronization",
+]
+
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
@@ -53,9 +57,10 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "rest_framework",
     "rest_framework_simplejwt",
+    "rest_framework_simplejwt.token_blacklist",
     "django_filters",
     "corsheaders",
-] + CUSTOMER_RELATIONSHIP_APPS + FINANCES_APPS + AUTH_APPS
+] + CUSTOMER_RELATIONSHIP_APPS + FINANCES_APPS + AUTH_APPS + SYNCHRONIZATION_APPS
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
@@ -112,6 +117,43 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Per-process memory by default; set REDIS_URL (requires the redis package) so
+# every worker process shares cached data and invalidations
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv('REDIS_URL'),
+        },
+        "throttle": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv('REDIS_URL'),
+            "KEY_PREFIX": "throttle",
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        # Rate limit counters (authentication/throttling.py); bounded so a
+        # flood of distinct clients cannot grow memory without limit
+        "throttle": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "throttle",
+            "OPTIONS": {"MAX_ENTRIES": 20000},
+        },
+    }
+
+
+# Cached list/retrieve responses of reference data (order, payment and
+# appointment types); writes invalidate them, this bounds their lifetime
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '3600'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -156,7 +198,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Django REST Framework
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'queenbe_backend.pagination.DefaultPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
@@ -165,13 +207,27 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.JSONParser',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Request users are built from token claims; active users are checked
+        # against a short lived cache instead of a query per request
+        # (see authentication/users.py)
+        'authentication.users.ActiveClaimsAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Sliding window limits of the login and register endpoints (authentication/throttling.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.getenv('LOGIN_IP_RATE', '30/min'),
+        'login_username': os.getenv('LOGIN_USERNAME_RATE', '10/min'),
+        'register_ip': os.getenv('REGISTER_IP_RATE', '10/hour'),
+    },
+    # Number of reverse proxies in front of the app, so throttles key on the
+    # client address from X-Forwarded-For instead of the proxy's
+    'NUM_PROXIES': int(os.environ['NUM_PROXIES']) if os.getenv('NUM_PROXIES') else None,
 }
 
+THROTTLE_CACHE = 'throttle'
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -196,7 +252,7 @@ SIMPLE_JWT = {
     
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
-    'TOKEN_USER_CLASS': 'rest_framework_simplejwt.models.TokenUser',
+    'TOKEN_USER_CLASS': 'authentication.users.ClaimsUser',
     
     'JTI_CLAIM': 'jti',
     
@@ -205,6 +261,36 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Full User rows loaded for token users (profile endpoints) are kept in a
+# per-process cache this long; 0 disables it
+JWT_USER_CACHE_SECONDS = int(os.getenv('JWT_USER_CACHE_SECONDS', '30'))
+
+# Blacklisted refresh tokens are checked in memory (authentication/revocation.py):
+# new revocations are polled when another worker signals one through the cache,
+# or after this many seconds, and the whole set is reloaded periodically
+TOKEN_REVOCATION_POLL_SECONDS = int(os.getenv('TOKEN_REVOCATION_POLL_SECONDS', '5'))
+TOKEN_REVOCATION_RELOAD_SECONDS = int(os.getenv('TOKEN_REVOCATION_RELOAD_SECONDS', '3600'))
+
+# Appointment scheduling (availability search and double-booking checks)
+APPOINTMENT_OPENING_TIME = os.getenv('APPOINTMENT_OPENING_TIME', '09:00')
+APPOINTMENT_CLOSING_TIME = os.getenv('APPOINTMENT_CLOSING_TIME', '18:00')
+APPOINTMENT_SLOT_MINUTES = int(os.getenv('APPOINTMENT_SLOT_MINUTES', '30'))
+# Upper bound on appointment length; also bounds the busy interval range scan
+APPOINTMENT_MAX_DURATION = timedelta(hours=12)
+
+# Marketing segments: cached counts/member ids live until the next customer,
+# appointment or order write, or this many seconds
+SEGMENT_CACHE_TIMEOUT = int(os.getenv('SEGMENT_CACHE_TIMEOUT', '3600'))
+# Larger segments only cache their count and stream members from the database
+SEGMENT_CACHE_MAX_MEMBERS = 100000
+
+# Incremental sync (/api/sync/): rows changed this recently are served on the
+# next request, so rows of transactions still committing are not skipped
+SYNC_SETTLE_SECONDS = int(os.getenv('SYNC_SETTLE_SECONDS', '5'))
+# Deletions are remembered this long (`manage.py prune_tombstones`); older
+# cursors must sync from scratch
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', '90'))
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
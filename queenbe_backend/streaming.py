@@ -0,0 +1,97 @@
+"""
+Newline delimited JSON (NDJSON) streaming for large result sets.
+"""
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Render data as one JSON document per line.
+
+    Large listings bypass this renderer and are streamed by stream_ndjson;
+    it is used for content negotiation and for small responses (errors).
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return b''.join(dump_line(row).encode() for row in rows)
+
+
+def dump_line(data):
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+def stream_ndjson(rows, filename=None):
+    """Wrap an iterable of JSON serializable rows in a streaming NDJSON response"""
+    response = StreamingHttpResponse(
+        (dump_line(row) for row in rows), content_type=NDJSON_MEDIA_TYPE
+    )
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+class StreamingListMixin:
+    """
+    Shared list behaviour for viewsets with potentially large results.
+
+    `list_response(queryset)` paginates like the standard list endpoint, or,
+    when the request asks for `?format=ndjson`, streams every row using a
+    server-side cursor so memory stays bounded regardless of result size.
+
+    Viewsets can serve listings from a cheaper representation by overriding
+    `get_list_source` (what is paginated or iterated, e.g. a values()
+    queryset) together with `serialize_rows` (how a batch of those rows is
+    turned into response data).
+    """
+
+    renderer_classes = list(api_settings.DEFAULT_RENDERER_CLASSES) + [NDJSONRenderer]
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        return self.list_response(self.filter_queryset(self.get_queryset()))
+
+    def wants_stream(self):
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        return isinstance(renderer, NDJSONRenderer)
+
+    def get_list_source(self, queryset):
+        return queryset
+
+    def serialize_rows(self, rows):
+        return self.get_serializer(rows, many=True).data
+
+    def list_response(self, queryset):
+        source = self.get_list_source(queryset)
+        if self.wants_stream():
+            return stream_ndjson(self.stream_rows(source))
+
+        page = self.paginate_queryset(source)
+        if page is not None:
+            return self.get_paginated_response(self.serialize_rows(page))
+
+        return Response(self.serialize_rows(source))
+
+    def stream_rows(self, source):
+        batch = []
+        for row in source.iterator(chunk_size=self.stream_chunk_size):
+            batch.append(row)
+            if len(batch) >= self.stream_chunk_size:
+                yield from self.serialize_rows(batch)
+                batch = []
+        if batch:
+            yield from self.serialize_rows(batch)
@@ -0,0 +1,111 @@
+"""
+Shared helpers for the API test suites.
+"""
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class IndexUsageMixin:
+    """
+    Assert that the queries an endpoint issues against a table use an index.
+
+    Works on SQLite (EXPLAIN QUERY PLAN) and PostgreSQL (EXPLAIN). On
+    PostgreSQL sequential scans are disabled for the check, so the planner
+    picks an index whenever a usable one exists even on tiny test tables.
+    """
+
+    def capture_table_queries(self, table, func):
+        """Run func and return the captured SELECTs reading from table (pagination counts excluded)"""
+        with CaptureQueriesContext(connection) as captured:
+            func()
+        pattern = re.compile(rf'FROM\s+"{re.escape(table)}"', re.IGNORECASE)
+        return [
+            query['sql'] for query in captured.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT')
+            and pattern.search(query['sql'])
+            and '"__count"' not in query['sql']
+        ]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN {sql}')
+                return [row[0] for row in cursor.fetchall()]
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def uses_index(self, plan, table):
+        name = re.escape(table)
+        if connection.vendor == 'postgresql':
+            return any(
+                re.search(rf'(Index Scan|Index Only Scan|Bitmap Heap Scan)\b.* on {name}\b', line)
+                for line in plan
+            ) and not any(re.search(rf'Seq Scan on {name}\b', line) for line in plan)
+        accesses = [line for line in plan if re.match(rf'(SCAN|SEARCH) {name}\b', line)]
+        # Rowid lookups ("USING INTEGER PRIMARY KEY") are index accesses too
+        return bool(accesses) and all('INDEX' in line or 'PRIMARY KEY' in line for line in accesses)
+
+    def assertUsesIndex(self, table, func, msg=None):
+        queries = self.capture_table_queries(table, func)
+        self.assertTrue(queries, msg or f'No query against "{table}" was issued')
+        for sql in queries:
+            plan = self.explain(sql)
+            self.assertTrue(
+                self.uses_index(plan, table),
+                msg or f'Query on "{table}" does not use an index:\n{sql}\n' + '\n'.join(plan)
+            )
+
+
+class QueryCountMixin:
+    """
+    Assert that an endpoint issues the same number of queries whatever the data size.
+
+    Test classes implement `grow(count)`, which adds `count` more rows of
+    seeded data. `assertConstantQueries` grows the data in steps, sends the
+    request after each step and compares the query counts, so an N+1 in a
+    serializer or queryset shows up as a count that grows with the data.
+    Growth steps stay below the page size so every seeded row is serialized.
+    """
+
+    growth_steps = (3, 12)
+
+    def grow(self, count):
+        raise NotImplementedError('QueryCountMixin subclasses must implement grow()')
+
+    def measure_queries(self, send, prepare=None):
+        """Send one request and return (response, query count); prepare() runs unmeasured"""
+        args = (prepare(),) if prepare else ()
+        with CaptureQueriesContext(connection) as captured:
+            response = send(*args)
+            if getattr(response, 'streaming', False):
+                # Streamed bodies run their queries while being consumed
+                b''.join(response.streaming_content)
+        return response, len(captured)
+
+    def assertConstantQueries(self, send, prepare=None, msg=None):
+        """
+        Assert that send() costs the same number of queries at every growth step.
+
+        `prepare`, when given, builds a fresh target (e.g. a row to update or
+        delete) outside the measured block and its result is passed to send.
+        An unmeasured warm-up request absorbs one-off work such as creating
+        the first rollup row of the day. Returns the last response.
+        """
+        self.measure_queries(send, prepare)
+        counts, statuses = [], []
+        for step in self.growth_steps:
+            self.grow(step)
+            response, count = self.measure_queries(send, prepare)
+            counts.append(count)
+            statuses.append(response.status_code)
+
+        self.assertLess(max(statuses), 500, msg or f'Server error responses: {statuses}')
+        self.assertEqual(len(set(statuses)), 1, msg or f'Status changed with data size: {statuses}')
+        self.assertEqual(
+            len(set(counts)), 1,
+            msg or f'Query count grows with data size {list(self.growth_steps)}: {counts}'
+        )
+        return response
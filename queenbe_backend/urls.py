@@ -24,6 +24,7 @@ urlpatterns = [
     path('api/auth/', include('authentication.urls')),
     path('', include('customer_relationship.urls')),
     path('finances/', include('finances.urls')),
+    path('api/sync/', include('synchronization.urls')),
 ]
 
 # Serve static files in development
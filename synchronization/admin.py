@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Tombstone
+
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ['model', 'object_id', 'created_at']
+    list_filter = ['model', 'created_at']
+    search_fields = ['object_id']
+    readonly_fields = ['uuid', 'model', 'object_id', 'created_at', 'updated_at']
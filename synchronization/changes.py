@@ -0,0 +1,195 @@
+"""
+Change feed for offline clients (front desk tablets).
+
+Every synced row and every tombstone is ordered by (updated_at, stream,
+uuid), where the stream is the row's position in SYNC_MODELS (tombstones
+last). A cursor encodes the last position a client has seen; a page reads
+at most `limit + 1` positions from each stream with a seek on its
+(updated_at, uuid) index, merges them, and loads full rows only for the
+`limit` positions that make the page. A page therefore costs one index range
+per stream plus one query per model present in it, however large the
+tables are.
+
+Rows modified within the last SYNC_SETTLE_SECONDS are held back until the
+next request: `updated_at` is assigned before commit, so a slow transaction
+could otherwise commit a row behind a cursor a client has already passed.
+Denormalized names in the payloads (customer_name, order_item_description,
+...) reflect the row's own last change; clients join on the ids.
+"""
+import base64
+import binascii
+import json
+import uuid as uuid_module
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from customer_relationship.models import Appointment, Customer
+from customer_relationship.serializers import AppointmentSerializer, CustomerSerializer
+from finances.models import Order, OrderItem, OrderItemLine
+from finances.projections import order_rows, project_orders
+from finances.serializers import OrderItemLineSerializer, OrderItemSerializer
+from .models import Tombstone
+
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 1000
+
+
+class SyncCustomerSerializer(CustomerSerializer):
+    """Customer without its stats: they change on order/appointment writes, not on the customer row"""
+
+    class Meta(CustomerSerializer.Meta):
+        fields = [name for name in CustomerSerializer.Meta.fields if name != 'stats']
+
+
+def _customers(ids):
+    return SyncCustomerSerializer(Customer.objects.filter(pk__in=ids), many=True).data
+
+
+def _appointments(ids):
+    queryset = Appointment.objects.filter(pk__in=ids).select_related('customer', 'appointment_type')
+    return AppointmentSerializer(queryset, many=True).data
+
+
+def _order_items(ids):
+    return OrderItemSerializer(OrderItem.objects.filter(pk__in=ids), many=True).data
+
+
+def _orders(ids):
+    return project_orders(order_rows(Order.objects.filter(pk__in=ids).order_by()))
+
+
+def _order_item_lines(ids):
+    queryset = OrderItemLine.objects.filter(pk__in=ids).select_related('order_item').order_by()
+    return OrderItemLineSerializer(queryset, many=True).data
+
+
+# Synced models in stream order, keyed by model name, with the loader
+# serializing a batch of their rows by primary key
+SYNC_MODELS = {
+    'customer': (Customer, _customers),
+    'appointment': (Appointment, _appointments),
+    'orderitem': (OrderItem, _order_items),
+    'order': (Order, _orders),
+    'orderitemline': (OrderItemLine, _order_item_lines),
+}
+STREAMS = list(SYNC_MODELS) + ['tombstone']
+
+
+class CursorExpired(ValueError):
+    """The cursor predates the tombstone retention; deletions may have been pruned"""
+
+    def __init__(self):
+        super().__init__('since is older than the deletion history; sync again without it')
+
+
+def parse_sync_params(query_params):
+    """
+    Validate ?since= (cursor of a previous response, omitted on first sync)
+    and ?limit= (changes per page).
+
+    Returns (position, limit) where position is None or an
+    (updated_at, stream index, uuid string) tuple. Raises ValueError with a
+    user facing message on invalid input.
+    """
+    try:
+        limit = int(query_params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError('limit must be a number')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {MAX_LIMIT}')
+
+    since = query_params.get('since')
+    if not since:
+        return None, limit
+    position = decode_cursor(since)
+    horizon = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    if position[0] < horizon:
+        raise CursorExpired()
+    return position, limit
+
+
+def encode_cursor(position):
+    updated_at, stream, uuid = position
+    payload = json.dumps([updated_at.isoformat(), stream, str(uuid)])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        updated_at, stream, uuid = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        updated_at = parse_datetime(updated_at)
+        if updated_at is None or timezone.is_naive(updated_at) or not 0 <= int(stream) < len(STREAMS):
+            raise ValueError
+        return updated_at, int(stream), str(uuid_module.UUID(uuid))
+    except (AttributeError, TypeError, ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError('Invalid cursor')
+
+
+def _stream_model(name):
+    return Tombstone if name == 'tombstone' else SYNC_MODELS[name][0]
+
+
+def _positions(index, position, until, limit):
+    """The first `limit` (updated_at, stream, uuid) positions of one stream after `position`"""
+    queryset = _stream_model(STREAMS[index]).objects.filter(updated_at__lte=until)
+    if position is not None:
+        updated_at, stream, uuid = position
+        if index < stream:
+            queryset = queryset.filter(updated_at__gt=updated_at)
+        elif index > stream:
+            queryset = queryset.filter(updated_at__gte=updated_at)
+        else:
+            queryset = queryset.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, uuid__gt=uuid))
+    rows = queryset.order_by('updated_at', 'uuid').values_list('updated_at', 'uuid')[:limit]
+    return [(updated_at, index, str(uuid)) for updated_at, uuid in rows]
+
+
+def changes_since(position, limit, now=None):
+    """
+    The next page of changes after `position` (None for a full sync).
+
+    Returns (changes, cursor, has_more). Each change is
+    `{'model', 'uuid', 'deleted', 'data'}` (data is None for deletions);
+    `cursor` is the position to send back as ?since= (unchanged when there is
+    nothing new) and `has_more` tells whether the next page is available now.
+    """
+    now = now or timezone.now()
+    until = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+
+    positions = []
+    for index in range(len(STREAMS)):
+        positions.extend(_positions(index, position, until, limit + 1))
+    positions.sort()
+    has_more = len(positions) > limit
+    page = positions[:limit]
+
+    ids = {}
+    for _, index, uuid in page:
+        ids.setdefault(STREAMS[index], []).append(uuid)
+    loaded = {}
+    for name, stream_ids in ids.items():
+        if name == 'tombstone':
+            for tombstone in Tombstone.objects.filter(pk__in=stream_ids).values('uuid', 'model', 'object_id'):
+                loaded[name, str(tombstone['uuid'])] = tombstone
+        else:
+            for row in SYNC_MODELS[name][1](stream_ids):
+                loaded[name, str(row['uuid'])] = row
+
+    changes = []
+    for _, index, uuid in page:
+        name = STREAMS[index]
+        row = loaded.get((name, uuid))
+        if row is None:
+            # Deleted since the positions were read; its tombstone follows in a later page
+            continue
+        if name == 'tombstone':
+            changes.append({'model': row['model'], 'uuid': str(row['object_id']), 'deleted': True, 'data': None})
+        else:
+            changes.append({'model': name, 'uuid': uuid, 'deleted': False, 'data': row})
+
+    cursor = encode_cursor(page[-1]) if page else (encode_cursor(position) if position else None)
+    return changes, cursor, has_more
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from synchronization.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        horizon = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        deleted, _ = Tombstone.objects.filter(updated_at__lt=horizon).delete()
+        self.stdout.write(
+            self.style.SUCCESS(f'Deleted {deleted} tombstones older than {horizon:%Y-%m-%d}')
+        )
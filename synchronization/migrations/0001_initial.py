@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:26
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('model', models.CharField(max_length=50)),
+                ('object_id', models.UUIDField()),
+            ],
+            options={
+                'verbose_name': 'Tombstone',
+                'verbose_name_plural': 'Tombstones',
+                'db_table': 'sync_tombstones',
+                'indexes': [models.Index(fields=['updated_at', 'uuid'], name='sync_tombstones_sync_idx')],
+            },
+        ),
+    ]
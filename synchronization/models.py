@@ -0,0 +1,26 @@
+from django.db import models
+
+from customer_relationship.models import BaseModel
+
+
+class Tombstone(BaseModel):
+    """
+    Record of a deleted row, served by the sync endpoint so offline clients
+    drop their copy. Written by the post_delete receivers in signals.py and
+    pruned after SYNC_TOMBSTONE_RETENTION_DAYS.
+    """
+
+    # Sync name of the deleted row's model (see changes.SYNC_MODELS)
+    model = models.CharField(max_length=50)
+    object_id = models.UUIDField()
+
+    class Meta:
+        db_table = "sync_tombstones"
+        verbose_name = "Tombstone"
+        verbose_name_plural = "Tombstones"
+        indexes = [
+            models.Index(fields=["updated_at", "uuid"], name="sync_tombstones_sync_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at {self.updated_at}"
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from customer_relationship.models import Appointment, Customer
+from finances.models import Order, OrderItem, OrderItemLine
+from .models import Tombstone
+
+
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=OrderItem)
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=OrderItemLine)
+def record_tombstone(sender, instance, **kwargs):
+    """Remember synced rows that are deleted (cascades included) for the sync endpoint"""
+    # Written in the deleting transaction, so a rolled back delete leaves no tombstone
+    Tombstone.objects.create(model=sender._meta.model_name, object_id=instance.pk)
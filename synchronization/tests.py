@@ -0,0 +1,129 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from customer_relationship.models import Appointment, AppointmentType, Customer
+from customer_relationship.tests import create_customer
+from finances.models import Order, OrderItem, OrderItemLine, OrderType, PaymentType
+from .changes import encode_cursor
+from .models import Tombstone
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncTests(TestCase):
+    """The sync feed returns each change once, in order, with deletions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tablet', 'tablet@example.com', 'secret-pass')
+        cls.customers = [create_customer(i, email=f'sync{i}@example.com') for i in range(4)]
+        haircut = AppointmentType.objects.create(description='Haircut')
+        income = OrderType.objects.create(type='Income')
+        cash = PaymentType.objects.create(type='Cash')
+        cls.item = OrderItem.objects.create(description='Shampoo', unit_price=Decimal('10.00'))
+        start = timezone.now() + timedelta(days=1)
+        for customer in cls.customers:
+            appointment = Appointment.objects.create(
+                customer=customer, appointment_type=haircut,
+                start_time=start, end_time=start + timedelta(hours=1),
+            )
+            start += timedelta(hours=1)
+            order = Order.objects.create(
+                customer=customer, order_type=income, payment_type=cash,
+                appointment=appointment, total=Decimal('10.00'),
+            )
+            OrderItemLine.objects.create(order=order, order_item=cls.item, quantity=1, unit_price=Decimal('10.00'))
+        # Identical timestamps across models force the stream/uuid tie breakers to do their job
+        moment = timezone.now() - timedelta(minutes=1)
+        Customer.objects.filter(first_name='Customer1').update(updated_at=moment)
+        Order.objects.filter(customer__first_name='Customer1').update(updated_at=moment)
+        Appointment.objects.update(updated_at=moment)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, url='/api/sync/'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def walk(self, url):
+        changes = []
+        while True:
+            data = self.sync(url)
+            changes.extend(data['results'])
+            if not data['has_more']:
+                return changes, data['cursor']
+            url = data['next']
+
+    def test_full_sync_pages_every_row_once(self):
+        changes, _ = self.walk('/api/sync/?limit=3')
+        keys = [(change['model'], change['uuid']) for change in changes]
+        self.assertEqual(len(keys), len(set(keys)))
+        models = [model for model, _ in keys]
+        self.assertEqual(
+            {model: models.count(model) for model in set(models)},
+            {'customer': 4, 'appointment': 4, 'orderitem': 1, 'order': 4, 'orderitemline': 4},
+        )
+        stamps = [change['data']['updated_at'] for change in changes]
+        self.assertEqual(stamps, sorted(stamps))
+
+        order = next(change['data'] for change in changes if change['model'] == 'order')
+        self.assertEqual(len(order['order_items']), 1)
+        customer = next(change['data'] for change in changes if change['model'] == 'customer')
+        self.assertNotIn('stats', customer)
+
+    def test_page_queries_do_not_depend_on_table_size(self):
+        # One position range per stream, one load per model on the page, order lines
+        with self.assertNumQueries(12):
+            self.sync('/api/sync/?limit=20')
+
+    def test_incremental_sync_returns_changes_and_deletions(self):
+        _, cursor = self.walk('/api/sync/')
+        self.assertEqual(self.sync(f'/api/sync/?since={cursor}')['results'], [])
+
+        customer = self.customers[0]
+        customer.nickname = 'Cee'
+        customer.save()
+        order = Order.objects.get(customer=self.customers[2])
+        deleted = {('order', str(order.uuid), True), ('orderitemline', str(order.order_items.get().uuid), True)}
+        order.delete()
+
+        changes, new_cursor = self.walk(f'/api/sync/?since={cursor}')
+        keys = [(change['model'], change['uuid'], change['deleted']) for change in changes]
+        self.assertEqual(keys[0], ('customer', str(customer.uuid), False))
+        self.assertEqual(changes[0]['data']['nickname'], 'Cee')
+        self.assertEqual(set(keys[1:]), deleted)
+        self.assertIsNone(changes[1]['data'])
+        self.assertEqual(self.sync(f'/api/sync/?since={new_cursor}')['results'], [])
+
+    def test_cascaded_deletes_leave_tombstones(self):
+        self.customers[3].delete()
+        self.assertEqual(
+            sorted(Tombstone.objects.values_list('model', flat=True)),
+            ['appointment', 'customer', 'order', 'orderitemline'],
+        )
+
+    @override_settings(SYNC_SETTLE_SECONDS=5)
+    def test_recent_changes_wait_until_settled(self):
+        _, cursor = self.walk('/api/sync/')
+        OrderItem.objects.create(description='Conditioner', unit_price=Decimal('5.00'))
+        data = self.sync(f'/api/sync/?since={cursor}')
+        self.assertEqual(data['results'], [])
+        self.assertEqual(data['cursor'], cursor)
+
+    def test_invalid_parameters(self):
+        for query in ('since=not-a-cursor', 'limit=0', 'limit=abc'):
+            response = self.client.get(f'/api/sync/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', response.data)
+
+    def test_cursor_older_than_retention_is_gone(self):
+        cursor = encode_cursor((timezone.now() - timedelta(days=365), 0, self.customers[0].uuid))
+        response = self.client.get(f'/api/sync/?since={cursor}')
+        self.assertEqual(response.status_code, 410)
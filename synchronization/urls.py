@@ -0,0 +1,16 @@
+from django.urls import path
+from .views import sync_view
+
+urlpatterns = [
+    path('', sync_view, name='sync'),
+]
+
+# Available endpoints:
+# GET /api/sync/ - Every synced row (first sync), paged
+# GET /api/sync/?since={cursor} - Rows changed or deleted after the cursor of a previous response
+#
+# Responses: {"results": [{"model", "uuid", "deleted", "data"}], "cursor", "has_more", "next"}
+# Models: customer, appointment, orderitem, order, orderitemline; deletions carry "deleted": true and no data.
+# Store `cursor` and send it back as ?since=; follow `next` while `has_more` is true.
+# ?limit=N changes per page (default 200, at most 1000)
+# A cursor older than SYNC_TOMBSTONE_RETENTION_DAYS gets 410 Gone: sync again without ?since=
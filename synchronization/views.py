@@ -0,0 +1,32 @@
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .changes import CursorExpired, changes_since, parse_sync_params
+
+
+@api_view(['GET'])
+def sync_view(request):
+    """
+    Changes to customers, appointments, order items, orders and order item
+    lines (deletions included) since the ?since= cursor of a previous response.
+    """
+    try:
+        position, limit = parse_sync_params(request.query_params)
+    except CursorExpired as e:
+        return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    changes, cursor, has_more = changes_since(position, limit)
+    next_url = None
+    if has_more:
+        next_url = replace_query_param(request.build_absolute_uri(), 'since', cursor)
+
+    return Response({
+        'results': changes,
+        'cursor': cursor,
+        'has_more': has_more,
+        'next': next_url,
+    })